@@ -0,0 +1,624 @@
+"""
+Нагрузочный прогон YaNews и YaNote по HTTP.
+
+Потоки-клиенты выполняют смесь операций пользователей: анонимное
+чтение, комментарии с правкой и удалением для YaNews, создание,
+чтение, правку и удаление заметок для YaNote. POST-запросы идут с
+CSRF-токеном из cookie, как из формы в браузере. Пользователи для
+прогона регистрируются через форму регистрации. Прогон повторяется
+для каждого уровня параллельности; для уровня выводятся пропускная
+способность, доля ошибок (отдельно «database is locked» от SQLite),
+перцентили и гистограмма времени ответа.
+
+Сервер — уже запущенный (--url, например runserver) или WSGI-
+приложение проекта в этом же процессе (--wsgi) на многопоточном
+сервере Django, том же, что у runserver, или с --server-threads на
+постоянном пуле потоков, как у gunicorn --threads. База проекта должна
+быть с данными: python manage.py migrate && python manage.py seed_data.
+
+С несколькими --settings каждый набор настроек прогоняется в своём
+процессе на той же базе, и в конце выводится сравнение пропускной
+способности и ошибок. Перед каждым из этих прогонов база
+возвращается в обычный режим журнала (--reset-journal): WAL,
+включённый прошлым прогоном, иначе достался бы и настройкам без него.
+Для настроек, которым нужен DJANGO_SECRET_KEY, с --wsgi создаётся
+одноразовый ключ.
+
+Запуск:
+    python load_test.py news --url http://127.0.0.1:8000
+    python load_test.py note --wsgi --concurrency 1 4 16 --duration 10
+    python load_test.py note --wsgi --server-threads 8 \
+        --settings yanote.settings yanote.settings_production
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import secrets
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from functools import partial
+from http.client import HTTPException
+from http.cookiejar import CookieJar
+from importlib import import_module
+from pathlib import Path
+from random import Random
+from statistics import quantiles
+from threading import Lock, Thread
+from time import perf_counter
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import (
+    HTTPCookieProcessor, HTTPRedirectHandler, build_opener
+)
+
+BASE_DIR = Path(__file__).resolve().parent
+PASSWORD = 'Load-test-password-1'
+LOCKED = 'database is locked'
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+BAR_WIDTH = 40
+
+Project = namedtuple('Project', ('directory', 'package', 'mix'))
+Sample = namedtuple('Sample', ('operation', 'latency', 'error'))
+
+PROJECTS = {
+    'news': Project(BASE_DIR / 'ya_news', 'yanews', {
+        'home': 40, 'detail': 40, 'comment': 10, 'edit': 5, 'delete': 5,
+    }),
+    'note': Project(BASE_DIR / 'ya_note', 'yanote', {
+        'home': 10, 'list': 20, 'read': 30, 'create': 20, 'update': 10,
+        'delete': 10,
+    }),
+}
+NEWS_LINK = re.compile(rb'href="/news/(\d+)/"')
+EDIT_COMMENT_LINK = re.compile(rb'href="/edit_comment/(\d+)/"')
+
+
+class NoRedirect(HTTPRedirectHandler):
+    """Редирект — ответ, а не новый запрос: замеряется один запрос."""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Session:
+    """HTTP-клиент со своими cookie: аноним или вошедший пользователь."""
+
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.cookies = CookieJar()
+        self.opener = build_opener(
+            HTTPCookieProcessor(self.cookies), NoRedirect
+        )
+
+    def csrf_token(self, form_path):
+        """Токен из cookie csrftoken; без cookie сначала открыть форму."""
+        for _ in range(2):
+            for cookie in self.cookies:
+                if cookie.name == 'csrftoken':
+                    return cookie.value
+            self.request(form_path)
+        raise RuntimeError(f'{form_path} не выдал cookie csrftoken')
+
+    def request(self, path, data=None):
+        """(статус, тело) ответа; data — поля формы для POST."""
+        if data is not None:
+            data = urlencode({
+                **data, 'csrfmiddlewaretoken': self.csrf_token(path)
+            }).encode()
+        try:
+            with self.opener.open(
+                self.base_url + path, data, self.timeout
+            ) as response:
+                return response.status, response.read()
+        except HTTPError as error:
+            with error:
+                return error.code, error.read()
+
+    def sign_up(self, username):
+        """Регистрирует пользователя и входит под ним."""
+        status, _ = self.request('/auth/signup/', {
+            'username': username,
+            'password1': PASSWORD,
+            'password2': PASSWORD,
+        })
+        if status != 302:
+            raise RuntimeError(f'регистрация {username}: HTTP {status}')
+        status, _ = self.request(
+            '/auth/login/', {'username': username, 'password': PASSWORD}
+        )
+        if status != 302:
+            raise RuntimeError(f'вход {username}: HTTP {status}')
+
+
+def classify(status, body):
+    """Вид ошибки ответа или None для успешного."""
+    if status < 400:
+        return None
+    if LOCKED.encode() in body:
+        return LOCKED
+    return f'HTTP {status}'
+
+
+class Workload:
+    """
+    Операции одного клиента; у каждого свой пользователь.
+
+    Запросы, нужные только для подготовки (поиск своих объектов),
+    в замеры не попадают.
+    """
+
+    def __init__(self, anonymous, user, seed):
+        self.anonymous = anonymous
+        self.user = user
+        self.random = Random(seed)
+        self.record = None
+
+    def timed(self, session, operation, path, data=None):
+        start = perf_counter()
+        try:
+            status, body = session.request(path, data)
+            error = classify(status, body)
+        except (OSError, HTTPException) as exception:
+            status, body, error = None, b'', type(exception).__name__
+        self.record(Sample(operation, perf_counter() - start, error))
+        return status, body
+
+    def text(self):
+        return f'Нагрузочный прогон {self.random.randrange(10 ** 6)}'
+
+
+class NewsWorkload(Workload):
+
+    def __init__(self, anonymous, user, seed, news_ids):
+        super().__init__(anonymous, user, seed)
+        self.news_ids = news_ids
+        self.comments = set()
+
+    def home(self):
+        self.timed(self.anonymous, 'home', '/')
+
+    def detail(self):
+        news_id = self.random.choice(self.news_ids)
+        self.timed(self.anonymous, 'detail', f'/news/{news_id}/')
+
+    def comment(self):
+        news_id = self.random.choice(self.news_ids)
+        path = f'/news/{news_id}/'
+        status, _ = self.timed(
+            self.user, 'comment', path, {'text': self.text()}
+        )
+        if status == 302:
+            # Переход по редиректу, как в браузере, — отдельная операция:
+            # страница для автора тяжелее анонимной. Ссылки правки видны
+            # только у своих комментариев на первой странице: у новостей
+            # с сотнями комментариев новый туда не попадёт, и правку
+            # заменит комментарий.
+            _, body = self.timed(self.user, 'redirect', path)
+            self.comments.update(map(int, EDIT_COMMENT_LINK.findall(body)))
+
+    def edit(self):
+        if not self.comments:
+            return self.comment()
+        comment_id = self.random.choice(sorted(self.comments))
+        self.timed(
+            self.user, 'edit', f'/edit_comment/{comment_id}/',
+            {'text': self.text()},
+        )
+
+    def delete(self):
+        if not self.comments:
+            return self.comment()
+        comment_id = self.comments.pop()
+        self.timed(self.user, 'delete', f'/delete_comment/{comment_id}/', {})
+
+
+class NotesWorkload(Workload):
+
+    def __init__(self, anonymous, user, seed):
+        super().__init__(anonymous, user, seed)
+        self.prefix = f'load-{seed}'
+        self.created = 0
+        self.slugs = []
+
+    def home(self):
+        self.timed(self.anonymous, 'home', '/')
+
+    def list(self):
+        self.timed(self.user, 'list', '/notes/')
+
+    def fields(self, slug):
+        return {'title': self.text(), 'text': self.text(), 'slug': slug}
+
+    def create(self):
+        self.created += 1
+        slug = f'{self.prefix}-{self.created}'
+        status, _ = self.timed(self.user, 'create', '/add/', self.fields(slug))
+        if status == 302:
+            self.slugs.append(slug)
+
+    def read(self):
+        if not self.slugs:
+            return self.create()
+        slug = self.random.choice(self.slugs)
+        self.timed(self.user, 'read', f'/note/{slug}/')
+
+    def update(self):
+        if not self.slugs:
+            return self.create()
+        slug = self.random.choice(self.slugs)
+        self.timed(self.user, 'update', f'/edit/{slug}/', self.fields(slug))
+
+    def delete(self):
+        if not self.slugs:
+            return self.create()
+        slug = self.slugs.pop(self.random.randrange(len(self.slugs)))
+        self.timed(self.user, 'delete', f'/delete/{slug}/', {})
+
+
+def make_workloads(name, base_url, count, timeout):
+    """Клиенты с зарегистрированными пользователями."""
+    run = secrets.token_hex(3)
+    news_ids = None
+    if name == 'news':
+        _, body = Session(base_url, timeout).request('/')
+        news_ids = sorted(set(map(int, NEWS_LINK.findall(body))))
+        if not news_ids:
+            sys.exit('На главной нет новостей: заполните базу '
+                     '(python manage.py seed_data).')
+    workloads = []
+    for index in range(count):
+        user = Session(base_url, timeout)
+        user.sign_up(f'load-{run}-{index}')
+        anonymous = Session(base_url, timeout)
+        seed = f'{run}-{index}'
+        workloads.append(
+            NewsWorkload(anonymous, user, seed, news_ids)
+            if name == 'news' else NotesWorkload(anonymous, user, seed)
+        )
+    return workloads
+
+
+def run_level(workloads, mix, duration):
+    """Все клиенты выполняют случайные операции duration секунд."""
+    samples = []
+    operations, weights = zip(*mix.items())
+    deadline = perf_counter() + duration
+
+    def loop(workload):
+        workload.record = samples.append
+        while perf_counter() < deadline:
+            operation = workload.random.choices(operations, weights)[0]
+            getattr(workload, operation)()
+
+    start = perf_counter()
+    with ThreadPoolExecutor(len(workloads)) as executor:
+        list(executor.map(loop, workloads))
+    return samples, perf_counter() - start
+
+
+def percentiles(latencies):
+    if len(latencies) < 2:
+        return dict.fromkeys(('p50', 'p95', 'p99'), (latencies or [0])[0])
+    cuts = quantiles(latencies, n=100, method='inclusive')
+    return {'p50': cuts[49], 'p95': cuts[94], 'p99': cuts[98]}
+
+
+def histogram(latencies):
+    """Число ответов по корзинам BUCKETS_MS и сверх последней."""
+    counts = Counter()
+    for latency in latencies:
+        for bucket in BUCKETS_MS:
+            if latency <= bucket:
+                counts[bucket] += 1
+                break
+        else:
+            counts[None] += 1
+    return [
+        (f'≤{bucket} мс' if bucket else f'>{BUCKETS_MS[-1]} мс',
+         counts[bucket])
+        for bucket in (*BUCKETS_MS, None)
+    ]
+
+
+def summarize(concurrency, samples, elapsed, server_errors):
+    latencies = [sample.latency * 1000 for sample in samples]
+    errors = Counter(sample.error for sample in samples if sample.error)
+    operations = {}
+    for operation in sorted({sample.operation for sample in samples}):
+        selected = [s for s in samples if s.operation == operation]
+        operations[operation] = {
+            'requests': len(selected),
+            'errors': sum(1 for s in selected if s.error),
+            **percentiles([s.latency * 1000 for s in selected]),
+        }
+    return {
+        'concurrency': concurrency,
+        'requests': len(samples),
+        'seconds': elapsed,
+        'throughput': len(samples) / elapsed,
+        'error_rate': sum(errors.values()) / max(len(samples), 1),
+        'errors': dict(errors),
+        'server_errors': dict(server_errors),
+        **percentiles(latencies),
+        'histogram': histogram(latencies),
+        'operations': operations,
+    }
+
+
+def print_level(summary):
+    print(
+        f'\nПараллельность {summary["concurrency"]}: '
+        f'{summary["requests"]} запросов за {summary["seconds"]:.1f} с, '
+        f'{summary["throughput"]:.1f} в секунду, '
+        f'ошибок {summary["error_rate"]:.1%}'
+    )
+    for error, count in sorted(summary['errors'].items()):
+        print(f'  {error}: {count}')
+    for error, count in sorted(summary['server_errors'].items()):
+        print(f'  исключение на сервере «{error}»: {count}')
+    for operation, stats in summary['operations'].items():
+        print(
+            f'  {operation:<8} {stats["requests"]:>6} | '
+            f'p50 {stats["p50"]:8.2f} | p95 {stats["p95"]:8.2f} | '
+            f'p99 {stats["p99"]:8.2f} мс | ошибок {stats["errors"]}'
+        )
+    largest = max(count for _, count in summary['histogram']) or 1
+    for label, count in summary['histogram']:
+        if count:
+            bar = '█' * max(1, round(count / largest * BAR_WIDTH))
+            print(f'  {label:>10} {bar} {count}')
+
+
+def locked_count(summary):
+    # Исключения встроенного сервера точнее: без DEBUG в теле ответа
+    # 500 нет текста ошибки.
+    return sum(
+        count for error, count in summary['server_errors'].items()
+        if LOCKED in error
+    ) or summary['errors'].get(LOCKED, 0)
+
+
+def print_table(summaries):
+    print(
+        '\nпотоков | запросов/с | ошибок | locked '
+        '|    p50 |    p95 |    p99'
+    )
+    for summary in summaries:
+        print(
+            f'{summary["concurrency"]:>7} | {summary["throughput"]:>10.1f} | '
+            f'{summary["error_rate"]:>6.1%} | {locked_count(summary):>6} | '
+            f'{summary["p50"]:>6.1f} | {summary["p95"]:>6.1f} | '
+            f'{summary["p99"]:>6.1f}'
+        )
+
+
+class ServerErrors:
+    """Исключения представлений во встроенном сервере по тексту."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.counts = Counter()
+
+    def __call__(self, sender, request=None, **kwargs):
+        error = sys.exc_info()[1]
+        with self.lock:
+            self.counts[str(error).split('\n')[0]] += 1
+
+    def pop(self):
+        with self.lock:
+            counts, self.counts = self.counts, Counter()
+        return counts
+
+
+def reset_journal(connection):
+    """
+    Обычный режим журнала SQLite вместо сохранённого в файле WAL.
+
+    connection — подключение Django к базе; проверяется его vendor,
+    а не ENGINE: у проекта может быть свой бэкенд поверх sqlite3.
+    Возвращает прежний режим, если он изменился, иначе None. Файла
+    базы, которого нет, функция не создаёт.
+    """
+    if connection.vendor != 'sqlite':
+        return None
+    path = Path(connection.settings_dict['NAME'])
+    if not path.is_file():
+        return None
+    with closing(sqlite3.connect(path)) as connection:
+        mode = connection.execute('PRAGMA journal_mode').fetchone()[0]
+        if mode == 'delete':
+            return None
+        connection.execute('PRAGMA journal_mode = delete')
+    return mode
+
+
+def serve_wsgi(project, settings, threads, reset):
+    """
+    WSGI-приложение проекта на многопоточном сервере Django.
+
+    С threads запросы обрабатывает постоянный пул потоков: только так
+    подключения к базе с CONN_MAX_AGE переживают запрос, ведь у
+    каждого потока своё подключение.
+    """
+    sys.path.insert(0, str(project.directory))
+    os.environ['DJANGO_SETTINGS_MODULE'] = (
+        settings or f'{project.package}.settings'
+    )
+    # Сервер живёт только на время прогона и слушает localhost.
+    os.environ.setdefault('DJANGO_SECRET_KEY', secrets.token_urlsafe(50))
+    application = import_module(f'{project.package}.wsgi').application
+    from django.core.servers.basehttp import (
+        ThreadedWSGIServer, WSGIRequestHandler
+    )
+    from django.core.signals import got_request_exception
+    from django.db import connection
+
+    if reset:
+        mode = reset_journal(connection)
+        if mode:
+            name = connection.settings_dict['NAME']
+            print(f'Журнал {name}: {mode} → delete.')
+    # Ошибки считаются здесь; журнал каждого запроса только мешает.
+    logging.getLogger('django.server').setLevel(logging.CRITICAL)
+    logging.getLogger('django.request').setLevel(logging.CRITICAL)
+    server_errors = ServerErrors()
+    got_request_exception.connect(server_errors, weak=False)
+    server = ThreadedWSGIServer(('127.0.0.1', 0), WSGIRequestHandler)
+    if threads:
+        server.process_request = partial(
+            ThreadPoolExecutor(threads).submit,
+            server.process_request_thread,
+        )
+    server.set_app(application)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}', server_errors
+
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        operation, _, weight = item.partition('=')
+        mix[operation.strip()] = float(weight)
+    return mix
+
+
+def print_comparison(results):
+    """Пропускная способность наборов настроек рядом, с приростом."""
+    names = list(results)
+    print(
+        '\nпотоков | настройки                      | запросов/с | прирост '
+        '| ошибок | locked |    p95'
+    )
+    for index, base in enumerate(results[names[0]]):
+        for name in names:
+            summary = results[name][index]
+            gain = summary['throughput'] / max(base['throughput'], 1e-9)
+            print(
+                f'{summary["concurrency"]:>7} | {name:<30} | '
+                f'{summary["throughput"]:>10.1f} | {gain:>6.2f}x | '
+                f'{summary["error_rate"]:>6.1%} | '
+                f'{locked_count(summary):>6} | {summary["p95"]:>6.1f}'
+            )
+
+
+def compare_settings(args):
+    """Прогон с каждым набором настроек в отдельном процессе."""
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for settings in args.settings:
+            print(f'\n=== {settings} ===', flush=True)
+            path = Path(directory) / f'{settings}.json'
+            command = [
+                sys.executable, __file__, args.project, '--wsgi',
+                '--settings', settings,
+                '--server-threads', str(args.server_threads),
+                '--concurrency', *map(str, args.concurrency),
+                '--duration', str(args.duration),
+                '--timeout', str(args.timeout),
+                '--json', str(path), '--reset-journal',
+            ]
+            if args.mix:
+                command += ['--mix', ','.join(
+                    f'{operation}={weight}'
+                    for operation, weight in args.mix.items()
+                )]
+            if subprocess.call(command):
+                sys.exit(f'Прогон с {settings} завершился с ошибкой.')
+            with open(path, encoding='utf-8') as file:
+                results[settings] = json.load(file)
+    print_comparison(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('project', choices=PROJECTS)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help='Адрес запущенного сервера.')
+    target.add_argument(
+        '--wsgi', action='store_true',
+        help='Поднять WSGI-приложение проекта в этом процессе.'
+    )
+    parser.add_argument(
+        '--settings', nargs='+', default=[None],
+        help='DJANGO_SETTINGS_MODULE для --wsgi; несколько — сравнение.'
+    )
+    parser.add_argument(
+        '--server-threads', type=int, default=0, metavar='N',
+        help='Пул из N потоков для --wsgi вместо потока на запрос.'
+    )
+    parser.add_argument(
+        '--concurrency', type=int, nargs='+', default=[1, 2, 4, 8]
+    )
+    parser.add_argument(
+        '--duration', type=float, default=10,
+        help='Секунд на каждый уровень параллельности.'
+    )
+    parser.add_argument(
+        '--mix', type=parse_mix,
+        help='Веса операций, например home=50,detail=30,comment=20.'
+    )
+    parser.add_argument(
+        '--reset-journal', action='store_true',
+        help='Перед прогоном с --wsgi вернуть базе обычный режим журнала.'
+    )
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--json', help='Записать результаты в файл.')
+    args = parser.parse_args()
+    if len(args.settings) > 1 and not args.wsgi:
+        parser.error('сравнение настроек возможно только с --wsgi')
+    if args.reset_journal and not args.wsgi:
+        parser.error('--reset-journal возможен только с --wsgi')
+    return args
+
+
+def main():
+    args = parse_args()
+    project = PROJECTS[args.project]
+    mix = args.mix or project.mix
+    unknown = set(mix) - set(project.mix)
+    if unknown:
+        sys.exit(f'Неизвестные операции: {", ".join(sorted(unknown))}')
+    if len(args.settings) > 1:
+        return compare_settings(args)
+    server_errors = None
+    if args.wsgi:
+        _, base_url, server_errors = serve_wsgi(
+            project, args.settings[0], args.server_threads,
+            args.reset_journal,
+        )
+    else:
+        base_url = args.url
+    workloads = make_workloads(
+        args.project, base_url, max(args.concurrency), args.timeout
+    )
+    summaries = []
+    for concurrency in args.concurrency:
+        if server_errors:
+            server_errors.pop()
+        samples, elapsed = run_level(
+            workloads[:concurrency], mix, args.duration
+        )
+        summaries.append(summarize(
+            concurrency, samples, elapsed,
+            server_errors.pop() if server_errors else {},
+        ))
+        print_level(summaries[-1])
+    print_table(summaries)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(summaries, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
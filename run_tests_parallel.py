@@ -0,0 +1,222 @@
+"""
+Параллельный прогон проверок обоих проектов.
+
+Делает то же, что run_tests.sh: flake8, structure_test.py и тесты
+YaNews и YaNote. Тесты обоих проектов делятся на части и идут
+одновременно в отдельных процессах pytest. У каждого процесса свой
+DJANGO_SETTINGS_MODULE (settings_parallel проекта) и своя тестовая
+база SQLite. Результаты собираются из отчётов JUnit XML, которые
+pytest пишет без дополнительных плагинов.
+
+Запуск: python run_tests_parallel.py [--workers N] [--impact]
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from time import perf_counter
+from xml.etree import ElementTree
+
+BASE_DIR = Path(__file__).resolve().parent
+
+Project = namedtuple(
+    'Project', ('name', 'directory', 'settings', 'failure_message')
+)
+Shard = namedtuple('Shard', ('project', 'index', 'node_ids'))
+ShardResult = namedtuple(
+    'ShardResult', ('shard', 'returncode', 'tests', 'failures')
+)
+
+PROJECTS = (
+    Project(
+        'YaNews', BASE_DIR / 'ya_news', 'yanews',
+        ' При запуске упали ваши тесты для проекта YaNews. '
+        'Проверьте тесты этого проекта ',
+    ),
+    Project(
+        'YaNote', BASE_DIR / 'ya_note', 'yanote',
+        ' При запуске упали ваши тесты для проекта YaNote. '
+        'Проверьте тесты этого проекта ',
+    ),
+)
+FLAKE8_PASSED = ' flake8 завершил проверку кода, ошибок не обнаружено '
+FLAKE8_FAILED = (
+    ' flake8 обнаружил отклонения от стандартов, '
+    'приведите код в соответствие с PEP8 '
+)
+STRUCTURE_FAILED = (
+    ' Убедитесь, что написанные вами тесты скопированы '
+    'в указанные в ТЗ директории '
+)
+
+
+def print_message(message, symbol, error=False):
+    """Строка с сообщением во всю ширину терминала, как в run_tests.sh."""
+    width = shutil.get_terminal_size().columns
+    color = '\033[0;31m' if error else '\033[0;32m'
+    print(f'{color}\n{message.center(width, symbol)}\033[0m')
+
+
+def fail(message, status):
+    print_message(message, '=', error=True)
+    print('```', file=sys.stderr)
+    sys.exit(status)
+
+
+def run_checks():
+    """flake8 и structure_test.py — до тестов и последовательно."""
+    status = subprocess.call(
+        [sys.executable, '-m', 'flake8', '--config=setup.cfg'],
+        cwd=BASE_DIR, stdout=sys.stderr,
+    )
+    if status:
+        fail(FLAKE8_FAILED, status)
+    print_message(FLAKE8_PASSED, '=')
+    status = subprocess.call(
+        [sys.executable, 'structure_test.py'], cwd=BASE_DIR
+    )
+    if status:
+        fail(STRUCTURE_FAILED, status)
+
+
+def pytest_command(*args):
+    return [
+        sys.executable, '-m', 'pytest', '-p', 'no:cacheprovider',
+        '-o', 'addopts=', *args,
+    ]
+
+
+def collect(project, impact=False):
+    """
+    Идентификаторы тестов проекта; None, если сбор не удался.
+
+    С impact — только тесты, затронутые изменёнными файлами.
+    """
+    args = ['--collect-only', '-q'] + (['--impact'] if impact else [])
+    result = subprocess.run(
+        pytest_command(*args),
+        cwd=project.directory, capture_output=True, text=True,
+        env={**os.environ, 'DJANGO_SETTINGS_MODULE':
+             f'{project.settings}.settings'},
+    )
+    if result.returncode:
+        sys.stderr.write(result.stdout + result.stderr)
+        return None
+    return [line for line in result.stdout.splitlines() if '::' in line]
+
+
+def make_shards(project, node_ids, count):
+    """
+    Делит тесты проекта на count частей примерно поровну.
+
+    Тесты одного класса TestCase попадают в одну часть, чтобы
+    setUpTestData выполнялся один раз.
+    """
+    groups = defaultdict(list)
+    for node_id in node_ids:
+        parts = node_id.split('::')
+        key = '::'.join(parts[:2]) if len(parts) > 2 else node_id
+        groups[key].append(node_id)
+    shards = [[] for _ in range(count)]
+    for group in sorted(groups.values(), key=len, reverse=True):
+        min(shards, key=len).extend(group)
+    return [
+        Shard(project, index, shard)
+        for index, shard in enumerate(shards) if shard
+    ]
+
+
+def run_shard(shard, directory):
+    """Прогоняет часть тестов в отдельном процессе pytest."""
+    name = f'{shard.project.settings}_{shard.index}'
+    report = Path(directory) / f'{name}.xml'
+    result = subprocess.run(
+        pytest_command('-q', '--tb=line', f'--junitxml={report}',
+                       *shard.node_ids),
+        cwd=shard.project.directory, capture_output=True, text=True,
+        env={
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE':
+                f'{shard.project.settings}.settings_parallel',
+            'TEST_WORKER': str(shard.index),
+            'TEST_DB_DIR': directory,
+        },
+    )
+    tests, failures = read_report(report)
+    if result.returncode and not failures:
+        # Упал сам pytest: ошибка сбора, конфигурации или базы.
+        failures.append(result.stdout + result.stderr)
+    return ShardResult(shard, result.returncode, tests, failures)
+
+
+def read_report(report):
+    """Число тестов и сообщения о падениях из отчёта JUnit XML."""
+    if not report.exists():
+        return 0, []
+    tests, failures = 0, []
+    for case in ElementTree.parse(report).iter('testcase'):
+        tests += 1
+        for problem in case:
+            if problem.tag in ('failure', 'error'):
+                failures.append(
+                    f'{case.get("classname")}::{case.get("name")}\n'
+                    f'{(problem.text or problem.get("message")).strip()}'
+                )
+    return tests, failures
+
+
+def report(project, results, elapsed):
+    """Сводка проекта; код возврата pytest, если что-то упало."""
+    tests, failures, status = 0, [], 0
+    for result in results:
+        tests += result.tests
+        failures += result.failures
+        status = status or result.returncode
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    print(
+        f'{project.name}: тестов {tests}, упало {len(failures)}, '
+        f'процессов {len(results)}, {elapsed:.1f} с',
+        file=sys.stderr,
+    )
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument(
+        '--impact', action='store_true',
+        help='Только тесты, затронутые изменёнными файлами.'
+    )
+    args = parser.parse_args()
+    workers = max(args.workers or 1, 1)
+    run_checks()
+    shards = []
+    for project in PROJECTS:
+        node_ids = collect(project, args.impact)
+        if node_ids is None:
+            fail(project.failure_message, 2)
+        shards += make_shards(project, node_ids, workers)
+    start = perf_counter()
+    with tempfile.TemporaryDirectory() as directory, \
+            ThreadPoolExecutor(workers) as executor:
+        results = list(executor.map(
+            lambda shard: run_shard(shard, directory), shards
+        ))
+    elapsed = perf_counter() - start
+    for project in PROJECTS:
+        status = report(project, [
+            result for result in results if result.shard.project is project
+        ], elapsed)
+        if status:
+            fail(project.failure_message, status)
+
+
+if __name__ == '__main__':
+    main()
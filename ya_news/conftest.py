@@ -0,0 +1,4 @@
+# Свои ключи командной строки pytest берёт только из conftest.py
+# в корне проекта, поэтому профиль тестов и выбор тестов по
+# изменениям подключаются здесь.
+pytest_plugins = ['yanews.test_profile', 'yanews.test_impact']
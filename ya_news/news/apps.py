@@ -5,3 +5,11 @@ class NewsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'news'
     verbose_name = 'Новости'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from yanews.sqlite_pragmas import apply_pragmas
+
+        from . import checks, signals  # noqa: F401
+        connection_created.connect(apply_pragmas)
@@ -0,0 +1,111 @@
+from time import time_ns
+
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils import timezone
+
+FRAGMENT_CACHE = 'fragments'
+FRAGMENT_PREFIX = 'template.cache.'
+GENERATION_KEY = 'news:fragment-generation'
+VERSION_KEY = 'news:fragment-version:{}'
+FEED_KEY = 'news:feed-changed'
+HITS_KEY = 'news:fragment-stats:hits'
+MISSES_KEY = 'news:fragment-stats:misses'
+
+
+class FragmentStatsMixin:
+    """Считает попадания и промахи тега {% cache %} в кеш."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, default, version)
+        if key.startswith(FRAGMENT_PREFIX):
+            self.count(HITS_KEY if value is not None else MISSES_KEY)
+        return value
+
+    def count(self, key):
+        if self.add(key, 1, timeout=None):
+            return
+        try:
+            self.incr(key)
+        except ValueError:
+            self.add(key, 1, timeout=None)
+
+
+class StatsLocMemCache(FragmentStatsMixin, LocMemCache):
+    pass
+
+
+class StatsFileBasedCache(FragmentStatsMixin, FileBasedCache):
+    pass
+
+
+def new_version():
+    return time_ns()
+
+
+def set_fragment_versions(news_list):
+    """
+    Проставляет новостям версию для ключей кеша фрагментов.
+
+    Версия состоит из общего поколения и версии самой новости, все они
+    читаются одним обращением к кешу. Потерянная версия заменяется новой,
+    поэтому вытеснение ключа приводит к промаху, а не к устаревшему HTML.
+    """
+    cache = caches[FRAGMENT_CACHE]
+    keys = {VERSION_KEY.format(news.pk): news for news in news_list}
+    versions = cache.get_many([GENERATION_KEY, *keys])
+    missing = [key for key in (GENERATION_KEY, *keys) if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, new_version(), timeout=None)
+        versions.update(cache.get_many(missing))
+    generation = versions[GENERATION_KEY]
+    for key, news in keys.items():
+        news.fragment_version = f'{generation}.{versions[key]}'
+
+
+def bump_fragment_version(news_pk):
+    """Делает недействительными фрагменты одной новости."""
+    caches[FRAGMENT_CACHE].set(
+        VERSION_KEY.format(news_pk), new_version(), timeout=None
+    )
+
+
+def bump_all_fragment_versions():
+    """Делает недействительными фрагменты всех новостей."""
+    caches[FRAGMENT_CACHE].set(GENERATION_KEY, new_version(), timeout=None)
+
+
+def feed_changed_at():
+    """
+    Время последнего изменения ленты, которого нет в News.last_activity.
+
+    Это удаление новостей и массовая загрузка. Потерянная отметка
+    заменяется текущим временем: вытеснение ключа даёт лишний полный
+    ответ, а не устаревший 304.
+    """
+    cache = caches[FRAGMENT_CACHE]
+    changed = cache.get(FEED_KEY)
+    if changed is None:
+        cache.add(FEED_KEY, timezone.now(), timeout=None)
+        changed = cache.get(FEED_KEY)
+    return changed
+
+
+def touch_feed():
+    """Отмечает изменение ленты новостей."""
+    caches[FRAGMENT_CACHE].set(FEED_KEY, timezone.now(), timeout=None)
+
+
+def fragment_stats():
+    """Счётчики попаданий и промахов кеша фрагментов."""
+    stats = caches[FRAGMENT_CACHE].get_many([HITS_KEY, MISSES_KEY])
+    return {
+        'hits': stats.get(HITS_KEY, 0),
+        'misses': stats.get(MISSES_KEY, 0),
+    }
+
+
+def reset_fragment_stats():
+    caches[FRAGMENT_CACHE].delete_many([HITS_KEY, MISSES_KEY])
@@ -0,0 +1,25 @@
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, Tags, register
+
+from .cache import FRAGMENT_CACHE
+
+
+@register(Tags.caches, deploy=True)
+def check_fragment_cache(app_configs, **kwargs):
+    """
+    Кеш фрагментов под нагрузкой должен быть общим для процессов.
+
+    В нём же хранятся версии фрагментов. В кеше в памяти процесса
+    новый комментарий меняет версию только в том процессе, который
+    его принял, а остальные продолжают отдавать устаревший HTML.
+    """
+    if not isinstance(caches[FRAGMENT_CACHE], LocMemCache):
+        return []
+    return [Error(
+        f'Кеш {FRAGMENT_CACHE!r} хранится в памяти процесса: версии '
+        'фрагментов не видны другим процессам сервера.',
+        hint='Используйте общий кеш, например '
+             'news.cache.StatsFileBasedCache, как в settings_production.',
+        id='news.E001',
+    )]
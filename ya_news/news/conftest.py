@@ -1,15 +1,30 @@
+import importlib.util
 from datetime import datetime, timedelta
 
 import pytest
+from django.conf import settings
+from django.core.cache import caches
 from django.urls import reverse
 from django.utils import timezone
 
+from news import factories
+from news.cache import FRAGMENT_CACHE
 from news.forms import BAD_WORDS
 from news.models import Comment, News
+from yanews.pytest_plugin import (  # noqa: F401
+    django_db_setup, pytest_terminal_summary, query_budgets
+)
 
 url_home = reverse('news:home')
 
 
+@pytest.fixture(autouse=True)
+def clear_fragment_cache():
+    '''Кеш фрагментов не переживает тест: id новостей переиспользуются.'''
+    yield
+    caches[FRAGMENT_CACHE].clear()
+
+
 @pytest.fixture
 def new():
     '''Создание новости.'''
@@ -32,18 +47,17 @@ def comment(author, new):
 
 @pytest.fixture
 def multi_comment(new, author):
-    '''Создает N-комментариев.'''
+    '''Создает N-комментариев одним запросом.'''
     today = timezone.now()
-    for index in range(2):
-        all_comments = Comment.objects.create(
+    return factories.insert_comments([
+        Comment(
             text=f'Текст{index}',
             author=author,
             news=new,
-            created=today
+            created=today + timedelta(hours=index),
         )
-        all_comments.created = today + timedelta(hours=index)
-        all_comments.save()
-    return all_comments
+        for index in range(2)
+    ])
 
 
 @pytest.fixture
@@ -74,6 +88,28 @@ def multi_news():
     return News.objects.bulk_create(all_news)
 
 
+@pytest.fixture
+def dataset(db):
+    '''Воспроизводимый набор: пользователи, новости и комментарии.'''
+    return factories.seed_dataset(users=5, news=30, comments=300, seed=0)
+
+
+@pytest.fixture
+def dataset_factory(db):
+    '''Создаёт набор данных нужного размера: dataset_factory(news=…).'''
+    return factories.seed_dataset
+
+
+@pytest.fixture(scope='session')
+def load_test():
+    '''Модуль load_test.py из корня репозитория.'''
+    path = settings.BASE_DIR.parent / 'load_test.py'
+    spec = importlib.util.spec_from_file_location('load_test', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
 @pytest.fixture
 def form_data(new):
     return {
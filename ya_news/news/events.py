@@ -0,0 +1,183 @@
+import asyncio
+import json
+import logging
+import socket
+import struct
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Наибольшая полезная нагрузка датаграммы UDP поверх IPv4.
+MAX_DATAGRAM = 65507
+# Последнее сообщение в очереди отключённого подписчика.
+OVERFLOW = None
+
+
+class LocalBackend:
+    """Рассылка внутри одного процесса."""
+    loop = None
+
+    def start(self, loop, deliver):
+        self.loop = loop
+        self.deliver = deliver
+
+    def publish(self, channel, message):
+        if self.loop is None or self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.deliver, channel, message)
+
+
+class MulticastBackend:
+    """
+    Локальная замена брокеру для нескольких процессов-воркеров.
+
+    Сообщение отправляется UDP-датаграммой в multicast-группу на
+    loopback-интерфейсе, каждый воркер получает её и раздаёт своим
+    подписчикам. Сообщение, которое не помещается в датаграмму,
+    заменяется его id: подписчик дочитает остальное из базы.
+    """
+
+    def __init__(self, group='239.255.43.21', port=8765):
+        self.address = (group, port)
+        self.sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sender.setsockopt(
+            socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1
+        )
+        self.sender.setsockopt(
+            socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 0
+        )
+        self.sender.setsockopt(
+            socket.IPPROTO_IP,
+            socket.IP_MULTICAST_IF,
+            socket.inet_aton('127.0.0.1'),
+        )
+
+    def start(self, loop, deliver):
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, 'SO_REUSEPORT'):
+            receiver.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        receiver.bind(('', self.address[1]))
+        receiver.setsockopt(
+            socket.IPPROTO_IP,
+            socket.IP_ADD_MEMBERSHIP,
+            struct.pack(
+                '4s4s',
+                socket.inet_aton(self.address[0]),
+                socket.inet_aton('127.0.0.1'),
+            ),
+        )
+        receiver.setblocking(False)
+
+        def on_datagram():
+            data = receiver.recv(MAX_DATAGRAM)
+            channel, message = json.loads(data)
+            deliver(channel, message)
+
+        loop.add_reader(receiver.fileno(), on_datagram)
+
+    def publish(self, channel, message):
+        data = json.dumps([channel, message]).encode()
+        if len(data) > MAX_DATAGRAM:
+            data = json.dumps([channel, {'id': message['id']}]).encode()
+        # Рассылка идёт после фиксации транзакции: данные уже
+        # сохранены, и сбой сети не должен превращать ответ в 500.
+        try:
+            self.sender.sendto(data, self.address)
+        except OSError:
+            logger.warning(
+                'Событие канала %s не отправлено', channel, exc_info=True
+            )
+
+
+class Hub:
+    """
+    Подписки на события по каналам.
+
+    Подписчик — это очередь asyncio, ожидающая сообщения без опроса БД.
+    Публиковать можно из любого потока: доставку в цикл событий берёт
+    на себя бэкенд.
+    """
+
+    def __init__(self, backend, queue_size=100):
+        self.backend = backend
+        self.queue_size = queue_size
+        self.subscribers = {}
+        self.loop = None
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self.loop = loop
+            self.backend.start(loop, self.deliver)
+
+    def deliver(self, channel, message):
+        for queue in self.subscribers.get(channel, ()):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                overflow(queue)
+
+    def publish(self, channel, message):
+        self.backend.publish(channel, message)
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        self.start()
+        queue = asyncio.Queue(self.queue_size)
+        self.subscribers.setdefault(channel, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self.subscribers[channel]
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[channel]
+
+
+def overflow(queue):
+    """
+    Отключает подписчика, который не успевает читать очередь.
+
+    Очередь заменяется одним OVERFLOW: поток событий закрывается,
+    а EventSource переподключается с Last-Event-ID и дочитывает
+    пропущенные комментарии из базы.
+    """
+    while not queue.empty():
+        queue.get_nowait()
+    queue.put_nowait(OVERFLOW)
+
+
+_hub = None
+
+
+def get_hub():
+    """Хаб процесса с бэкендом из settings.NEWS_EVENTS_BACKEND."""
+    global _hub
+    if _hub is None:
+        backend = import_string(settings.NEWS_EVENTS_BACKEND)
+        _hub = Hub(backend(**settings.NEWS_EVENTS_OPTIONS))
+    return _hub
+
+
+def comment_channel(news_id):
+    return f'news:{news_id}:comments'
+
+
+def comment_message(comment):
+    return {
+        'id': comment.pk,
+        'author': comment.author.get_username(),
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+    }
+
+
+def publish_comment(comment):
+    """Отправляет новый комментарий подписчикам его новости."""
+    get_hub().publish(
+        comment_channel(comment.news_id), comment_message(comment)
+    )
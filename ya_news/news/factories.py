@@ -0,0 +1,191 @@
+"""
+Массовое создание правдоподобных данных для тестов и нагрузки.
+
+Строки вставляются пачками через yacommon.bulk. Одинаковые seed и
+опорное время now дают одинаковые данные.
+"""
+import random
+from collections import Counter, namedtuple
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from yacommon.bulk import (
+    BATCH_SIZE, batches, insert_objects, insert_rows, last_id, new_ids,
+    page_cache, text_pool,
+)
+
+from .cache import touch_feed
+from .models import Comment, News
+
+User = get_user_model()
+
+WORDS = (
+    'город', 'новость', 'жители', 'сегодня', 'утром', 'власти', 'решение',
+    'проект', 'школа', 'погода', 'дорога', 'парк', 'выставка', 'концерт',
+    'матч', 'команда', 'победа', 'ремонт', 'мост', 'транспорт', 'цены',
+    'рынок', 'врачи', 'больница', 'студенты', 'конкурс', 'фестиваль',
+    'район', 'строительство', 'открытие', 'отличный', 'новый', 'старый',
+    'большой', 'важный', 'вечером', 'неделя', 'месяц', 'планы', 'итоги',
+)
+
+Dataset = namedtuple('Dataset', ('users', 'news', 'comments'))
+
+
+def utc(value):
+    """Время в том виде, в каком Django хранит его в SQLite."""
+    return value.astimezone(dt_timezone.utc).replace(tzinfo=None)
+
+
+def day_start(date):
+    return utc(timezone.make_aware(datetime.combine(date, time())))
+
+
+def create_users(count, seed=0, prefix='user'):
+    """
+    Пользователи prefix-seed-0, prefix-seed-1, … без пароля для входа.
+
+    Пользователей обычно немного, поэтому это обычный bulk_create.
+    Возвращает их id.
+    """
+    before = last_id(User)
+    password = make_password(None)
+    for batch in batches(range(count), BATCH_SIZE):
+        User.objects.bulk_create(
+            User(username=f'{prefix}-{seed}-{index}', password=password)
+            for index in batch
+        )
+    return new_ids(User, before)
+
+
+def create_news(count, seed=0, now=None, days=365):
+    """
+    Новости с датами, разбросанными по последним days дням.
+
+    Возвращает их id.
+    """
+    rnd = random.Random(f'news-{seed}')
+    today = (now or timezone.now()).date()
+    titles = [title[:50] for title in text_pool(rnd, WORDS, 2, 5)]
+    texts = text_pool(rnd, WORDS, 20, 80)
+    before = last_id(News)
+
+    def rows():
+        for _ in range(count):
+            date = today - timedelta(days=rnd.randrange(days))
+            published = str(day_start(date))
+            yield (
+                rnd.choice(titles), rnd.choice(texts), str(date), 0,
+                published, published,
+            )
+
+    insert_rows(
+        News,
+        ('title', 'text', 'date', 'comment_count', 'updated',
+         'last_activity'),
+        rows(),
+    )
+    # Время публикации новых новостей — в прошлом, и наибольшая
+    # last_activity ленты может не измениться.
+    touch_feed()
+    return new_ids(News, before)
+
+
+def create_comments(news_ids, author_ids, count, seed=0, now=None):
+    """
+    Комментарии к новостям news_ids от авторов author_ids.
+
+    Обсуждение распределено неравномерно, как в жизни: немногие
+    новости собирают большую часть комментариев (закон Ципфа).
+    Время комментария — между началом дня новости и now. Счётчики
+    и активность новостей после вставки обновляет refresh_news_stats.
+    """
+    rnd = random.Random(f'comments-{seed}')
+    now = utc(now or timezone.now())
+    ranks = list(range(1, len(news_ids) + 1))
+    rnd.shuffle(ranks)
+    weights = list(accumulate(1 / rank for rank in ranks))
+    per_news = Counter(rnd.choices(news_ids, cum_weights=weights, k=count))
+    texts = text_pool(rnd, WORDS, 3, 30)
+    dates = dict(news_range(news_ids).values_list('pk', 'date'))
+
+    def rows():
+        for news_id, total in sorted(per_news.items()):
+            start = day_start(dates[news_id])
+            span = max((now - start).total_seconds(), 0)
+            for _ in range(total):
+                created = start + timedelta(seconds=rnd.random() * span)
+                yield (
+                    news_id, rnd.choice(author_ids), rnd.choice(texts),
+                    str(created),
+                )
+
+    insert_rows(Comment, ('news', 'author', 'text', 'created'), rows())
+    return count
+
+
+def news_range(news_ids):
+    # Диапазон вместо IN: список из миллиона id не влезет в запрос.
+    return News.objects.filter(pk__range=(min(news_ids), max(news_ids)))
+
+
+def refresh_news_stats(news):
+    """
+    Счётчик и последняя активность новостей по их комментариям.
+
+    Активность не уменьшается: от неё зависят ETag и Last-Modified
+    уже отданных страниц.
+    """
+    comments = Comment.objects.filter(news=OuterRef('pk')).order_by()
+    news.update(
+        comment_count=Coalesce(Subquery(
+            comments.values('news').annotate(total=Count('pk'))
+            .values('total')
+        ), 0),
+    )
+    news.update(last_activity=Greatest(Coalesce(
+        Subquery(comments.order_by('-created').values('created')[:1]),
+        F('updated'),
+    ), F('last_activity')))
+    touch_feed()
+
+
+def insert_comments(comments):
+    """
+    Вставляет готовые комментарии с их собственным временем created.
+
+    Для фикстур, которым важны конкретные тексты и время. Новости
+    получают комментарии задним числом, поэтому их активность — текущее
+    время, как при обычном добавлении комментария.
+    """
+    insert_objects(comments, ('news', 'author', 'text', 'created'))
+    news = News.objects.filter(
+        pk__in={comment.news_id for comment in comments}
+    )
+    refresh_news_stats(news)
+    news.update(last_activity=timezone.now())
+    return comments
+
+
+def seed_dataset(users=10, news=100, comments=1000, seed=0, now=None):
+    """
+    Пользователи, новости и комментарии к ним в одной транзакции.
+
+    Счётчики и активность новостей пересчитываются после всех
+    вставок, в том числе для новостей без комментариев.
+    """
+    now = now or timezone.now()
+    with page_cache(), transaction.atomic():
+        user_ids = create_users(users, seed)
+        news_ids = create_news(news, seed, now)
+        if not news_ids:
+            return Dataset(user_ids, news_ids, 0)
+        create_comments(news_ids, user_ids, comments, seed, now)
+        refresh_news_stats(news_range(news_ids))
+    return Dataset(user_ids, news_ids, comments)
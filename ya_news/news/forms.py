@@ -1,12 +1,14 @@
+from django import forms
 from django.forms import ModelForm
 from django.core.exceptions import ValidationError
 
 from .models import Comment
+from .moderation import get_matcher
 
+# Словарь по умолчанию, если в настройках не задан BAD_WORDS_FILE.
 BAD_WORDS = (
     'редиска',
     'негодяй',
-    # Дополните список на своё усмотрение.
 )
 WARNING = 'Не ругайтесь!'
 
@@ -20,8 +22,11 @@ class CommentForm(ModelForm):
     def clean_text(self):
         """Не позволяем ругаться в комментариях."""
         text = self.cleaned_data['text']
-        lowered_text = text.lower()
-        for word in BAD_WORDS:
-            if word in lowered_text:
-                raise ValidationError(WARNING)
+        if get_matcher(BAD_WORDS).search(text):
+            raise ValidationError(WARNING)
         return text
+
+
+class SearchForm(forms.Form):
+    """Поиск по заголовкам и текстам новостей."""
+    q = forms.CharField(label='Поиск', max_length=100)
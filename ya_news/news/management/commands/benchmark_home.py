@@ -0,0 +1,73 @@
+from statistics import median
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from news.models import Comment, News
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время ответа главной страницы при росте числа '
+        'комментариев. Данные создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--volumes', type=int, nargs='+', default=[0, 100, 1000, 5000],
+            help='Число комментариев на каждую новость для каждого замера.'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Сколько раз запрашивать страницу на каждом шаге.'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.run(options['volumes'], options['repeat'])
+            transaction.set_rollback(True)
+
+    def run(self, volumes, repeat):
+        author = User.objects.create(username='benchmark_home')
+        News.objects.bulk_create(
+            News(title=f'Новость {index}', text='Просто текст.')
+            for index in range(settings.NEWS_COUNT_ON_HOME_PAGE)
+        )
+        all_news = list(News.objects.all()[:settings.NEWS_COUNT_ON_HOME_PAGE])
+        client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        url = reverse('news:home')
+        total = 0
+        for volume in sorted(volumes):
+            added = volume - total
+            for news in all_news:
+                Comment.objects.bulk_create(
+                    (
+                        Comment(news=news, author=author, text='Текст')
+                        for _ in range(added)
+                    ),
+                    batch_size=500,
+                )
+            News.objects.filter(
+                pk__in=[news.pk for news in all_news]
+            ).update(comment_count=F('comment_count') + added)
+            total = volume
+            timings = []
+            for _ in range(repeat):
+                with CaptureQueriesContext(connection) as queries:
+                    start = perf_counter()
+                    client.get(url)
+                    timings.append(perf_counter() - start)
+            self.stdout.write(
+                f'комментариев на новость: {volume:>7} | '
+                f'медиана: {median(timings) * 1000:7.2f} мс | '
+                f'запросов: {len(queries)}'
+            )
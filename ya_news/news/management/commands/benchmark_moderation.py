@@ -0,0 +1,60 @@
+import random
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from news.moderation import WordMatcher
+
+ALPHABET = 'абвгдеёжзийклмнопрстуфхцчшщъыьэюя'
+
+
+def naive_search(words, text):
+    lowered_text = text.lower()
+    return any(word in lowered_text for word in words)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает поиск запрещённых слов перебором и автоматом '
+        'Ахо — Корасик на длинных комментариях и больших словарях.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[10, 1000, 10000],
+            help='Размеры словаря для замеров.'
+        )
+        parser.add_argument(
+            '--text-length', type=int, default=10000,
+            help='Длина проверяемого комментария в символах.'
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def measure(self, search, text, repeat):
+        start = perf_counter()
+        for _ in range(repeat):
+            search(text)
+        return (perf_counter() - start) / repeat * 1000
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['seed'])
+        text = ''.join(
+            rnd.choice(ALPHABET + ' ') for _ in range(options['text_length'])
+        )
+        for size in options['sizes']:
+            words = {
+                ''.join(rnd.choice(ALPHABET) for _ in range(8))
+                for _ in range(size)
+            }
+            start = perf_counter()
+            matcher = WordMatcher(words)
+            build = (perf_counter() - start) * 1000
+            naive = self.measure(
+                lambda text: naive_search(words, text), text, options['repeat']
+            )
+            compiled = self.measure(matcher.search, text, options['repeat'])
+            self.stdout.write(
+                f'слов: {size:>6} | перебор: {naive:9.2f} мс | '
+                f'автомат: {compiled:7.2f} мс | построение: {build:8.2f} мс'
+            )
@@ -0,0 +1,98 @@
+import random
+from itertools import accumulate
+from statistics import median
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from news.models import News
+from news.search import search_news
+
+SYLLABLES = (
+    'ка', 'ро', 'ми', 'ту', 'не', 'ло', 'за', 'ви', 'ст', 'пра',
+    'мо', 'ду', 'ре', 'ша', 'ген', 'тор', 'вал', 'ник', 'ус', 'ом',
+)
+
+
+def make_vocabulary(rnd, size):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rnd.choices(SYLLABLES, k=rnd.randint(2, 4))))
+    return sorted(words)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает поиск новостей через FTS5 с фильтром icontains. '
+        'Данные создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--news', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['seed'])
+        vocabulary = make_vocabulary(rnd, 5000)
+        with transaction.atomic():
+            self.seed(options['news'], rnd, vocabulary)
+            queries = (
+                vocabulary[10],
+                vocabulary[3000],
+                f'{vocabulary[20]} {vocabulary[400]}',
+                'несуществующее',
+            )
+            for query in queries:
+                self.compare(query, options['repeat'])
+            transaction.set_rollback(True)
+
+    def seed(self, count, rnd, vocabulary):
+        # Частоты слов убывают по закону Ципфа, как в живом тексте.
+        weights = list(accumulate(
+            1 / rank for rank in range(1, len(vocabulary) + 1)
+        ))
+
+        def words(k):
+            return ' '.join(rnd.choices(vocabulary, cum_weights=weights, k=k))
+
+        start = perf_counter()
+        News.objects.bulk_create(
+            (
+                News(title=words(4).capitalize()[:50], text=words(60))
+                for _ in range(count)
+            ),
+            batch_size=5000,
+        )
+        self.stdout.write(
+            f'Создано новостей: {count} за {perf_counter() - start:.1f} с'
+        )
+
+    def measure(self, run, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = perf_counter()
+            run()
+            timings.append(perf_counter() - start)
+        return median(timings) * 1000
+
+    def compare(self, query, repeat):
+        words = query.split()
+        condition = Q()
+        for word in words:
+            condition &= Q(title__icontains=word) | Q(text__icontains=word)
+
+        def icontains():
+            return list(
+                News.objects.filter(condition).order_by('-date', '-id')[:10]
+            )
+
+        def fts():
+            return list(search_news(query, per_page=10))
+
+        self.stdout.write(
+            f'«{query}»: icontains {self.measure(icontains, repeat):8.2f} мс'
+            f' | FTS5 {self.measure(fts, repeat):8.2f} мс'
+        )
@@ -0,0 +1,81 @@
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.urls import reverse
+
+from news import factories
+from news.models import Comment, News
+from yacommon.view_benchmark import BenchmarkCommand, Scenario, url_names
+
+User = get_user_model()
+
+
+class Command(BenchmarkCommand):
+    help = (
+        'Замеряет все URL проекта на сгенерированных данных: p50/p95/p99, '
+        'число SQL-запросов и пик памяти. Сохраняет результаты в JSON '
+        '(--save) и сравнивает с ними (--compare). Данные откатываются.'
+    )
+    dataset_options = ('users', 'news', 'comments', 'seed')
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--news', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=1000000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def seed(self, options):
+        factories.seed_dataset(
+            options['users'], options['news'], options['comments'],
+            options['seed'],
+        )
+        # Худший случай: новость с наибольшим числом комментариев.
+        self.news = News.objects.order_by('-comment_count', 'pk').first()
+        self.comment = Comment.objects.filter(news=self.news).first()
+        self.author = self.comment.author
+        self.client = Client(HTTP_HOST='localhost')
+        self.client.force_login(self.author)
+        self.logout_client = Client(HTTP_HOST='localhost')
+
+    def url_args(self, name):
+        return {
+            'news:detail': (self.news.pk,),
+            'news:comments': (self.news.pk,),
+            'news:events': (self.news.pk,),
+            'news:edit': (self.comment.pk,),
+            'news:delete': (self.comment.pk,),
+        }.get(name, ())
+
+    def login(self):
+        self.logout_client.force_login(self.author)
+
+    def skipped(self):
+        return {
+            'news:events': 'поток обслуживает ASGI-приложение news.sse, '
+                           'по WSGI маршрут отвечает 501',
+        }
+
+    def scenarios(self):
+        for name in url_names():
+            if name in self.skipped():
+                continue
+            if name == 'users:logout':
+                # Выход завершает сессию: у него свой клиент, который
+                # входит снова перед каждым запросом.
+                yield Scenario(
+                    name, 'get', reverse(name), prepare=self.login,
+                    client=self.logout_client,
+                )
+                continue
+            yield Scenario(
+                name, 'get', reverse(name, args=self.url_args(name))
+            )
+        yield Scenario(
+            'news:detail POST', 'post',
+            reverse('news:detail', args=(self.news.pk,)),
+            {'text': 'Комментарий из замера'},
+        )
+        yield Scenario(
+            'news:search ?q', 'get', reverse('news:search'),
+            {'q': factories.WORDS[0]},
+        )
@@ -0,0 +1,53 @@
+import gzip
+import json
+import sys
+
+from django.core.management.base import BaseCommand
+
+from news.models import Comment, News
+
+
+def open_output(path):
+    if path == '-':
+        return sys.stdout
+    if path.endswith('.gz'):
+        return gzip.open(path, 'wt', encoding='utf-8')
+    return open(path, 'w', encoding='utf-8')
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает новости и комментарии в JSON Lines: '
+        'одна запись на строку, сначала новости, затем комментарии.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output', nargs='?', default='-',
+            help='Файл для выгрузки, .gz сжимается; по умолчанию stdout.'
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        news = News.objects.order_by('pk').values(
+            'id', 'title', 'text', 'date'
+        )
+        comments = Comment.objects.order_by('pk').values(
+            'id', 'news_id', 'author__username', 'text', 'created'
+        )
+        output = open_output(options['output'])
+        total = 0
+        try:
+            for model, queryset in (('news', news), ('comment', comments)):
+                for row in queryset.iterator(chunk_size=chunk_size):
+                    row['model'] = model
+                    for key in ('date', 'created'):
+                        if key in row:
+                            row[key] = row[key].isoformat()
+                    output.write(json.dumps(row, ensure_ascii=False) + '\n')
+                    total += 1
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        self.stderr.write(self.style.SUCCESS(f'Выгружено записей: {total}'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from news.cache import fragment_stats, reset_fragment_stats
+
+
+class Command(BaseCommand):
+    help = 'Показывает попадания и промахи кеша фрагментов шаблонов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Обнулить счётчики после вывода.'
+        )
+
+    def handle(self, *args, **options):
+        stats = fragment_stats()
+        total = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / total * 100 if total else 0
+        self.stdout.write(
+            f'Попаданий: {stats["hits"]}, промахов: {stats["misses"]}, '
+            f'доля попаданий: {ratio:.1f}%'
+        )
+        if options['reset']:
+            reset_fragment_stats()
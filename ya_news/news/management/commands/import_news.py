@@ -0,0 +1,187 @@
+import gzip
+import json
+import sys
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from news.models import Comment, News
+from yacommon.bulk import batches, insert_objects
+
+User = get_user_model()
+
+
+# Поля записей каждой модели в файле export_news.
+FIELDS = {
+    'news': ('id', 'title', 'text', 'date'),
+    'comment': ('id', 'news_id', 'author__username', 'text', 'created'),
+}
+
+
+def open_input(path):
+    if path == '-':
+        return sys.stdin
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает новости и комментарии из JSON Lines, созданного '
+        'export_news. Файл читается построчно, записи вставляются '
+        'пачками, каждая пачка — в своей транзакции.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input', nargs='?', default='-',
+            help='Файл для загрузки, .gz распаковывается; по умолчанию stdin.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--ignore-conflicts', action='store_true',
+            help='Пропускать записи с уже существующими id.'
+        )
+
+    def handle(self, *args, **options):
+        self.author_ids = {}
+        self.ignore_conflicts = options['ignore_conflicts']
+        self.unknown = Counter()
+        source = open_input(options['input'])
+        imported = 0
+        try:
+            records = (
+                (number, self.parse(number, line))
+                for number, line in enumerate(source, 1) if line.strip()
+            )
+            for batch in batches(records, options['batch_size']):
+                try:
+                    with transaction.atomic():
+                        imported += self.import_batch(batch)
+                except IntegrityError as error:
+                    raise CommandError(
+                        f'Строки {batch[0][0]}–{batch[-1][0]} не загружены: '
+                        f'{error}. Загружено записей до них: {imported}.'
+                    )
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            # Счётчики нужны и пачкам, загруженным до ошибки.
+            if imported:
+                call_command('rebuild_comment_counts', stdout=self.stderr)
+        for model, count in sorted(self.unknown.items()):
+            self.stderr.write(self.style.WARNING(
+                f'Пропущено записей неизвестной модели {model!r}: {count}'
+            ))
+        self.stderr.write(self.style.SUCCESS(f'Загружено записей: {imported}'))
+
+    def parse(self, number, line):
+        """Запись строки number; ошибки — с номером строки."""
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            raise CommandError(f'Строка {number}: некорректный JSON: {error}')
+        if not isinstance(row, dict) or 'model' not in row:
+            raise CommandError(f'Строка {number}: в записи нет поля model.')
+        missing = [
+            field for field in FIELDS.get(row['model'], ()) if field not in row
+        ]
+        if missing:
+            raise CommandError(
+                f'Строка {number}: в записи нет полей {", ".join(missing)}.'
+            )
+        return row
+
+    def import_batch(self, batch):
+        """
+        Вставляет пачку пар (номер строки, запись).
+
+        Записи других моделей пропускаются и считаются. Комментарий
+        к новости, которой нет ни в базе, ни в пачке, — ошибка
+        с номером строки.
+        """
+        rows = {model: [] for model in FIELDS}
+        for number, row in batch:
+            if row['model'] in rows:
+                rows[row['model']].append((number, row))
+            else:
+                self.unknown[row['model']] += 1
+        news = [
+            News(
+                id=row['id'],
+                title=row['title'],
+                text=row['text'],
+                date=row['date'],
+            )
+            for _, row in rows['news']
+        ]
+        self.check_news(rows['comment'], {item.id for item in news})
+        self.resolve_authors(
+            row['author__username'] for _, row in rows['comment']
+        )
+        comments = [
+            Comment(
+                id=row['id'],
+                news_id=row['news_id'],
+                author_id=self.author_ids[row['author__username']],
+                text=row['text'],
+                created=row['created'],
+            )
+            for _, row in rows['comment']
+        ]
+        News.objects.bulk_create(
+            news, ignore_conflicts=self.ignore_conflicts
+        )
+        # Время комментариев берётся из файла, а не из auto_now_add.
+        insert_objects(
+            comments, ('id', 'news', 'author', 'text', 'created'),
+            ignore_conflicts=self.ignore_conflicts,
+        )
+        return len(news) + len(comments)
+
+    def check_news(self, comment_rows, batch_news):
+        """Новости комментариев есть в базе или в пачке: один запрос."""
+        wanted = {row['news_id'] for _, row in comment_rows} - batch_news
+        if not wanted:
+            return
+        missing = wanted - set(
+            News.objects.filter(pk__in=wanted).values_list('pk', flat=True)
+        )
+        for number, row in comment_rows:
+            if row['news_id'] in missing:
+                raise CommandError(
+                    f'Строка {number}: нет новости {row["news_id"]}.'
+                )
+
+    def resolve_authors(self, usernames):
+        """
+        Дополняет карту username → id одним запросом на пачку.
+
+        Отсутствующие пользователи создаются без пароля.
+        """
+        missing = set(usernames) - self.author_ids.keys()
+        if not missing:
+            return
+        self.author_ids.update(
+            User.objects.filter(username__in=missing).values_list(
+                'username', 'pk'
+            )
+        )
+        missing -= self.author_ids.keys()
+        if not missing:
+            return
+        new_users = []
+        for username in missing:
+            user = User(username=username)
+            user.set_unusable_password()
+            new_users.append(user)
+        User.objects.bulk_create(new_users)
+        self.author_ids.update(
+            User.objects.filter(username__in=missing).values_list(
+                'username', 'pk'
+            )
+        )
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from news.forms import BAD_WORDS
+from news.models import Comment
+from news.moderation import get_matcher
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет существующие комментарии по словарю запрещённых слов '
+        'и при необходимости удаляет нарушающие правила.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько комментариев читать за один запрос.'
+        )
+        parser.add_argument(
+            '--delete', action='store_true',
+            help='Удалить найденные комментарии.'
+        )
+
+    def handle(self, *args, **options):
+        matcher = get_matcher(BAD_WORDS)
+        batch_size = options['batch_size']
+        last_id = 0
+        checked = found = 0
+        while True:
+            batch = list(
+                Comment.objects.filter(pk__gt=last_id)
+                .order_by('pk')
+                .values_list('pk', 'text')[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            checked += len(batch)
+            bad_ids = [pk for pk, text in batch if matcher.search(text)]
+            found += len(bad_ids)
+            for pk in bad_ids:
+                self.stdout.write(f'Комментарий {pk} нарушает правила.')
+            if bad_ids and options['delete']:
+                Comment.objects.filter(pk__in=bad_ids).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено: {checked}, нарушений: {found}.'
+        ))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from news.cache import bump_all_fragment_versions
+from news.models import Comment, News
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает News.comment_count по таблице комментариев.'
+
+    def handle(self, *args, **options):
+        comments = Comment.objects.filter(
+            news=OuterRef('pk')
+        ).order_by().values('news').annotate(total=Count('pk')).values('total')
+        total = Coalesce(Subquery(comments, output_field=IntegerField()), 0)
+        with transaction.atomic():
+            # Новости с другим числом комментариев изменились: их
+            # активность входит в ETag и Last-Modified страниц.
+            updated = News.objects.exclude(comment_count=total).update(
+                comment_count=total, last_activity=timezone.now()
+            )
+        bump_all_fragment_versions()
+        self.stdout.write(
+            self.style.SUCCESS(f'Исправлено счётчиков: {updated}')
+        )
@@ -0,0 +1,31 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from news.factories import seed_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу пользователями, новостями и комментариями '
+        'через bulk_create. Одинаковый --seed даёт одинаковые данные.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--news', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        start = perf_counter()
+        dataset = seed_dataset(
+            options['users'], options['news'], options['comments'],
+            options['seed'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(dataset.users)}, '
+            f'новостей: {len(dataset.news)}, '
+            f'комментариев: {dataset.comments} '
+            f'за {perf_counter() - start:.1f} с'
+        ))
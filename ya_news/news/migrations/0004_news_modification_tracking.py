@@ -0,0 +1,23 @@
+# Generated by Django 3.2.15 on 2026-10-18 20:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0003_news_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='news',
+            name='last_activity',
+            field=models.DateTimeField(auto_now=True, db_index=True, help_text='Изменение новости или её комментариев.', verbose_name='Последняя активность'),
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, verbose_name='Изменено'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations
+
+CREATE_INDEX = """
+CREATE VIRTUAL TABLE news_news_fts USING fts5(
+    title,
+    text,
+    content='news_news',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+INSERT INTO news_news_fts(news_news_fts, rank) VALUES('rank', 'bm25(10.0, 1.0)');
+INSERT INTO news_news_fts(news_news_fts) VALUES('rebuild');
+CREATE TRIGGER news_news_fts_insert AFTER INSERT ON news_news BEGIN
+    INSERT INTO news_news_fts(rowid, title, text)
+    VALUES (new.id, new.title, new.text);
+END;
+CREATE TRIGGER news_news_fts_delete AFTER DELETE ON news_news BEGIN
+    INSERT INTO news_news_fts(news_news_fts, rowid, title, text)
+    VALUES ('delete', old.id, old.title, old.text);
+END;
+CREATE TRIGGER news_news_fts_update AFTER UPDATE OF title, text ON news_news BEGIN
+    INSERT INTO news_news_fts(news_news_fts, rowid, title, text)
+    VALUES ('delete', old.id, old.title, old.text);
+    INSERT INTO news_news_fts(rowid, title, text)
+    VALUES (new.id, new.title, new.text);
+END;
+"""
+
+DROP_INDEX = """
+DROP TRIGGER news_news_fts_update;
+DROP TRIGGER news_news_fts_delete;
+DROP TRIGGER news_news_fts_insert;
+DROP TABLE news_news_fts;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0004_news_modification_tracking'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_INDEX, DROP_INDEX),
+    ]
@@ -8,9 +8,22 @@ class News(models.Model):
     title = models.CharField(max_length=50)
     text = models.TextField()
     date = models.DateField(default=datetime.today)
+    comment_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False,
+    )
+    updated = models.DateTimeField('Изменено', auto_now=True)
+    last_activity = models.DateTimeField(
+        'Последняя активность',
+        auto_now=True,
+        db_index=True,
+        help_text='Изменение новости или её комментариев.',
+    )
 
     class Meta:
         ordering = ('-date',)
+        indexes = (models.Index(fields=('date',)),)
         verbose_name_plural = 'Новости'
         verbose_name = 'Новость'
 
@@ -32,6 +45,7 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('created',)
+        indexes = (models.Index(fields=('news', 'created')),)
 
     def __str__(self):
         return self.text[:50]
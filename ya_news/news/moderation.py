@@ -0,0 +1,136 @@
+import logging
+import os
+from collections import deque
+from threading import Lock
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class WordMatcher:
+    """
+    Автомат Ахо — Корасик для поиска запрещённых слов.
+
+    Строится один раз по словарю, после чего проверка текста занимает
+    один проход по его символам независимо от размера словаря.
+    """
+
+    def __init__(self, words):
+        self.transitions = [{}]
+        self.fail = [0]
+        self.terminal = [False]
+        for word in words:
+            self._add(word.lower())
+        self._link()
+
+    def _add(self, word):
+        if not word:
+            return
+        state = 0
+        for char in word:
+            next_state = self.transitions[state].get(char)
+            if next_state is None:
+                next_state = len(self.transitions)
+                self.transitions.append({})
+                self.fail.append(0)
+                self.terminal.append(False)
+                self.transitions[state][char] = next_state
+            state = next_state
+        self.terminal[state] = True
+
+    def _link(self):
+        queue = deque(self.transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.transitions[state].items():
+                queue.append(next_state)
+                fail = self.fail[state]
+                while fail and char not in self.transitions[fail]:
+                    fail = self.fail[fail]
+                self.fail[next_state] = self.transitions[fail].get(char, 0)
+                if self.terminal[self.fail[next_state]]:
+                    self.terminal[next_state] = True
+
+    def search(self, text):
+        """Есть ли в тексте хотя бы одно слово из словаря."""
+        transitions, fail, terminal = (
+            self.transitions, self.fail, self.terminal
+        )
+        state = 0
+        for char in text.lower():
+            while state and char not in transitions[state]:
+                state = fail[state]
+            state = transitions[state].get(char, 0)
+            if terminal[state]:
+                return True
+        return False
+
+
+def read_words(path):
+    """Читает словарь: одно слово на строку, # — комментарий."""
+    with open(path, encoding='utf-8') as words_file:
+        for line in words_file:
+            word = line.split('#', 1)[0].strip()
+            if word:
+                yield word
+
+
+_cache = {}
+_lock = Lock()
+
+
+def get_matcher(default_words=()):
+    """
+    Возвращает автомат для словаря из settings.BAD_WORDS_FILE.
+
+    Автомат кешируется в процессе и перестраивается, если файл изменился.
+    Без настроенного файла используется словарь default_words, он же —
+    если файл недоступен и прежнего автомата нет.
+    """
+    path = getattr(settings, 'BAD_WORDS_FILE', None)
+    if path is None:
+        key, version = tuple(default_words), None
+    else:
+        key = os.fspath(path)
+        try:
+            version = os.stat(path).st_mtime_ns
+        except OSError as error:
+            return fallback_matcher(key, default_words, error)
+    cached = _cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    failure = None
+    with _lock:
+        cached = _cache.get(key)
+        if cached is None or cached[0] != version:
+            try:
+                words = key if path is None else list(read_words(path))
+            except OSError as error:
+                failure = error
+            else:
+                cached = (version, WordMatcher(words))
+                _cache[key] = cached
+    if failure is not None:
+        return fallback_matcher(key, default_words, failure)
+    return cached[1]
+
+
+def fallback_matcher(key, default_words, error):
+    """
+    Автомат на время, пока файл словаря недоступен: удалён или заменяется.
+
+    Берётся прежний автомат этого файла, без него — default_words.
+    Предупреждение пишется один раз: версия None в кеше отмечает, что
+    файла нет, и появившийся файл будет прочитан заново.
+    """
+    with _lock:
+        cached = _cache.get(key)
+        if cached is None or cached[0] is not None:
+            logger.warning(
+                'Словарь %s недоступен (%s), используется %s', key, error,
+                'прежний' if cached else 'словарь по умолчанию',
+            )
+            matcher = cached[1] if cached else WordMatcher(default_words)
+            cached = _cache[key] = (None, matcher)
+    return cached[1]
@@ -0,0 +1,106 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+
+class KeysetPage:
+    """Страница, полученная постраничным выводом по ключу."""
+
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def encode_values(values):
+    """Кодирует значения ключа сортировки в непрозрачный курсор."""
+    return urlsafe_base64_encode(json.dumps(values).encode())
+
+
+def decode_values(cursor, length):
+    """Восстанавливает из курсора список из length значений."""
+    try:
+        values = json.loads(force_str(urlsafe_base64_decode(cursor)))
+    except ValueError:
+        raise Http404('Неверный курсор страницы.')
+    if not isinstance(values, list) or len(values) != length:
+        raise Http404('Неверный курсор страницы.')
+    return values
+
+
+def encode_cursor(obj, ordering):
+    """Кодирует значения полей сортировки объекта в курсор."""
+    return encode_values([
+        obj._meta.get_field(name.lstrip('-')).value_to_string(obj)
+        for name in ordering
+    ])
+
+
+def decode_cursor(cursor, model, ordering):
+    """Восстанавливает значения полей сортировки из курсора."""
+    values = decode_values(cursor, len(ordering))
+    try:
+        return [
+            model._meta.get_field(name.lstrip('-')).to_python(value)
+            for name, value in zip(ordering, values)
+        ]
+    except ValidationError:
+        raise Http404('Неверный курсор страницы.')
+
+
+def after(ordering, values):
+    """Условие «строго после» для кортежа полей сортировки."""
+    condition = Q()
+    equal = {}
+    for name, value in zip(ordering, values):
+        lookup = 'lt' if name.startswith('-') else 'gt'
+        name = name.lstrip('-')
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return condition
+
+
+def paginate(queryset, ordering, cursor, per_page):
+    """
+    Возвращает страницу после курсора.
+
+    В отличие от OFFSET, стоимость запроса не зависит от номера страницы:
+    фильтр по ключу сортировки сразу отсекает уже показанные строки.
+    """
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(cursor, queryset.model, ordering)
+        queryset = queryset.filter(after(ordering, values))
+    object_list = list(queryset[:per_page + 1])
+    next_cursor = None
+    if len(object_list) > per_page:
+        object_list = object_list[:per_page]
+        next_cursor = encode_cursor(object_list[-1], ordering)
+    return KeysetPage(object_list, next_cursor)
+
+
+class KeysetPaginationMixin:
+    """Подменяет постраничный вывод ListView на вывод по ключу."""
+    keyset_ordering = ()
+    cursor_kwarg = 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        page = paginate(
+            queryset,
+            self.keyset_ordering,
+            self.request.GET.get(self.cursor_kwarg),
+            page_size,
+        )
+        return None, page, page.object_list, page.has_next()
@@ -1,9 +1,14 @@
 import pytest
 from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from news.cache import fragment_stats, reset_fragment_stats
+from news.checks import check_fragment_cache
 from news.conftest import url_home
 from news.forms import CommentForm
+from news.models import Comment, News
 
 
 @pytest.mark.django_db
@@ -28,6 +33,20 @@ def test_news_order(client):
     assert all_dates == sorted_dates
 
 
+@pytest.mark.django_db
+@pytest.mark.usefixtures('multi_news', 'multi_comment')
+def test_home_page_list_and_validator_queries(client, new):
+    '''Главная — запрос валидатора и один запрос списка без комментариев.'''
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url_home)
+    # Время изменения ленты для ETag и Last-Modified читается до
+    # представления: на условный запрос ответ 304 без списка.
+    validator, news_list = (query['sql'] for query in queries)
+    assert 'ORDER BY "news_news"."last_activity" DESC' in validator
+    assert 'news_comment' not in news_list
+    assert 'Комментариев: 2' in response.content.decode()
+
+
 @pytest.mark.django_db
 @pytest.mark.usefixtures('multi_comment')
 def test_comments_order(admin_client, new):
@@ -57,3 +76,119 @@ def test_client_has_form(parametrized_client, new_in_list, new):
     assert ('form' in response.context) is new_in_list
     if new_in_list:
         assert isinstance(response.context['form'], CommentForm)
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('multi_news')
+def test_news_next_page(client):
+    '''Курсор ведёт на следующую страницу новостей без повторов.'''
+    first_page = client.get(url_home).context['page_obj']
+    assert first_page.has_next()
+    response = client.get(url_home, {'cursor': first_page.next_cursor})
+    next_page = response.context['object_list']
+    assert len(next_page) == 12 - settings.NEWS_COUNT_ON_HOME_PAGE
+    assert not set(first_page.object_list) & set(next_page)
+    assert not response.context['page_obj'].has_next()
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('multi_comment')
+def test_comments_feed_pages(client, new, settings):
+    '''JSON-лента комментариев отдаёт их по курсору от старых к новым.'''
+    settings.COMMENTS_COUNT_ON_PAGE = 1
+    url = reverse('news:comments', args=(new.pk,))
+    first_page = client.get(url).json()
+    assert [item['text'] for item in first_page['comments']] == ['Текст0']
+    next_page = client.get(url, {'cursor': first_page['next_cursor']}).json()
+    assert [item['text'] for item in next_page['comments']] == ['Текст1']
+    assert next_page['next_cursor'] is None
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('multi_comment')
+def test_paged_comments_subscribe_to_events(client, new, settings):
+    '''Страница с листанием комментариев тоже подписана на события.'''
+    settings.COMMENTS_COUNT_ON_PAGE = 1
+    content = client.get(reverse('news:detail', args=(new.pk,))).content
+    assert b'id="more-comments"' in content
+    assert reverse('news:events', args=(new.pk,)).encode() in content
+    assert b'else if (window.EventSource)' not in content
+
+
+@pytest.mark.django_db
+def test_fragment_cache_hits(client, new):
+    '''Повторный запрос главной берёт карточку новости из кеша.'''
+    reset_fragment_stats()
+    client.get(url_home)
+    client.get(url_home)
+    assert fragment_stats() == {'hits': 1, 'misses': 1}
+
+
+@pytest.mark.django_db
+def test_fragment_cache_invalidated_by_comment(client, author, new):
+    '''Новый комментарий сбрасывает кеш карточки и блока комментариев.'''
+    detail_url = reverse('news:detail', args=(new.pk,))
+    client.get(url_home)
+    client.get(detail_url)
+    Comment.objects.create(text='Свежий комментарий', author=author, news=new)
+    assert 'Комментариев: 1' in client.get(url_home).content.decode()
+    assert 'Свежий комментарий' in client.get(detail_url).content.decode()
+
+
+def test_process_local_fragment_cache_fails_deploy_check(settings, tmp_path):
+    '''Кеш фрагментов в памяти процесса не проходит проверку развёртывания.'''
+    (error,) = check_fragment_cache(None)
+    assert error.id == 'news.E001'
+    settings.CACHES = {
+        **settings.CACHES,
+        'fragments': {
+            'BACKEND': 'news.cache.StatsFileBasedCache',
+            'LOCATION': str(tmp_path),
+        },
+    }
+    assert check_fragment_cache(None) == []
+
+
+@pytest.mark.django_db
+def test_search_highlights_and_escapes(client):
+    '''Поиск подсвечивает совпадения и экранирует HTML новости.'''
+    News.objects.create(title='Кошка <b>дня</b>', text='Про кошек.')
+    News.objects.create(title='Собака', text='Ничего общего.')
+    response = client.get(reverse('news:search'), {'q': 'кош'})
+    results = list(response.context['page_obj'])
+    assert [news.title for news in results] == ['Кошка <b>дня</b>']
+    assert results[0].title_highlight == (
+        '<mark>Кошка</mark> &lt;b&gt;дня&lt;/b&gt;'
+    )
+
+
+@pytest.mark.django_db
+def test_search_without_matches(client, new):
+    '''Поиск без совпадений сообщает, что ничего не найдено.'''
+    response = client.get(reverse('news:search'), {'q': 'абракадабра'})
+    assert 'Ничего не найдено.' in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_search_index_follows_news(client, new):
+    '''Изменение и удаление новости сразу отражаются в поиске.'''
+    url = reverse('news:search')
+    new.title = 'Переименованная'
+    new.save()
+    assert len(client.get(url, {'q': 'переименованная'}).context['page_obj'])
+    new.delete()
+    assert not client.get(url, {'q': 'переименованная'}).context['page_obj']
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('multi_news')
+def test_search_next_page(client):
+    '''Курсор поиска ведёт на следующую страницу без повторов.'''
+    url = reverse('news:search')
+    first_page = client.get(url, {'q': 'новость'}).context['page_obj']
+    assert len(first_page) == settings.NEWS_COUNT_ON_HOME_PAGE
+    next_page = client.get(
+        url, {'q': 'новость', 'cursor': first_page.next_cursor}
+    ).context['page_obj']
+    assert len(next_page) == 12 - settings.NEWS_COUNT_ON_HOME_PAGE
+    assert not set(first_page.object_list) & set(next_page.object_list)
@@ -1,10 +1,27 @@
+import asyncio
+import json
+import os
+from datetime import timedelta
 from http import HTTPStatus
+from io import StringIO
+from unittest import mock
 
 import pytest
+from asgiref.sync import sync_to_async
+from django.core.management import CommandError, call_command
+from django.db import transaction
+from django.db.models import Count, F, Max
 from django.urls import reverse
+from django.utils import timezone
 from pytest_django.asserts import assertRedirects
 
-from news.models import Comment
+from news.events import (
+    MAX_DATAGRAM, OVERFLOW, Hub, LocalBackend, MulticastBackend
+)
+from news.forms import BAD_WORDS
+from news.models import Comment, News
+from news.moderation import WordMatcher, get_matcher
+from news.sse import with_comment_events
 
 
 @pytest.mark.django_db
@@ -100,3 +117,342 @@ def test_user_cant_update_comment(admin_client, new, comment, form_data):
     response = admin_client.post(url, data=form_data)
     assert response.status_code == HTTPStatus.NOT_FOUND
     assert comment.text == text_before
+
+
+@pytest.mark.django_db
+def test_comment_count_follows_comments(author_client, new, form_data):
+    '''Счётчик комментариев меняется при создании и удалении коммент-ия.'''
+    url = reverse('news:detail', kwargs={'pk': new.pk})
+    author_client.post(url, data=form_data)
+    new.refresh_from_db()
+    assert new.comment_count == 1
+    comment = Comment.objects.get()
+    author_client.post(reverse('news:delete', kwargs={'pk': comment.pk}))
+    new.refresh_from_db()
+    assert new.comment_count == 0
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('multi_comment')
+def test_rebuild_comment_counts(new):
+    '''Команда rebuild_comment_counts восстанавливает счётчик.'''
+    News.objects.update(comment_count=0)
+    call_command('rebuild_comment_counts', stdout=StringIO())
+    new.refresh_from_db()
+    assert new.comment_count == Comment.objects.filter(news=new).count()
+
+
+@pytest.mark.parametrize(
+    'text, expected',
+    (
+        ('Ну ты и РЕДИСКА!', True),
+        ('негодяйка', True),
+        ('редискр', True),
+        ('редис и негод', False),
+        ('', False),
+    )
+)
+def test_word_matcher(text, expected):
+    '''Автомат находит запрещённые слова в любом месте текста.'''
+    matcher = WordMatcher(('редиска', 'негодяй', 'искр'))
+    assert matcher.search(text) is expected
+
+
+def test_matcher_reloads_changed_file(tmp_path, settings):
+    '''Словарь перечитывается после изменения файла.'''
+    words_file = tmp_path / 'bad_words.txt'
+    words_file.write_text('# комментарий\nредиска\n', encoding='utf-8')
+    settings.BAD_WORDS_FILE = words_file
+    assert get_matcher().search('редиска')
+    assert not get_matcher().search('лопух')
+    words_file.write_text('лопух\n', encoding='utf-8')
+    stat = words_file.stat()
+    os.utime(words_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert get_matcher().search('лопух')
+
+
+def test_matcher_survives_missing_file(tmp_path, settings, caplog):
+    '''Без файла словаря остаётся прежний автомат или словарь по умолчанию.'''
+    words_file = tmp_path / 'bad_words.txt'
+    settings.BAD_WORDS_FILE = words_file
+    assert get_matcher(['редиска']).search('редиска')
+    assert len(caplog.records) == 1
+    words_file.write_text('лопух\n', encoding='utf-8')
+    assert get_matcher(['редиска']).search('лопух')
+    words_file.unlink()
+    assert get_matcher(['редиска']).search('лопух')
+    assert get_matcher(['редиска']).search('лопух')
+    assert len(caplog.records) == 2
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('comment')
+def test_moderate_comments_deletes_bad(author, new):
+    '''Команда moderate_comments удаляет комментарии с ругательствами.'''
+    bad_comment = Comment.objects.create(
+        text=f'Текст {BAD_WORDS[0]}', author=author, news=new
+    )
+    call_command(
+        'moderate_comments', '--delete', '--batch-size=1', stdout=StringIO()
+    )
+    assert not Comment.objects.filter(pk=bad_comment.pk).exists()
+    assert Comment.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_explain_views_finds_no_missing_indexes():
+    '''На всех URL новостей нет полных просмотров и сортировок в B-дереве.'''
+    stdout = StringIO()
+    call_command('explain_views', '--news=20', '--comments=3', stdout=stdout)
+    assert stdout.getvalue().rstrip().endswith('нет')
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('multi_news', 'multi_comment')
+def test_export_import_news(tmp_path, django_user_model):
+    '''Выгрузка и загрузка JSONL переносит новости и комментарии.'''
+    dump = tmp_path / 'news.jsonl.gz'
+    call_command('export_news', str(dump), stderr=StringIO())
+    news_before = list(News.objects.values_list('title', 'comment_count'))
+    comments_before = list(
+        Comment.objects.values_list('text', 'author__username', 'created')
+    )
+    News.objects.all().delete()
+    django_user_model.objects.all().delete()
+    call_command(
+        'import_news', str(dump), '--batch-size=5',
+        stdout=StringIO(), stderr=StringIO()
+    )
+    assert list(
+        News.objects.values_list('title', 'comment_count')
+    ) == news_before
+    assert list(
+        Comment.objects.values_list('text', 'author__username', 'created')
+    ) == comments_before
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('multi_comment')
+def test_import_news_ignores_conflicts(tmp_path):
+    '''Повторная загрузка с --ignore-conflicts не меняет комментарии.'''
+    dump = tmp_path / 'news.jsonl'
+    call_command('export_news', str(dump), stderr=StringIO())
+    Comment.objects.update(text='Исправлено')
+    call_command(
+        'import_news', str(dump), '--ignore-conflicts',
+        stdout=StringIO(), stderr=StringIO()
+    )
+    assert list(Comment.objects.values_list('text', flat=True)) == [
+        'Исправлено', 'Исправлено'
+    ]
+    assert Comment._meta.get_field('created').auto_now_add
+
+
+@pytest.mark.django_db
+def test_import_news_reports_bad_lines(tmp_path, new):
+    '''Ошибка загрузки называет строку, чужие модели считаются.'''
+    def comment(pk, news_id):
+        return {
+            'model': 'comment', 'id': pk, 'news_id': news_id,
+            'author__username': 'Автор', 'text': 'Текст',
+            'created': '2024-01-01T00:00:00+00:00',
+        }
+
+    dump = tmp_path / 'news.jsonl'
+    dump.write_text('\n'.join(json.dumps(row) for row in (
+        comment(1, new.pk),
+        {'model': 'poll', 'id': 1},
+        comment(2, new.pk + 100),
+    )))
+    stderr = StringIO()
+    with pytest.raises(CommandError, match='Строка 3: нет новости'):
+        call_command(
+            'import_news', str(dump), '--batch-size=2', stderr=stderr
+        )
+    assert list(Comment.objects.values_list('pk', flat=True)) == [1]
+    new.refresh_from_db()
+    assert new.comment_count == 1
+    dump.write_text(json.dumps({'model': 'poll'}) + '\n{"model": "news"}')
+    with pytest.raises(CommandError, match='Строка 2: в записи нет полей'):
+        call_command('import_news', str(dump), stderr=stderr)
+    dump.write_text(json.dumps({'model': 'poll', 'id': 1}))
+    call_command('import_news', str(dump), stderr=stderr)
+    assert "неизвестной модели 'poll': 1" in stderr.getvalue()
+
+
+def test_hub_delivers_from_other_thread():
+    '''Хаб доставляет подписчику сообщение, опубликованное из потока.'''
+    hub = Hub(LocalBackend())
+
+    async def scenario():
+        async with hub.subscribe('channel') as queue:
+            await asyncio.get_running_loop().run_in_executor(
+                None, hub.publish, 'channel', {'id': 1}
+            )
+            return await asyncio.wait_for(queue.get(), timeout=1)
+
+    assert asyncio.run(scenario()) == {'id': 1}
+    assert hub.subscribers == {}
+
+
+def test_hub_disconnects_slow_subscriber():
+    '''Переполненная очередь подписчика заменяется сигналом отключения.'''
+    hub = Hub(LocalBackend(), queue_size=2)
+
+    async def scenario():
+        async with hub.subscribe('channel') as queue:
+            for pk in range(3):
+                hub.deliver('channel', {'id': pk})
+            hub.deliver('channel', {'id': 3})
+            return [queue.get_nowait() for _ in range(queue.qsize())]
+
+    assert asyncio.run(scenario()) == [OVERFLOW, {'id': 3}]
+
+
+def test_multicast_sends_large_messages_by_id():
+    '''Длинное сообщение уходит одним id, сбой отправки не ломает запрос.'''
+    backend = MulticastBackend()
+    backend.sender = mock.Mock()
+    backend.publish('channel', {'id': 7, 'text': 'x' * MAX_DATAGRAM})
+    data = backend.sender.sendto.call_args[0][0]
+    assert json.loads(data) == ['channel', {'id': 7}]
+    backend.sender.sendto.side_effect = OSError('Message too long')
+    backend.publish('channel', {'id': 8})
+
+
+@pytest.mark.django_db(transaction=True)
+def test_comment_events_stream(author_client, new, form_data):
+    '''Новый комментарий приходит подписчику потока событий.'''
+    url = reverse('news:detail', kwargs={'pk': new.pk})
+    application = with_comment_events(None)
+    scope = {
+        'type': 'http',
+        'method': 'GET',
+        'path': reverse('news:events', kwargs={'pk': new.pk}),
+        'headers': [],
+    }
+
+    async def scenario():
+        disconnect = asyncio.Event()
+        messages = asyncio.Queue()
+
+        async def receive():
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        task = asyncio.ensure_future(
+            application(scope, receive, messages.put)
+        )
+        start = await asyncio.wait_for(messages.get(), timeout=5)
+        await sync_to_async(author_client.post)(url, data=form_data)
+        body = await asyncio.wait_for(messages.get(), timeout=5)
+        disconnect.set()
+        await asyncio.wait_for(task, timeout=5)
+        return start, body
+
+    start, body = asyncio.run(scenario())
+    assert start['status'] == HTTPStatus.OK
+    assert b'event: comment' in body['body']
+    assert form_data['text'].encode() in body['body']
+
+
+@pytest.mark.django_db(transaction=True)
+def test_comment_events_resume_more_than_queue(author, new):
+    '''Пропущенных комментариев может быть больше, чем мест в очереди.'''
+    comments = [
+        Comment.objects.create(
+            text=f'Пропущен {index}', author=author, news=new
+        )
+        for index in range(3)
+    ]
+    scope = {
+        'type': 'http',
+        'method': 'GET',
+        'path': reverse('news:events', kwargs={'pk': new.pk}),
+        'headers': [(b'last-event-id', str(comments[0].pk - 1).encode())],
+    }
+
+    async def scenario():
+        disconnect = asyncio.Event()
+        messages = asyncio.Queue()
+
+        async def receive():
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        task = asyncio.ensure_future(
+            with_comment_events(None)(scope, receive, messages.put)
+        )
+        bodies = [
+            await asyncio.wait_for(messages.get(), timeout=5)
+            for _ in range(len(comments) + 1)
+        ]
+        disconnect.set()
+        await asyncio.wait_for(task, timeout=5)
+        return bodies[1:]
+
+    with mock.patch(
+        'news.sse.get_hub', return_value=Hub(LocalBackend(), queue_size=1)
+    ):
+        bodies = asyncio.run(scenario())
+    assert [body['body'].split(b'\n')[0] for body in bodies] == [
+        f'id: {comment.pk}'.encode() for comment in comments
+    ]
+
+
+@pytest.mark.django_db
+def test_dataset_is_consistent(dataset):
+    '''Счётчики и активность новостей набора сходятся с комментариями.'''
+    assert Comment.objects.count() == dataset.comments
+    news = News.objects.annotate(
+        total=Count('comment'), last=Max('comment__created')
+    )
+    assert sum(item.comment_count for item in news) == dataset.comments
+    for item in news:
+        assert item.comment_count == item.total
+        assert item.last_activity == (item.last or item.updated)
+    assert not Comment.objects.filter(
+        created__date__lt=F('news__date') - timedelta(days=1)
+    ).exists()
+
+
+@pytest.mark.django_db
+def test_dataset_without_comments(dataset_factory):
+    '''Новости без комментариев тоже получают счётчик и активность.'''
+    dataset = dataset_factory(users=1, news=5, comments=0)
+    assert len(dataset.news) == 5
+    assert not News.objects.exclude(comment_count=0).exists()
+    assert not News.objects.exclude(last_activity=F('updated')).exists()
+    assert dataset_factory(users=0, news=0, comments=10).comments == 0
+
+
+@pytest.mark.django_db
+def test_dataset_is_reproducible(dataset_factory):
+    '''Один seed и одно опорное время дают одинаковые данные.'''
+    now = timezone.now()
+    snapshots = []
+    for _ in range(2):
+        with transaction.atomic():
+            dataset_factory(users=3, news=20, comments=100, seed=7, now=now)
+            snapshots.append((
+                list(News.objects.order_by('id').values_list(
+                    'title', 'date', 'comment_count'
+                )),
+                list(Comment.objects.order_by('id').values_list(
+                    'text', 'created', 'author__username'
+                )),
+            ))
+            transaction.set_rollback(True)
+    assert snapshots[0] == snapshots[1]
+    assert len(snapshots[0][1]) == 100
+
+
+@pytest.mark.django_db
+def test_seed_data_command():
+    '''Команда seed_data наполняет базу заданным объёмом данных.'''
+    call_command(
+        'seed_data', '--users', '2', '--news', '5', '--comments', '50',
+        stdout=StringIO()
+    )
+    assert News.objects.count() == 5
+    assert Comment.objects.count() == 50
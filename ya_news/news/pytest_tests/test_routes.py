@@ -1,14 +1,22 @@
 from http import HTTPStatus
+from io import StringIO
 
 import pytest
+from django.core.management import call_command
 from django.urls import reverse
 from pytest_django.asserts import assertRedirects
 
+from news.models import Comment, News
+from yanews.query_budget import QueryCounter
+
 
 @pytest.mark.django_db
 @pytest.mark.parametrize(
     'name',
-    ('news:home', 'users:login', 'users:logout', 'users:signup'),
+    (
+        'news:home', 'news:search',
+        'users:login', 'users:logout', 'users:signup',
+    ),
 )
 def test_pages_availability_for_anonymous(client, name):
     '''Анонимному польз-лю доступны страницы.'''
@@ -18,13 +26,22 @@ def test_pages_availability_for_anonymous(client, name):
 
 
 @pytest.mark.django_db
-def test_news_availability_for_anonymous(client, new):
-    '''Анонимному польз-лю доступны новости.'''
-    url = reverse('news:detail', args=(new.pk,))
+@pytest.mark.parametrize('name', ('news:detail', 'news:comments'))
+def test_news_availability_for_anonymous(client, new, name):
+    '''Анонимному польз-лю доступны новости и их комментарии.'''
+    url = reverse(name, args=(new.pk,))
     response = client.get(url)
     assert response.status_code == HTTPStatus.OK
 
 
+@pytest.mark.django_db
+def test_invalid_cursor_not_found(client, new):
+    '''Неверный курсор страницы приводит к 404.'''
+    url = reverse('news:comments', args=(new.pk,))
+    response = client.get(url, {'cursor': 'bad'})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
 @pytest.mark.django_db
 @pytest.mark.parametrize(
     'name',
@@ -68,3 +85,94 @@ def test_pages_availability_for_author(
     url = reverse(name, args=(comment.pk,))
     response = admin_client.get(url)
     assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_query_budget_headers(client, settings):
+    '''В режиме отладки ответ содержит число запросов и бюджет.'''
+    settings.DEBUG = True
+    response = client.get(reverse('news:home'))
+    assert int(response['X-Query-Count']) <= int(response['X-Query-Budget'])
+    assert 'X-Query-Time-Ms' in response
+
+
+@pytest.mark.django_db
+def test_query_budget_violation(client, settings, new, query_budgets):
+    '''Превышение бюджета запросов фиксируется.'''
+    settings.QUERY_BUDGETS = {'news:detail': 0}
+    client.get(reverse('news:detail', args=(new.pk,)))
+    assert len(query_budgets) == 1
+    assert query_budgets.pop().startswith('news:detail')
+
+
+def test_query_counter_skips_transaction_control():
+    '''Команды управления транзакцией не входят в число запросов.'''
+    counter = QueryCounter()
+    for sql in (
+        'BEGIN', 'SAVEPOINT "s1"', 'RELEASE SAVEPOINT "s1"', 'SELECT 1'
+    ):
+        counter(lambda *args: None, sql, None, False, {})
+    assert counter.count == 1
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', ('news:home', 'news:detail'))
+def test_conditional_get_not_modified(
+    client, new, name, django_assert_num_queries
+):
+    '''Повторный запрос с ETag получает 304 за один запрос к БД.'''
+    url = reverse(name, args=(new.pk,) if name == 'news:detail' else None)
+    response = client.get(url)
+    assert response.has_header('Last-Modified')
+    with django_assert_num_queries(1):
+        response = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+@pytest.mark.django_db
+def test_etag_changes_on_comment_edit(client, new, comment):
+    '''Правка комментария меняет ETag страницы новости.'''
+    url = reverse('news:detail', args=(new.pk,))
+    etag = client.get(url)['ETag']
+    comment.text = 'Новый текст'
+    comment.save()
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    assert response['ETag'] != etag
+
+
+@pytest.mark.django_db
+def test_home_etag_changes_on_news_delete(client, new):
+    '''Удаление новости меняет ETag ленты, не трогая другие новости.'''
+    other = News.objects.create(title='Другая', text='Текст')
+    url = reverse('news:home')
+    etag = client.get(url)['ETag']
+    activity = News.objects.get(pk=new.pk).last_activity
+    other.delete()
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    assert News.objects.get(pk=new.pk).last_activity == activity
+
+
+@pytest.mark.django_db
+def test_etag_changes_after_bulk_comments(client, new, author):
+    '''Массовая загрузка комментариев меняет ETag страницы новости.'''
+    url = reverse('news:detail', args=(new.pk,))
+    etag = client.get(url)['ETag']
+    Comment.objects.bulk_create(
+        Comment(news=new, author=author, text=f'Комментарий {index}')
+        for index in range(3)
+    )
+    call_command('rebuild_comment_counts', stdout=StringIO())
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+
+
+@pytest.mark.django_db
+def test_etag_depends_on_csrf_token(author_client, new):
+    '''С новым токеном CSRF форма комментария не отдаётся из кеша.'''
+    url = reverse('news:detail', args=(new.pk,))
+    etag = author_client.get(url)['ETag']
+    author_client.cookies['csrftoken'] = 'x' * 64
+    response = author_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
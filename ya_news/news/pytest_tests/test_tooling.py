@@ -0,0 +1,361 @@
+import importlib
+import json
+import os
+import subprocess
+import sys
+from io import StringIO
+from types import SimpleNamespace
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.migrations.recorder import MigrationRecorder
+from django.template import engines
+from django.urls import reverse
+
+from news.cache import set_fragment_versions
+from news.checks import check_fragment_cache
+from news.models import News
+from yacommon import bulk, test_database
+from yanews import test_impact, test_profile
+from yanews.sqlite_pragmas import apply_pragmas
+
+
+def test_template_digest(settings, tmp_path, monkeypatch):
+    '''Шаблон тестовой базы меняется вместе с функцией наполнения.'''
+    digest = test_database.template_digest()
+    assert test_database.template_digest() == digest
+    seed = 'news.factories.seed_dataset'
+    assert test_database.template_digest(seed) != digest
+    monkeypatch.setenv('TEST_DB_TEMPLATE_DIR', str(tmp_path))
+    settings.TEST_DB_SEED = seed
+    path = test_database.template_path()
+    assert path.parent == tmp_path
+    assert test_database.template_digest(seed) in path.name
+
+
+def test_old_templates_are_pruned(tmp_path):
+    '''После постройки шаблона остаются последние использованные.'''
+    paths = [tmp_path / f'default_{index}.sqlite3' for index in range(5)]
+    for age, path in enumerate(reversed(paths)):
+        path.touch()
+        os.utime(path, (age, age))
+    paths[0].touch()
+    test_database.prune_templates(paths[0])
+    assert sorted(tmp_path.iterdir()) == paths[:test_database.KEEP_TEMPLATES]
+
+
+@pytest.mark.django_db
+def test_test_database_is_migrated():
+    '''Копия шаблона содержит все применённые миграции.'''
+    recorder = MigrationRecorder(connection)
+    assert ('news', '0001_initial') in recorder.applied_migrations()
+
+
+@pytest.mark.django_db
+def test_benchmark_views_gates_regressions(tmp_path):
+    '''benchmark_views сохраняет замеры и падает при регрессии.'''
+    baseline = tmp_path / 'baseline.json'
+    options = (
+        'benchmark_views', '--users', '2', '--news', '3', '--comments',
+        '10', '--repeat', '2', '--warmup', '0',
+    )
+    call_command(*options, '--save', str(baseline), stdout=StringIO())
+    saved = json.loads(baseline.read_text(encoding='utf-8'))
+    assert {'news:home', 'news:detail', 'users:login'} <= set(saved['views'])
+    assert 'news:events' not in saved['views']
+    saved['views']['news:home']['queries'] -= 1
+    baseline.write_text(json.dumps(saved), encoding='utf-8')
+    with pytest.raises(CommandError, match='news:home: запросов'):
+        call_command(
+            *options, '--compare', str(baseline), stdout=StringIO()
+        )
+
+
+def test_load_test_parse_mix(load_test):
+    '''Веса операций нагрузки разбираются из строки.'''
+    assert load_test.parse_mix('home=50, detail=30,comment=2.5') == {
+        'home': 50.0, 'detail': 30.0, 'comment': 2.5,
+    }
+    with pytest.raises(ValueError):
+        load_test.parse_mix('home')
+
+
+@pytest.mark.parametrize(
+    'status, body, expected',
+    (
+        (200, b'', None),
+        (302, b'', None),
+        (404, b'Not Found', 'HTTP 404'),
+        (500, b'OperationalError: database is locked', 'database is locked'),
+    )
+)
+def test_load_test_classify(load_test, status, body, expected):
+    '''Ошибки ответов различаются, блокировка SQLite — отдельно.'''
+    assert load_test.classify(status, body) == expected
+
+
+def test_load_test_histogram(load_test):
+    '''Время ответа попадает в первую подходящую корзину.'''
+    counts = dict(load_test.histogram([0.5, 1, 1.5, 7, 5000, 6000]))
+    assert counts['≤1 мс'] == 2
+    assert counts['≤2 мс'] == 1
+    assert counts['≤10 мс'] == 1
+    assert counts['≤5000 мс'] == 1
+    assert counts['>5000 мс'] == 1
+    assert sum(counts.values()) == 6
+
+
+def test_load_test_percentiles(load_test):
+    '''Перцентили считаются и для пустого списка и одного замера.'''
+    assert load_test.percentiles([]) == {'p50': 0, 'p95': 0, 'p99': 0}
+    assert load_test.percentiles([3]) == {'p50': 3, 'p95': 3, 'p99': 3}
+    result = load_test.percentiles(list(range(1, 102)))
+    assert result == {'p50': 51, 'p95': 96, 'p99': 100}
+
+
+@pytest.mark.django_db
+def test_profile_counts_queries_and_renders():
+    '''Профиль тестов считает запросы и внешние рендеры шаблонов.'''
+    template = engines['django'].from_string(
+        '{% include "news/delete.html" %}'
+    )
+    with test_profile.measure_queries_and_renders() as (counter, timer):
+        News.objects.count()
+        template.render({})
+    assert counter.count == 1
+    assert timer.count == 1
+    assert timer.duration > 0
+
+
+@pytest.mark.django_db
+def test_impact_records_code_and_templates(client, settings):
+    '''Карта тестов получает исполненный код и шаблоны с предками.'''
+    recorder = test_impact.Recorder(
+        SimpleNamespace(rootpath=settings.BASE_DIR)
+    )
+    with recorder.recording() as touched:
+        client.get(reverse('news:home'))
+    assert {
+        'news/views.py', 'templates/news/home.html', 'templates/base.html',
+    } <= touched
+    assert not any(path.startswith('<') for path in touched)
+
+
+def test_impact_changes_include_shared_package(tmp_path, monkeypatch):
+    '''Изменения yacommon видны проекту с путями вида ../yacommon/….'''
+    root = tmp_path.resolve()
+    project, shared = root / 'project', root / 'yacommon'
+    for directory in (project, shared):
+        directory.mkdir()
+        (directory / 'a.py').write_text('')
+
+    def git(*args):
+        subprocess.run(
+            ['git', '-c', 'user.name=test', '-c', 'user.email=test@test',
+             *args], cwd=root, check=True, capture_output=True,
+        )
+
+    git('init', '-q')
+    git('add', '.')
+    git('commit', '-q', '-m', 'init')
+    for path in (project / 'a.py', shared / 'a.py', root / 'other.py'):
+        path.write_text('x = 1\n')
+    (shared / 'b.py').write_text('')
+    monkeypatch.setattr(test_impact, 'SHARED_DIR', shared)
+    assert test_impact.changed_files(project, 'HEAD') == {
+        'a.py', '../yacommon/a.py', '../yacommon/b.py',
+    }
+
+
+def test_impact_records_shared_package(settings):
+    '''Код yacommon попадает в карту тестов.'''
+    recorder = test_impact.Recorder(
+        SimpleNamespace(rootpath=settings.BASE_DIR)
+    )
+    with recorder.recording() as touched:
+        list(bulk.batches(range(3), 2))
+    assert '../yacommon/bulk.py' in touched
+
+
+IMPACT_TESTS = {
+    'news/test_a.py::test_views': {
+        'files': ['news/views.py'], 'failed': False,
+    },
+    'news/test_a.py::test_forms': {
+        'files': ['news/forms.py'], 'failed': False,
+    },
+    'news/test_a.py::test_broken': {
+        'files': ['news/forms.py'], 'failed': True,
+    },
+}
+
+
+def impact_selector(root, dirty=None):
+    """Selector с записанной в root картой IMPACT_TESTS."""
+    (root / test_impact.DEFAULT_MAP).write_text(json.dumps({
+        'version': test_impact.VERSION,
+        'commit': 'HEAD',
+        'dirty': dirty or {},
+        'checksum': test_impact.tests_checksum(IMPACT_TESTS),
+        'tests': IMPACT_TESTS,
+    }), encoding='utf-8')
+    return test_impact.Selector(SimpleNamespace(
+        rootpath=root,
+        getoption={'impact_map': test_impact.DEFAULT_MAP}.get,
+    ))
+
+
+@pytest.mark.parametrize(
+    'changed, expected',
+    (
+        ({'news/views.py'}, {'test_views', 'test_broken', 'test_new'}),
+        ({'news/test_b.py'}, {'test_broken', 'test_new'}),
+        (set(), {'test_broken', 'test_new'}),
+    )
+)
+def test_impact_selects_affected_tests(
+    tmp_path, monkeypatch, changed, expected
+):
+    '''Выбираются тесты изменённых файлов, упавшие и новые.'''
+    monkeypatch.setattr(
+        test_impact, 'changed_files', lambda root, commit: set(changed)
+    )
+    items = [
+        SimpleNamespace(nodeid=nodeid)
+        for nodeid in (*IMPACT_TESTS, 'news/test_b.py::test_new')
+    ]
+    selected, _ = impact_selector(tmp_path).affected(items)
+    assert {item.nodeid.split('::')[1] for item in selected} == expected
+
+
+@pytest.mark.parametrize(
+    'changed, reason',
+    (
+        ({'news/migrations/0002_auto.py'}, 'изменён news/migrations'),
+        ({'news/views.py', 'news/urls.py'}, 'news/urls.py нет в карте'),
+        (None, 'git не может'),
+    )
+)
+def test_impact_falls_back_to_full_run(
+    tmp_path, monkeypatch, changed, reason
+):
+    '''Миграции, неизвестные файлы и отказ git требуют всех тестов.'''
+    monkeypatch.setattr(
+        test_impact, 'changed_files', lambda root, commit: changed
+    )
+    items = [SimpleNamespace(nodeid=nodeid) for nodeid in IMPACT_TESTS]
+    selected, message = impact_selector(tmp_path).affected(items)
+    assert selected is None
+    assert message.startswith(reason)
+
+
+def test_impact_rejects_edited_map(tmp_path, monkeypatch):
+    '''Карта, изменённая после записи, не используется.'''
+    monkeypatch.setattr(test_impact, 'changed_files', lambda *args: set())
+    selector = impact_selector(tmp_path)
+    path = tmp_path / test_impact.DEFAULT_MAP
+    impact = json.loads(path.read_text(encoding='utf-8'))
+    impact['tests']['news/test_a.py::test_views']['files'] = []
+    path.write_text(json.dumps(impact), encoding='utf-8')
+    selected, message = selector.affected([])
+    assert selected is None
+    assert 'изменена' in message
+
+
+def test_impact_changes_compare_dirty_files(tmp_path, monkeypatch):
+    '''Файлы, грязные при записи, считаются изменёнными по содержимому.'''
+    for name in ('same.py', 'edited.py', 'committed.py'):
+        (tmp_path / name).write_text(name, encoding='utf-8')
+    dirty = {
+        name: test_impact.file_hash(tmp_path / name)
+        for name in ('same.py', 'edited.py', 'committed.py')
+    }
+    (tmp_path / 'edited.py').write_text('изменён', encoding='utf-8')
+    monkeypatch.setattr(
+        test_impact, 'changed_files',
+        lambda root, commit: {'same.py', 'edited.py', 'other.py'},
+    )
+    (tmp_path / 'committed.py').write_text('закоммичен', encoding='utf-8')
+    selector = impact_selector(tmp_path, dirty)
+    impact, _ = selector.load()
+    assert selector.changes(impact) == {
+        'edited.py', 'other.py', 'committed.py'
+    }
+
+
+@pytest.mark.django_db
+def test_sqlite_pragmas_applied_to_new_connection(settings):
+    '''PRAGMA из настроек выполняются при подключении к базе.'''
+    cursor = connection.connection.cursor()
+    saved = cursor.execute('PRAGMA cache_size').fetchone()[0]
+    settings.SQLITE_PRAGMAS = {'cache_size': -1234}
+    try:
+        apply_pragmas(None, connection)
+        assert cursor.execute('PRAGMA cache_size').fetchone()[0] == -1234
+    finally:
+        cursor.execute(f'PRAGMA cache_size = {saved}')
+
+
+@pytest.mark.django_db
+def test_sqlite_pragmas_applied_by_connection_created(settings):
+    '''Новое подключение получает PRAGMA через сигнал connection_created.'''
+    settings.SQLITE_PRAGMAS = {'journal_mode': 'memory', 'busy_timeout': 1234}
+    fresh = connections.create_connection(DEFAULT_DB_ALIAS)
+    try:
+        fresh.ensure_connection()
+        pragma = fresh.connection.execute
+        assert pragma('PRAGMA journal_mode').fetchone()[0] == 'memory'
+        assert pragma('PRAGMA busy_timeout').fetchone()[0] == 1234
+    finally:
+        fresh.close()
+
+
+def reload_production_settings():
+    sys.modules.pop('yanews.settings_production', None)
+    return importlib.import_module('yanews.settings_production')
+
+
+def test_production_settings(monkeypatch):
+    '''Настройки нагрузки: ключ и хосты из окружения, кеш и подключения.'''
+    monkeypatch.delenv('DJANGO_SECRET_KEY', raising=False)
+    with pytest.raises(ImproperlyConfigured):
+        reload_production_settings()
+    monkeypatch.setenv('DJANGO_SECRET_KEY', 'ключ')
+    monkeypatch.setenv('DJANGO_ALLOWED_HOSTS', 'news.example ya.example')
+    production = reload_production_settings()
+    assert production.SECRET_KEY == 'ключ'
+    assert production.ALLOWED_HOSTS == ['news.example', 'ya.example']
+    assert production.DEBUG is False
+    assert production.DATABASES['default']['CONN_MAX_AGE'] == 600
+    loader, _ = production.TEMPLATES[0]['OPTIONS']['loaders'][0]
+    assert loader == 'django.template.loaders.cached.Loader'
+
+
+@pytest.mark.django_db
+def test_production_fragment_cache_is_shared(
+    monkeypatch, settings, tmp_path, new
+):
+    '''Версию фрагментов, сменённую другим процессом, видят все.'''
+    monkeypatch.setenv('DJANGO_SECRET_KEY', 'ключ')
+    monkeypatch.setenv('DJANGO_FRAGMENT_CACHE_DIR', str(tmp_path))
+    production = reload_production_settings()
+    settings.CACHES = production.CACHES
+    assert check_fragment_cache(None) == []
+    set_fragment_versions([new])
+    version = new.fragment_version
+    subprocess.run(
+        [
+            sys.executable, 'manage.py', 'shell', '-c',
+            'from news.cache import bump_fragment_version; '
+            f'bump_fragment_version({new.pk})',
+        ],
+        cwd=settings.BASE_DIR, check=True, timeout=60,
+        env={
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': 'yanews.settings_production',
+        },
+    )
+    set_fragment_versions([new])
+    assert new.fragment_version != version
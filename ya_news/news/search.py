@@ -0,0 +1,100 @@
+import re
+
+from django.db import connection
+from django.http import Http404
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import News
+from .pagination import KeysetPage, decode_values, encode_values
+
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+WORD = re.compile(r'\w+')
+
+SEARCH_SQL = f"""
+    SELECT news_news.*,
+        news_news_fts.rank AS search_rank,
+        highlight(
+            news_news_fts, 0, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}'
+        ) AS title_highlight,
+        snippet(
+            news_news_fts, 1, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '…', 20
+        ) AS text_snippet
+    FROM news_news_fts
+    JOIN news_news ON news_news.id = news_news_fts.rowid
+    WHERE news_news_fts MATCH %s {{after}}
+    ORDER BY news_news_fts.rank, news_news.id
+    LIMIT %s
+"""
+AFTER_SQL = """
+    AND (news_news_fts.rank > %s
+        OR (news_news_fts.rank = %s AND news_news.id > %s))
+"""
+
+
+def build_match_query(text):
+    """
+    Превращает ввод пользователя в запрос FTS5.
+
+    Каждое слово берётся в кавычки, чтобы синтаксис FTS5 во вводе
+    не работал; последнее слово ищется по префиксу — для поиска
+    по мере набора.
+    """
+    words = WORD.findall(text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def highlight(value):
+    """Экранирует HTML и заменяет маркеры совпадений на <mark>."""
+    return mark_safe(
+        escape(value)
+        .replace(HIGHLIGHT_START, '<mark>')
+        .replace(HIGHLIGHT_END, '</mark>')
+    )
+
+
+def search_news(text, cursor=None, per_page=10):
+    """
+    Страница новостей, найденных по тексту, от самых релевантных.
+
+    Листание идёт по ключу (ранг, id), поэтому следующие страницы
+    не пересчитывают уже показанные.
+    """
+    match = build_match_query(text)
+    if match is None:
+        return KeysetPage([], None)
+    params = [match]
+    after = ''
+    if cursor:
+        rank, pk = decode_values(cursor, 2)
+        if not isinstance(rank, float) or not isinstance(pk, int):
+            raise Http404('Неверный курсор страницы.')
+        after = AFTER_SQL
+        params += [rank, rank, pk]
+    params.append(per_page + 1)
+    results = list(News.objects.raw(SEARCH_SQL.format(after=after), params))
+    next_cursor = None
+    if len(results) > per_page:
+        results = results[:per_page]
+        last = results[-1]
+        next_cursor = encode_values([last.search_rank, last.pk])
+    for news in results:
+        news.title_highlight = highlight(news.title_highlight)
+        news.text_snippet = highlight(news.text_snippet)
+    return KeysetPage(results, next_cursor)
+
+
+def rebuild_search_index():
+    """Перестраивает и уплотняет полнотекстовый индекс новостей."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO news_news_fts(news_news_fts) VALUES('rebuild')"
+        )
+        cursor.execute(
+            "INSERT INTO news_news_fts(news_news_fts) VALUES('optimize')"
+        )
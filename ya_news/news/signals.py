@@ -0,0 +1,54 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import bump_fragment_version, touch_feed
+from .models import Comment, News
+
+
+@receiver(post_save, sender=Comment)
+def update_news_on_comment_save(sender, instance, created, **kwargs):
+    """
+    Отмечаем активность новости при создании и правке комментария.
+
+    При создании заодно увеличиваем счётчик комментариев.
+    """
+    changes = {'last_activity': timezone.now()}
+    if created:
+        changes['comment_count'] = F('comment_count') + 1
+    News.objects.filter(pk=instance.news_id).update(**changes)
+
+
+@receiver(post_delete, sender=Comment)
+def update_news_on_comment_delete(sender, instance, **kwargs):
+    """Уменьшаем счётчик комментариев и отмечаем активность новости."""
+    News.objects.filter(pk=instance.news_id).update(
+        comment_count=Greatest(F('comment_count') - 1, 0),
+        last_activity=timezone.now(),
+    )
+
+
+@receiver(post_delete, sender=News)
+def touch_news_feed(sender, instance, **kwargs):
+    """
+    Удаление новости меняет ленту, но не оставляет следа в таблице.
+
+    Отметка ленты входит в валидатор главной страницы.
+    """
+    touch_feed()
+
+
+@receiver(post_save, sender=News)
+@receiver(post_delete, sender=News)
+def invalidate_news_fragments(sender, instance, **kwargs):
+    """Сбрасываем кеш карточки и комментариев изменённой новости."""
+    bump_fragment_version(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_fragments(sender, instance, **kwargs):
+    """Сбрасываем кеш новости, к которой относится комментарий."""
+    bump_fragment_version(instance.news_id)
@@ -0,0 +1,153 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.urls import Resolver404, resolve
+
+from .events import OVERFLOW, comment_channel, comment_message, get_hub
+from .models import Comment, News
+
+EVENTS_VIEW = 'news:events'
+
+
+@sync_to_async
+def load_news(pk, last_event_id):
+    """
+    Проверяет новость и возвращает пропущенные комментарии.
+
+    Это единственное обращение к БД за время подписки: дальше
+    комментарии приходят через хаб.
+    """
+    if not News.objects.filter(pk=pk).exists():
+        return None
+    if last_event_id is None:
+        return []
+    comments = Comment.objects.filter(
+        news_id=pk, pk__gt=last_event_id
+    ).select_related('author').order_by('pk')
+    return [
+        comment_message(comment)
+        for comment in comments[:settings.COMMENTS_COUNT_ON_PAGE]
+    ]
+
+
+@sync_to_async
+def load_comment(pk):
+    """Полное сообщение о комментарии, пришедшем от бэкенда одним id."""
+    comment = Comment.objects.select_related('author').filter(pk=pk).first()
+    return comment and comment_message(comment)
+
+
+def format_event(message):
+    data = json.dumps(message, ensure_ascii=False)
+    return f'id: {message["id"]}\nevent: comment\ndata: {data}\n\n'.encode()
+
+
+def get_last_event_id(scope):
+    for name, value in scope['headers']:
+        if name == b'last-event-id' and value.isdigit():
+            return int(value)
+    return None
+
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def send_text_response(send, status, text):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'text/plain; charset=utf-8')],
+    })
+    await send({'type': 'http.response.body', 'body': text.encode()})
+
+
+async def comment_events(scope, receive, send, pk):
+    """Поток Server-Sent Events с новыми комментариями к новости."""
+    if scope['method'] != 'GET':
+        return await send_text_response(send, 405, 'Method Not Allowed')
+    hub = get_hub()
+    last_event_id = get_last_event_id(scope)
+    async with hub.subscribe(comment_channel(pk)) as queue:
+        missed = await load_news(pk, last_event_id)
+        if missed is None:
+            return await send_text_response(send, 404, 'Not Found')
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        # Пропущенные комментарии уходят сразу, не через очередь: их
+        # может быть больше, чем в ней помещается.
+        for message in missed:
+            await send_body(send, format_event(message))
+        last_id = missed[-1]['id'] if missed else last_event_id or 0
+        await stream(queue, receive, send, last_id)
+
+
+async def send_body(send, body):
+    await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+
+
+async def stream(queue, receive, send, last_id=0):
+    """
+    Раздаёт события очереди до отключения клиента.
+
+    Комментарии с id не больше last_id уже отправлены: подписка
+    открыта до чтения пропущенных, и свежий комментарий может
+    прийти дважды. Поток закрывается, если хаб отключил подписчика.
+    """
+    disconnect = asyncio.ensure_future(wait_disconnect(receive))
+    try:
+        while not disconnect.done():
+            message = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                {message, disconnect},
+                timeout=settings.NEWS_EVENTS_HEARTBEAT,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if message in done:
+                event = message.result()
+                if event is OVERFLOW:
+                    break
+                if event['id'] <= last_id:
+                    continue
+                if event.keys() == {'id'}:
+                    event = await load_comment(event['id'])
+                # Комментарий могли удалить, пока событие было в пути.
+                body = format_event(event) if event else b''
+            else:
+                message.cancel()
+                body = b': ping\n\n'
+            if not disconnect.done():
+                await send_body(send, body)
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        disconnect.cancel()
+
+
+def with_comment_events(application):
+    """
+    ASGI-приложение: поток событий обслуживается здесь асинхронно,
+    остальные запросы передаются Django.
+    """
+    async def router(scope, receive, send):
+        if scope['type'] == 'http':
+            try:
+                match = resolve(scope['path'])
+            except Resolver404:
+                match = None
+            if match and match.view_name == EVENTS_VIEW:
+                return await comment_events(
+                    scope, receive, send, match.kwargs['pk']
+                )
+        return await application(scope, receive, send)
+
+    return router
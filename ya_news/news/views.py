@@ -1,39 +1,147 @@
+from hashlib import md5
+from http import HTTPStatus
+
 from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.utils.functional import SimpleLazyObject
 from django.views import generic
+from django.views.decorators.http import condition
 
-from .forms import CommentForm
+from .cache import feed_changed_at, set_fragment_versions
+from .events import comment_message, publish_comment
+from .forms import CommentForm, SearchForm
 from .models import Comment, News
-
-
-class NewsList(generic.ListView):
+from .pagination import KeysetPaginationMixin, paginate
+from .search import search_news
+
+NEWS_ORDERING = ('-date', '-id')
+COMMENTS_ORDERING = ('created', 'id')
+
+
+def last_activity(request, pk=None):
+    """
+    Время последнего изменения новости или ленты новостей.
+
+    Один запрос по индексу, результат запоминается в запросе:
+    condition() спрашивает его и для ETag, и для Last-Modified. Для
+    ленты учитывается и отметка удалений и массовых загрузок.
+    """
+    if not hasattr(request, '_news_last_activity'):
+        queryset = News.objects.order_by('-last_activity')
+        if pk is not None:
+            queryset = queryset.filter(pk=pk)
+        modified = queryset.values_list('last_activity', flat=True).first()
+        if pk is None:
+            modified = max(filter(None, (modified, feed_changed_at())))
+        request._news_last_activity = modified
+    return request._news_last_activity
+
+
+def news_etag(request, pk=None):
+    """
+    ETag учитывает пользователя, курсор и токен CSRF: от них зависит
+    страница, а форма комментария со старым токеном после нового входа
+    не отправится.
+    """
+    modified = last_activity(request, pk)
+    if modified is None:
+        return None
+    user = request.user.pk if request.user.is_authenticated else ''
+    key = '|'.join(map(str, (
+        pk, modified.isoformat(), user, request.GET.get('cursor'),
+        request.META.get('CSRF_COOKIE', ''),
+    )))
+    return md5(key.encode()).hexdigest()
+
+
+def news_last_modified(request, pk=None):
+    return last_activity(request, pk)
+
+
+news_condition = method_decorator(
+    condition(etag_func=news_etag, last_modified_func=news_last_modified),
+    name='get',
+)
+
+
+@news_condition
+class NewsList(KeysetPaginationMixin, generic.ListView):
     """Список новостей."""
     model = News
     template_name = 'news/home.html'
+    keyset_ordering = NEWS_ORDERING
+    query_budget = 4
 
-    def get_queryset(self):
+    def get_paginate_by(self, queryset):
         """
-        Выводим только несколько последних новостей.
+        Выводим несколько новостей на страницу, начиная с последних.
 
         Их количество определяется в настройках проекта.
+        Число комментариев берётся из News.comment_count,
+        поэтому страница строится одним запросом.
         """
-        return self.model.objects.prefetch_related(
-            'comment_set'
-        )[:settings.NEWS_COUNT_ON_HOME_PAGE]
+        return settings.NEWS_COUNT_ON_HOME_PAGE
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        set_fragment_versions(context['object_list'])
+        return context
+
 
+class NewsSearch(generic.TemplateView):
+    """Полнотекстовый поиск новостей."""
+    template_name = 'news/search.html'
+    query_budget = 3
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        form = SearchForm(self.request.GET or None)
+        context['form'] = form
+        if form.is_valid():
+            context['page_obj'] = search_news(
+                form.cleaned_data['q'],
+                self.request.GET.get('cursor'),
+                settings.NEWS_COUNT_ON_HOME_PAGE,
+            )
+        return context
+
+
+class CommentPageMixin:
+    """
+    Добавляет в контекст страницу комментариев к новости.
+
+    Страница вычисляется лениво: если блок комментариев взят
+    из кеша фрагментов, запрос к комментариям не выполняется.
+    """
+
+    def get_comments_page(self, news):
+        return paginate(
+            news.comment_set.select_related('author'),
+            COMMENTS_ORDERING,
+            self.request.GET.get('cursor'),
+            settings.COMMENTS_COUNT_ON_PAGE,
+        )
 
-class NewsDetail(generic.DetailView):
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        set_fragment_versions([self.object])
+        context['comments'] = SimpleLazyObject(
+            lambda: self.get_comments_page(self.object)
+        )
+        return context
+
+
+class NewsDetail(CommentPageMixin, generic.DetailView):
     model = News
     template_name = 'news/detail.html'
 
     def get_object(self, queryset=None):
-        obj = get_object_or_404(
-            self.model.objects.prefetch_related('comment_set__author'),
-            pk=self.kwargs['pk']
-        )
-        return obj
+        return get_object_or_404(self.model, pk=self.kwargs['pk'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -42,8 +150,36 @@ class NewsDetail(generic.DetailView):
         return context
 
 
+class NewsCommentsFeed(CommentPageMixin, generic.detail.BaseDetailView):
+    """Следующая страница комментариев к новости в формате JSON."""
+    model = News
+    query_budget = 4
+
+    def render_to_response(self, context):
+        page = context['comments']
+        return JsonResponse({
+            'comments': [comment_message(comment) for comment in page],
+            'next_cursor': page.next_cursor,
+        })
+
+
+class NewsEvents(generic.View):
+    """
+    Поток новых комментариев обслуживает ASGI-приложение news.sse.
+
+    Маршрут нужен для reverse(); без ASGI поток недоступен.
+    """
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(
+            'Поток событий доступен только при запуске через ASGI.',
+            status=HTTPStatus.NOT_IMPLEMENTED,
+        )
+
+
 class NewsComment(
         LoginRequiredMixin,
+        CommentPageMixin,
         generic.detail.SingleObjectMixin,
         generic.FormView
 ):
@@ -60,6 +196,7 @@ class NewsComment(
         comment.news = self.object
         comment.author = self.request.user
         comment.save()
+        transaction.on_commit(lambda: publish_comment(comment))
         return super().form_valid(form)
 
     def get_success_url(self):
@@ -67,7 +204,9 @@ class NewsComment(
         return reverse('news:detail', kwargs={'pk': post.pk}) + '#comments'
 
 
+@news_condition
 class NewsDetailView(generic.View):
+    query_budget = 7
 
     def get(self, request, *args, **kwargs):
         view = NewsDetail.as_view()
@@ -81,11 +220,12 @@ class NewsDetailView(generic.View):
 class CommentBase(LoginRequiredMixin):
     """Базовый класс для работы с комментариями."""
     model = Comment
+    query_budget = 7
 
     def get_success_url(self):
-        comment = self.get_object()
+        # self.object уже прочитан в UpdateView и DeleteView.
         return reverse(
-            'news:detail', kwargs={'pk': comment.news.pk}
+            'news:detail', kwargs={'pk': self.object.news_id}
         ) + '#comments'
 
     def get_queryset(self):
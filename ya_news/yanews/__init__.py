@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# Общий код проектов (пакет yacommon) лежит в корне репозитория.
+REPO_DIR = str(Path(__file__).resolve().parent.parent.parent)
+if REPO_DIR not in sys.path:
+    sys.path.append(REPO_DIR)
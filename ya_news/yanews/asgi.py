@@ -3,6 +3,9 @@ ASGI config for yanews project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Server-Sent Events with new comments are served by news.sse without
+going through the synchronous Django views.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 """
@@ -13,4 +16,8 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanews.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from news.sse import with_comment_events  # noqa: E402
+
+application = with_comment_events(django_application)
@@ -0,0 +1,112 @@
+import logging
+from contextlib import ExitStack, contextmanager
+from threading import Lock
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+stats = {}
+_active_checks = []
+_lock = Lock()
+# Управление транзакцией не считается запросом: вне тестов внешняя
+# транзакция открывается BEGIN, а в тестах той же транзакции
+# соответствует SAVEPOINT или ничего, и бюджет зависел бы от того,
+# где выполняется представление. Время этих команд учитывается.
+TRANSACTION_SQL = ('BEGIN', 'SAVEPOINT', 'RELEASE', 'ROLLBACK')
+
+
+class QueryCounter:
+    """Обёртка выполнения SQL: считает запросы и их время."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if not sql.lstrip().upper().startswith(TRANSACTION_SQL):
+                self.count += 1
+            self.duration += perf_counter() - start
+
+
+def get_budget(resolver_match):
+    """
+    Бюджет запросов для представления.
+
+    Задаётся атрибутом query_budget класса представления,
+    settings.QUERY_BUDGETS по имени URL имеет приоритет.
+    """
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    if resolver_match.view_name in budgets:
+        return budgets[resolver_match.view_name]
+    view_class = getattr(resolver_match.func, 'view_class', None)
+    return getattr(view_class, 'query_budget', None)
+
+
+def record(view_name, counter, budget):
+    with _lock:
+        view_stats = stats.setdefault(
+            view_name, {'requests': 0, 'queries': 0, 'time': 0.0, 'max': 0}
+        )
+        view_stats['requests'] += 1
+        view_stats['queries'] += counter.count
+        view_stats['time'] += counter.duration
+        view_stats['max'] = max(view_stats['max'], counter.count)
+    if budget is None or counter.count <= budget:
+        return
+    message = (
+        f'{view_name}: {counter.count} SQL-запросов при бюджете {budget}'
+    )
+    logger.warning(message)
+    for violations in _active_checks:
+        violations.append(message)
+
+
+class QueryBudgetMiddleware:
+    """
+    Считает SQL-запросы и время БД для каждого представления.
+
+    Статистика копится в stats по имени URL, в режиме отладки
+    значения передаются в заголовках ответа.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        resolver_match = request.resolver_match
+        if resolver_match is None:
+            return response
+        budget = get_budget(resolver_match)
+        record(resolver_match.view_name, counter, budget)
+        if settings.DEBUG:
+            response['X-Query-Count'] = counter.count
+            response['X-Query-Time-Ms'] = f'{counter.duration * 1000:.2f}'
+            if budget is not None:
+                response['X-Query-Budget'] = budget
+        return response
+
+
+@contextmanager
+def assert_query_budgets():
+    """Падает, если внутри блока представление превысило бюджет."""
+    violations = []
+    _active_checks.append(violations)
+    try:
+        yield violations
+    finally:
+        _active_checks.remove(violations)
+    assert not violations, 'Превышен бюджет SQL-запросов:\n' + '\n'.join(
+        violations
+    )
@@ -21,6 +21,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yanews.query_budget.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -59,6 +60,26 @@ DATABASES = {
 }
 
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Фрагменты шаблонов и их версии. Кеш в памяти процесса годится
+    # только для одного процесса (runserver, тесты): версию, которую
+    # сменил комментарий, другие процессы не увидят. Для нескольких
+    # процессов нужен общий кеш, как в settings_production; проверка
+    # news.E001 (manage.py check --deploy) не пропустит кеш в памяти.
+    'fragments': {
+        'BACKEND': 'news.cache.StatsLocMemCache',
+        'LOCATION': 'yanews-fragments',
+        'TIMEOUT': 600,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
+
 AUTH_PASSWORD_VALIDATORS = []
 
 
@@ -80,3 +101,13 @@ LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('news:home')
 
 NEWS_COUNT_ON_HOME_PAGE = 10
+
+COMMENTS_COUNT_ON_PAGE = 50
+
+BAD_WORDS_FILE = BASE_DIR / 'news' / 'bad_words.txt'
+
+# Рассылка новых комментариев подписчикам SSE. Для нескольких
+# воркеров на одной машине: 'news.events.MulticastBackend'.
+NEWS_EVENTS_BACKEND = 'news.events.LocalBackend'
+NEWS_EVENTS_OPTIONS = {}
+NEWS_EVENTS_HEARTBEAT = 15
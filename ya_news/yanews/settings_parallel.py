@@ -0,0 +1,21 @@
+"""
+Настройки процесса параллельного прогона тестов (run_tests_parallel.py).
+
+У каждого процесса своя тестовая база SQLite в каталоге TEST_DB_DIR.
+"""
+import os
+from pathlib import Path
+
+from .settings import *  # noqa: F401, F403
+from .settings import DATABASES
+
+WORKER = os.environ.get('TEST_WORKER', '0')
+TEST_DB_DIR = Path(os.environ.get('TEST_DB_DIR', '.'))
+
+DATABASES = {
+    'default': {
+        **DATABASES['default'],
+        'NAME': TEST_DB_DIR / f'yanews_{WORKER}.sqlite3',
+        'TEST': {'NAME': str(TEST_DB_DIR / f'test_yanews_{WORKER}.sqlite3')},
+    }
+}
@@ -0,0 +1,365 @@
+"""
+Выбор тестов по изменённым файлам.
+
+pytest --impact-record прогоняет тесты и записывает карту: какие файлы
+проекта исполнял каждый тест (функции Python, в том числе методы
+классов, чьи экземпляры он использовал) и какие шаблоны загружал. С
+--impact прогоняются только тесты, которых касаются файлы, изменённые
+в рабочем дереве git с момента записи карты, новые тесты и тесты,
+упавшие при записи.
+
+Всё прогоняется, если изменились настройки, миграции, conftest.py,
+pytest.ini или сам механизм тестовой базы; если изменённого файла
+нет в карте (urls.py, данные, код только уровня модуля); если карты
+нет, она испорчена или git недоступен.
+"""
+import hashlib
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from contextlib import contextmanager
+from fnmatch import fnmatch
+from pathlib import Path
+
+import pytest
+from django.template.engine import Engine
+
+import yacommon
+
+SHARED_DIR = Path(yacommon.__file__).resolve().parent
+VERSION = 1
+DEFAULT_MAP = '.test_impact.json'
+FULL_RUN = (
+    'conftest.py', '*/conftest.py', 'pytest.ini', '*/settings*.py',
+    '*/migrations/*', '*/pytest_plugin.py', '*/test_database.py',
+    '*/test_impact.py',
+)
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('test-impact', 'выбор тестов по изменениям')
+    group.addoption(
+        '--impact-record', action='store_true',
+        help='Записать, какие файлы и шаблоны затрагивает каждый тест.'
+    )
+    group.addoption(
+        '--impact', action='store_true',
+        help='Прогнать только тесты, затронутые изменёнными файлами.'
+    )
+    group.addoption(
+        '--impact-map', metavar='FILE', default=DEFAULT_MAP,
+        help=f'Файл карты относительно корня проекта ({DEFAULT_MAP}).'
+    )
+
+
+def pytest_configure(config):
+    if config.getoption('impact_record'):
+        config.pluginmanager.register(Recorder(config), 'impact-recorder')
+    elif config.getoption('impact'):
+        config.pluginmanager.register(Selector(config), 'impact-selector')
+
+
+def map_path(config):
+    return config.rootpath / config.getoption('impact_map')
+
+
+def file_hash(path):
+    try:
+        return hashlib.sha1(path.read_bytes()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def git(root, *args):
+    """Вывод git построчно; None, если git недоступен или упал."""
+    try:
+        result = subprocess.run(
+            ['git', *args], cwd=root, capture_output=True, text=True,
+        )
+    except OSError:
+        return None
+    if result.returncode:
+        return None
+    return result.stdout.splitlines()
+
+
+def changed_files(root, commit):
+    """
+    Файлы проекта и yacommon, отличные от коммита commit, и
+    неотслеживаемые.
+
+    Пути относительно root, у yacommon они начинаются с ../; None,
+    если git не может сравнить.
+    """
+    paths = ('--', '.', os.path.relpath(SHARED_DIR, root))
+    top = git(root, 'rev-parse', '--show-toplevel')
+    changed = git(root, 'diff', '--name-only', commit, *paths)
+    untracked = git(root, 'ls-files', '--others', '--exclude-standard', *paths)
+    if top is None or changed is None or untracked is None:
+        return None
+    # diff без --relative даёт пути от корня репозитория.
+    changed = {
+        Path(os.path.relpath(Path(top[0]) / name, root)).as_posix()
+        for name in changed
+    }
+    return changed | set(untracked)
+
+
+def tests_checksum(tests):
+    return hashlib.sha1(
+        json.dumps(tests, sort_keys=True).encode()
+    ).hexdigest()
+
+
+class Recorder:
+    """Плагин pytest, который записывает карту тестов."""
+
+    def __init__(self, config):
+        self.config = config
+        self.root = config.rootpath
+        self.paths = {}
+        self.owners = {}
+        self.touched = None
+        self.setup_files = defaultdict(set)
+        self.tests = {}
+        self.report = None
+
+    def relative(self, filename):
+        """Путь файла внутри проекта или None для чужих файлов."""
+        try:
+            return self.paths[filename]
+        except KeyError:
+            pass
+        path = None
+        # У кода из строк и замороженных модулей имя вида '<frozen abc>'.
+        if not filename.startswith('<'):
+            resolved = Path(filename).resolve()
+            try:
+                relative = resolved.relative_to(self.root)
+            except ValueError:
+                # Общий пакет yacommon лежит выше корня проекта.
+                if SHARED_DIR in resolved.parents:
+                    path = Path(
+                        os.path.relpath(resolved, self.root)
+                    ).as_posix()
+            else:
+                if relative.parts[0] not in ('venv', 'env'):
+                    path = relative.as_posix()
+        self.paths[filename] = path
+        return path
+
+    def class_files(self, cls):
+        """Файлы проекта, где определены cls и его предки."""
+        try:
+            return self.owners[cls]
+        except KeyError:
+            pass
+        files = set()
+        for klass in cls.__mro__:
+            module = sys.modules.get(klass.__module__)
+            path = getattr(module, '__file__', None)
+            if path and self.relative(path):
+                files.add(self.relative(path))
+        self.owners[cls] = files
+        return files
+
+    def trace(self, frame, event, arg):
+        if event != 'call':
+            return
+        code = frame.f_code
+        path = self.relative(code.co_filename)
+        if path:
+            self.touched.add(path)
+        # Представление или форма без своих методов исполняет только
+        # код Django, поэтому учитываются и классы экземпляров.
+        if code.co_argcount and code.co_varnames[0] == 'self':
+            owner = type(frame.f_locals.get('self'))
+            self.touched |= self.class_files(owner)
+
+    def find_template(self, find):
+        recorder = self
+
+        def recorded_find(engine, *args, **kwargs):
+            template, origin = find(engine, *args, **kwargs)
+            path = recorder.relative(origin.name)
+            if path:
+                recorder.touched.add(path)
+            return template, origin
+
+        return recorded_find
+
+    @contextmanager
+    def recording(self):
+        """Собирает файлы и шаблоны, затронутые в блоке."""
+        self.touched = set()
+        previous, find = sys.getprofile(), Engine.find_template
+        Engine.find_template = self.find_template(find)
+        sys.setprofile(self.trace)
+        try:
+            yield self.touched
+        finally:
+            sys.setprofile(previous)
+            Engine.find_template = find
+
+    def record(self, item, phase):
+        test = self.tests.setdefault(
+            item.nodeid, {'files': set(), 'failed': False}
+        )
+        with self.recording() as touched:
+            yield
+        test['files'] |= touched
+        if phase == 'setup':
+            # Фикстуры модуля и setUpTestData выполняются при подготовке
+            # первого теста модуля, а нужны всем его тестам.
+            self.setup_files[item.nodeid.split('::')[0]] |= touched
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_setup(self, item):
+        yield from self.record(item, 'setup')
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_call(self, item):
+        yield from self.record(item, 'call')
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_teardown(self, item, nextitem):
+        yield from self.record(item, 'teardown')
+
+    def pytest_runtest_logreport(self, report):
+        if report.failed:
+            self.tests[report.nodeid]['failed'] = True
+
+    def results(self):
+        tests = {}
+        for nodeid, test in sorted(self.tests.items()):
+            files = test['files'] | self.setup_files[nodeid.split('::')[0]]
+            tests[nodeid] = {
+                'files': sorted(
+                    path for path in files
+                    if not any(fnmatch(path, rule) for rule in FULL_RUN)
+                ),
+                'failed': test['failed'],
+            }
+        return tests
+
+    def pytest_sessionfinish(self, session):
+        tests = self.results()
+        commit = git(self.root, 'rev-parse', 'HEAD')
+        changed = changed_files(self.root, commit[0]) if commit else None
+        if changed is None:
+            self.report = 'git недоступен, карта не записана'
+            return
+        # Изменения, которые уже были в рабочем дереве при записи,
+        # запоминаются по содержимому.
+        dirty = {
+            path: file_hash(self.root / path) for path in sorted(changed)
+        }
+        path = map_path(self.config)
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({
+                'version': VERSION,
+                'commit': commit[0],
+                'dirty': dirty,
+                'checksum': tests_checksum(tests),
+                'tests': tests,
+            }, file, ensure_ascii=False, indent=1, sort_keys=True)
+        self.report = f'карта {len(tests)} тестов записана в {path.name}'
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if self.report:
+            terminalreporter.write_line(f'Выбор тестов: {self.report}')
+
+
+class Selector:
+    """Плагин pytest, который оставляет только затронутые тесты."""
+
+    def __init__(self, config):
+        self.config = config
+        self.root = config.rootpath
+        self.report = None
+        self.nothing_affected = False
+
+    def load(self):
+        path = map_path(self.config)
+        try:
+            with open(path, encoding='utf-8') as file:
+                impact = json.load(file)
+        except FileNotFoundError:
+            return None, f'нет карты {path.name}, запустите --impact-record'
+        except ValueError:
+            return None, f'карта {path.name} испорчена'
+        if impact.get('version') != VERSION or impact.get(
+            'checksum'
+        ) != tests_checksum(impact.get('tests')):
+            return None, f'карта {path.name} изменена или устарела'
+        return impact, None
+
+    def changes(self, impact):
+        """Файлы, изменённые с момента записи карты; None без git."""
+        changed = changed_files(self.root, impact['commit'])
+        if changed is None:
+            return None
+        dirty = impact['dirty']
+        return {
+            path for path in changed | set(dirty)
+            if path not in dirty or file_hash(self.root / path) != dirty[path]
+        }
+
+    def affected(self, items):
+        """Затронутые тесты или None и причина для полного прогона."""
+        impact, reason = self.load()
+        if impact is None:
+            return None, reason
+        changed = self.changes(impact)
+        if changed is None:
+            return None, 'git не может сравнить с записанной картой'
+        for rule in FULL_RUN:
+            hits = sorted(name for name in changed if fnmatch(name, rule))
+            if hits:
+                return None, f'изменён {hits[0]}'
+        tests = impact['tests']
+        # Новые тестовые модули не считаются неизвестными: их тесты
+        # не записаны в карту и будут выбраны.
+        known = set().union(
+            *(test['files'] for test in tests.values()),
+            (item.nodeid.split('::')[0] for item in items),
+        )
+        unknown = sorted(changed - known)
+        if unknown:
+            return None, f'{unknown[0]} нет в карте'
+        selected = [
+            item for item in items
+            if item.nodeid not in tests or tests[item.nodeid]['failed']
+            or changed.intersection(tests[item.nodeid]['files'])
+        ]
+        return selected, f'изменено файлов: {len(changed)}'
+
+    def pytest_collection_modifyitems(self, session, config, items):
+        selected, reason = self.affected(items)
+        if selected is None:
+            self.report = f'все {len(items)} тестов: {reason}'
+            return
+        chosen = set(map(id, selected))
+        deselected = [item for item in items if id(item) not in chosen]
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
+        self.nothing_affected = not selected
+        self.report = (
+            f'{len(selected)} из {len(selected) + len(deselected)} '
+            f'тестов, {reason}'
+        )
+
+    def pytest_sessionfinish(self, session, exitstatus):
+        # Изменения не затронули ни одного теста — это успех, а не
+        # ошибка «тесты не найдены».
+        if self.nothing_affected and (
+            exitstatus == pytest.ExitCode.NO_TESTS_COLLECTED
+        ):
+            session.exitstatus = pytest.ExitCode.OK
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if self.report:
+            terminalreporter.write_line(f'Выбор тестов: {self.report}')
@@ -0,0 +1,182 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from yacommon.bulk import last_id, new_ids
+
+from .forms import WARNING, NoteBatchForm
+from .models import Note
+from .revisions import record_revisions
+from .slugs import allocate_slugs
+
+CREATE = 'create'
+UPDATE = 'update'
+DELETE = 'delete'
+FIELDS = ('title', 'text', 'slug')
+CONFLICT = 'Пачка нарушила ограничение базы и не применена.'
+
+
+class BatchError(Exception):
+    """Запрос к пакетному API составлен неверно."""
+
+
+def parse_operations(payload):
+    """Проверяет форму запроса и возвращает список операций."""
+    if not isinstance(payload, dict):
+        raise BatchError('Ожидается объект с ключом operations.')
+    operations = payload.get('operations')
+    if not isinstance(operations, list) or not operations:
+        raise BatchError('operations должен быть непустым списком.')
+    limit = settings.NOTES_API_BATCH_LIMIT
+    if len(operations) > limit:
+        raise BatchError(f'Не больше {limit} операций в запросе.')
+    for operation in operations:
+        if not isinstance(operation, dict):
+            raise BatchError('Каждая операция должна быть объектом.')
+        if operation.get('op') not in (CREATE, UPDATE, DELETE):
+            raise BatchError('op должен быть create, update или delete.')
+        if operation['op'] != CREATE and not isinstance(
+            operation.get('id'), int
+        ):
+            raise BatchError('Для update и delete нужен целый id.')
+    return operations
+
+
+class Batch:
+    """
+    Пачка операций над заметками одного автора.
+
+    Заметки для update и delete читаются одним запросом и только
+    среди заметок автора — как в NoteBase.get_queryset.
+    """
+
+    def __init__(self, author, operations):
+        self.author = author
+        self.operations = operations
+        self.results = [{'op': operation['op']} for operation in operations]
+        self.creates = []
+        self.updates = []
+        self.deletes = []
+
+    def error(self, index, errors):
+        self.results[index].update(status='error', errors=errors)
+
+    def conflict(self):
+        """Ошибка базы при применении: пачка целиком отклонена."""
+        for index in range(len(self.results)):
+            self.error(index, {'__all__': [CONFLICT]})
+
+    def validate(self):
+        """Проверяет все операции; True, если пачку можно применять."""
+        ids = [
+            operation['id'] for operation in self.operations
+            if operation['op'] != CREATE
+        ]
+        notes = Note.objects.filter(author=self.author).in_bulk(ids)
+        seen = set()
+        for index, operation in enumerate(self.operations):
+            op = operation['op']
+            note = notes.get(operation.get('id'))
+            if op != CREATE:
+                self.results[index]['id'] = operation['id']
+                if note is None:
+                    self.error(index, {'id': ['Заметка не найдена.']})
+                    continue
+                if note.pk in seen:
+                    self.error(index, {'id': ['Заметка уже есть в пачке.']})
+                    continue
+                seen.add(note.pk)
+            if op == DELETE:
+                self.deletes.append((index, note))
+                continue
+            instance = note or Note(author=self.author)
+            data = {
+                field: operation.get(field, getattr(instance, field))
+                for field in FIELDS
+            }
+            form = NoteBatchForm(data, instance=instance)
+            if not form.is_valid():
+                self.error(index, form.errors.get_json_data())
+                continue
+            target = self.creates if op == CREATE else self.updates
+            target.append((index, form.instance))
+        self.check_slugs()
+        return all('errors' not in result for result in self.results)
+
+    def check_slugs(self):
+        """
+        Уникальность заданных slug: один запрос на всю пачку.
+
+        slug удаляемой в этой же пачке заметки можно занять.
+        """
+        claimed = {}
+        for index, note in self.creates + self.updates:
+            if not note.slug:
+                continue
+            if note.slug in claimed:
+                self.error(index, {'slug': [note.slug + WARNING]})
+            else:
+                claimed[note.slug] = (index, note)
+        deleted = {note.pk for _, note in self.deletes}
+        holders = Note.objects.filter(slug__in=claimed).values_list(
+            'slug', 'pk'
+        )
+        for slug, holder in holders:
+            index, note = claimed[slug]
+            if holder != note.pk and holder not in deleted:
+                self.error(index, {'slug': [slug + WARNING]})
+
+    def apply(self):
+        """Применяет проверенную пачку в транзакции apply_batch."""
+        creates = [note for _, note in self.creates]
+        updates = [note for _, note in self.updates]
+        if self.deletes:
+            Note.objects.filter(
+                pk__in=[note.pk for _, note in self.deletes]
+            ).delete()
+        allocate_slugs(
+            [note for note in updates + creates if not note.slug],
+            reserved={note.slug for note in updates + creates},
+        )
+        if updates:
+            Note.objects.bulk_update(updates, FIELDS)
+        if creates:
+            # SQLite не возвращает id из bulk_create. Транзакция держит
+            # блокировку записи, так что все id после before — наши,
+            # в порядке вставки.
+            before = last_id(Note)
+            Note.objects.bulk_create(creates)
+            for note, pk in zip(creates, new_ids(Note, before)):
+                note.pk = pk
+        record_revisions(updates, created=creates)
+        for status, items in (
+            ('created', self.creates), ('updated', self.updates)
+        ):
+            for index, note in items:
+                self.results[index].update(
+                    status=status, id=note.pk, slug=note.slug
+                )
+        for index, _ in self.deletes:
+            self.results[index]['status'] = 'deleted'
+
+
+def apply_batch(author, payload):
+    """
+    Проверяет и применяет пачку операций автора.
+
+    Пачка применяется целиком или не применяется совсем. Проверка
+    и применение идут в одной транзакции с блокировкой записи:
+    slug, свободные при проверке, не займёт параллельный запрос.
+    Нарушение ограничений базы возвращается как ошибка пачки.
+    Возвращает признак применения и результаты по каждой операции.
+    """
+    batch = Batch(author, parse_operations(payload))
+    try:
+        with transaction.atomic():
+            if batch.validate():
+                batch.apply()
+                return True, batch.results
+    except IntegrityError:
+        batch.conflict()
+    for result in batch.results:
+        result.setdefault('status', 'valid')
+    return False, batch.results
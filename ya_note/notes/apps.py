@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class NotesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'notes'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from yanote.sqlite_pragmas import apply_pragmas
+
+        from . import signals  # noqa: F401
+        from .fields import register_functions
+        connection_created.connect(register_functions)
+        connection_created.connect(apply_pragmas)
@@ -0,0 +1,140 @@
+import zipfile
+from collections import namedtuple
+from pathlib import PurePosixPath
+
+from django.db import IntegrityError, transaction
+
+from yacommon.bulk import batches
+
+from .models import Note
+from .slugs import MAX_ATTEMPTS, allocate_slugs
+
+MAX_NOTE_SIZE = 1024 * 1024
+TITLE_PREFIX = '# '
+SKIPPED_SHOWN = 10
+
+ImportResult = namedtuple('ImportResult', ('imported', 'skipped'))
+
+
+class StreamBuffer:
+    """Поток без перемотки: zipfile пишет в него, мы забираем байты."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def note_to_markdown(note):
+    return f'{TITLE_PREFIX}{note.title}\n\n{note.text}'
+
+
+def markdown_to_note(name, content):
+    """Заголовок — первая строка «# …», иначе имя файла."""
+    first_line, _, rest = content.partition('\n')
+    if first_line.startswith(TITLE_PREFIX):
+        title, text = first_line[len(TITLE_PREFIX):], rest.lstrip('\n')
+    else:
+        title, text = PurePosixPath(name).stem, content
+    max_length = Note._meta.get_field('title').max_length
+    return Note(title=title.strip()[:max_length], text=text)
+
+
+def export_notes(queryset, chunk_size=500):
+    """
+    Отдаёт zip-архив заметок по частям.
+
+    Заметки читаются итератором, в памяти держится только
+    текущая заметка и её сжатые байты.
+    """
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        notes = queryset.only('slug', 'title', 'text').order_by('id')
+        for note in notes.iterator(chunk_size=chunk_size):
+            archive.writestr(f'{note.slug}.md', note_to_markdown(note))
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+def read_notes(archive, skipped):
+    """
+    Заметки из .md-файлов архива, файлы читаются по одному.
+
+    Имена других файлов и слишком больших заметок добавляются
+    в список skipped.
+    """
+    for info in archive.infolist():
+        if info.is_dir():
+            continue
+        if not info.filename.endswith('.md') or (
+            info.file_size > MAX_NOTE_SIZE
+        ):
+            skipped.append(info.filename)
+            continue
+        with archive.open(info) as member:
+            content = member.read(MAX_NOTE_SIZE + 1)
+        if len(content) > MAX_NOTE_SIZE:
+            skipped.append(info.filename)
+            continue
+        yield markdown_to_note(
+            info.filename, content.decode('utf-8', errors='replace')
+        )
+
+
+def insert_batch(notes):
+    """
+    Вставляет пачку заметок со свободными slug.
+
+    Slug подбираются одним запросом на пачку; если параллельный
+    запрос занял какой-то из них, пачка подбирается заново.
+    """
+    for attempt in range(MAX_ATTEMPTS):
+        allocate_slugs(notes)
+        try:
+            with transaction.atomic():
+                Note.objects.bulk_create(notes)
+                return
+        except IntegrityError:
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+
+
+def import_notes(file, author, batch_size=500):
+    """
+    Загружает заметки автора из zip-архива с Markdown-файлами.
+
+    Все пачки вставляются в одной транзакции. Возвращает ImportResult:
+    число заметок и имена пропущенных файлов.
+    """
+    imported, skipped = 0, []
+    with zipfile.ZipFile(file) as archive, transaction.atomic():
+        for batch in batches(read_notes(archive, skipped), batch_size):
+            for note in batch:
+                note.author = author
+            insert_batch(batch)
+            imported += len(batch)
+    return ImportResult(imported, skipped)
+
+
+def skipped_message(skipped):
+    """Сообщение о пропущенных файлах архива или пустая строка."""
+    if not skipped:
+        return ''
+    names = ', '.join(skipped[:SKIPPED_SHOWN])
+    more = len(skipped) - SKIPPED_SHOWN
+    if more > 0:
+        names += f' и ещё {more}'
+    return (
+        f'Пропущено файлов: {len(skipped)} (не .md или больше '
+        f'{MAX_NOTE_SIZE // 1024} КиБ): {names}'
+    )
@@ -0,0 +1,12 @@
+import pytest
+
+from notes import factories
+from yanote.pytest_plugin import (  # noqa: F401
+    django_db_setup, pytest_terminal_summary, query_budgets
+)
+
+
+@pytest.fixture
+def dataset(db):
+    """Небольшой набор: 5 пользователей и 200 заметок."""
+    return factories.seed_dataset(users=5, notes=200)
@@ -0,0 +1,105 @@
+"""
+Массовое создание правдоподобных данных для тестов и нагрузки.
+
+Строки вставляются пачками через yacommon.bulk. Одинаковый seed даёт
+одинаковые данные.
+"""
+import random
+from collections import namedtuple
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+
+from yacommon.bulk import (
+    BATCH_SIZE, batches, insert_rows, last_id, new_ids, page_cache,
+    text_pool,
+)
+
+from .models import Note
+from .search import deferred_indexing
+from .slugs import slug_base
+
+User = get_user_model()
+
+WORDS = (
+    'купить', 'молоко', 'позвонить', 'маме', 'встреча', 'в', 'офисе',
+    'идея', 'для', 'проекта', 'список', 'книг', 'прочитать', 'до',
+    'пятницы', 'оплатить', 'счета', 'записаться', 'к', 'врачу', 'план',
+    'отпуска', 'рецепт', 'пирога', 'заметки', 'с', 'лекции', 'пароль',
+    'от', 'роутера', 'подарок', 'другу', 'сдать', 'отчёт', 'починить',
+    'кран', 'тренировка', 'утром', 'вечером', 'завтра',
+)
+
+Dataset = namedtuple('Dataset', ('users', 'notes'))
+
+
+def create_users(count, seed=0, prefix='user'):
+    """
+    Пользователи prefix-seed-0, prefix-seed-1, … без пароля для входа.
+
+    Пользователей обычно немного, поэтому это обычный bulk_create.
+    Возвращает их id.
+    """
+    before = last_id(User)
+    password = make_password(None)
+    for batch in batches(range(count), BATCH_SIZE):
+        User.objects.bulk_create(
+            User(username=f'{prefix}-{seed}-{index}', password=password)
+            for index in batch
+        )
+    return new_ids(User, before)
+
+
+def create_notes(author_ids, count, seed=0):
+    """
+    Заметки авторов author_ids с уникальными slug.
+
+    Заметок у авторов разное число: у немногих их очень много.
+    slug — транслитерация заголовка и номер, который больше любого
+    id в таблице, поэтому с уже созданными slug вида «…-N» при
+    обычной нумерации он не совпадает. Поисковый индекс строится
+    после вставки одним запросом. Возвращает id заметок.
+    """
+    rnd = random.Random(f'notes-{seed}')
+    text_field = Note._meta.get_field('text')
+    max_length = Note._meta.get_field('slug').max_length
+    titles = [title[:100] for title in text_pool(rnd, WORDS, 1, 6)]
+    bases = [slug_base(title, max_length) for title in titles]
+    # Длинные тексты хранятся сжатыми: готовим значения один раз.
+    texts = [
+        text_field.get_db_prep_save(text, connection)
+        for text in text_pool(rnd, WORDS, 5, 200)
+    ]
+    weights = [1 / rank for rank in range(1, len(author_ids) + 1)]
+    before = last_id(Note)
+
+    def rows():
+        # Случайные значения берутся сразу на все строки: по одному
+        # вызову random на строку выходит заметно дольше.
+        authors = rnd.choices(author_ids, weights, k=count)
+        choices = rnd.choices(range(len(titles)), k=count)
+        picked = rnd.choices(texts, k=count)
+        numbers = range(before + 1, before + count + 1)
+        for number, author_id, choice, text in zip(
+            numbers, authors, choices, picked
+        ):
+            suffix = f'-{number}'
+            slug = bases[choice][:max_length - len(suffix)] + suffix
+            yield titles[choice], text, slug, author_id
+
+    with deferred_indexing(before):
+        insert_rows(Note, ('title', 'text', 'slug', 'author'), rows())
+    return new_ids(Note, before)
+
+
+def seed_dataset(users=10, notes=1000, seed=0):
+    """
+    Пользователи и их заметки в одной транзакции.
+
+    Поисковый индекс строится один раз в конце всего наполнения.
+    """
+    with page_cache(), deferred_indexing(last_id(Note)):
+        user_ids = create_users(users, seed)
+        note_ids = create_notes(user_ids, notes, seed)
+    return Dataset(user_ids, note_ids)
@@ -0,0 +1,96 @@
+import lzma
+import zlib
+
+from django.db import models
+
+ZLIB = 'zlib'
+LZMA = 'lzma'
+# Сжатое значение хранится байтами: маркер формата и сжатые данные.
+# Обычный текст хранится строкой, поэтому маркер с ним не путается.
+MARKERS = {ZLIB: b'\x00z1', LZMA: b'\x00x1'}
+COMPRESSORS = {
+    ZLIB: lambda data: zlib.compress(data, 6),
+    LZMA: lzma.compress,
+}
+DECOMPRESSORS = {
+    MARKERS[ZLIB]: zlib.decompress,
+    MARKERS[LZMA]: lzma.decompress,
+}
+MARKER_LENGTH = 3
+
+
+def compress(text, method=ZLIB, threshold=4096):
+    """
+    Сжимает текст длиннее threshold байт.
+
+    Возвращает строку, если текст короткий или сжатие не дало
+    выигрыша, и байты с маркером формата — иначе.
+    """
+    data = text.encode('utf-8')
+    if method is None or len(data) < threshold:
+        return text
+    packed = MARKERS[method] + COMPRESSORS[method](data)
+    if len(packed) >= len(data):
+        return text
+    return packed
+
+
+def decompress(value):
+    """Текст из значения, сохранённого compress."""
+    if not isinstance(value, (bytes, memoryview)):
+        return value
+    value = bytes(value)
+    marker = value[:MARKER_LENGTH]
+    if marker not in DECOMPRESSORS:
+        raise ValueError('Неизвестный формат сжатого текста.')
+    return DECOMPRESSORS[marker](value[MARKER_LENGTH:]).decode('utf-8')
+
+
+def register_functions(sender, connection, **kwargs):
+    """
+    Регистрирует в SQLite функцию notes_decompress.
+
+    Её вызывают триггеры и представление полнотекстового индекса,
+    которым нужен исходный текст заметок. Других подключений она не
+    касается: запись заметок из sqlite3 или dbshell не работает, см.
+    миграцию 0004_note_text_compression.
+    """
+    if connection.vendor == 'sqlite':
+        connection.connection.create_function(
+            'notes_decompress', 1, decompress, deterministic=True
+        )
+
+
+class CompressedTextField(models.TextField):
+    """
+    Текстовое поле, которое сжимает длинные значения в базе.
+
+    Формы, шаблоны и код модели видят обычную строку.
+    """
+
+    def __init__(self, *args, method=ZLIB, threshold=4096, **kwargs):
+        if method is not None and method not in MARKERS:
+            raise ValueError(f'Неизвестный метод сжатия: {method}')
+        self.method = method
+        self.threshold = threshold
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.method != ZLIB:
+            kwargs['method'] = self.method
+        if self.threshold != 4096:
+            kwargs['threshold'] = self.threshold
+        return name, path, args, kwargs
+
+    def from_db_value(self, value, expression, connection):
+        return decompress(value)
+
+    def to_python(self, value):
+        return super().to_python(decompress(value))
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = super().get_db_prep_value(value, connection, prepared)
+        if value is None:
+            return value
+        return compress(value, self.method, self.threshold)
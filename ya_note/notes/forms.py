@@ -1,4 +1,4 @@
-from pytils.translit import slugify
+import zipfile
 
 from django import forms
 from django.core.exceptions import ValidationError
@@ -6,6 +6,8 @@ from django.core.exceptions import ValidationError
 from .models import Note
 
 WARNING = ' - такой slug уже существует, придумайте уникальное значение!'
+NO_FREE_SLUG = 'Не удалось подобрать свободный slug, задайте его сами.'
+BUSY = 'База занята другими запросами, отправьте форму ещё раз.'
 
 
 class NoteForm(forms.ModelForm):
@@ -16,14 +18,66 @@ class NoteForm(forms.ModelForm):
         fields = ('title', 'text', 'slug')
 
     def clean_slug(self):
-        """Обрабатывает случай, если slug не уникален."""
-        cleaned_data = super().clean()
-        slug = cleaned_data.get('slug')
-        if not slug:
-            title = cleaned_data.get('title')
-            slug = slugify(title)[:100]
-        if Note.objects.filter(
+        """
+        Обрабатывает случай, если slug не уникален.
+
+        Пустой slug подберёт модель при сохранении: заголовок
+        в транслитерации с первым свободным суффиксом. Неизменённый
+        slug заметки не проверяется: он уже принадлежит ей.
+        """
+        slug = self.cleaned_data.get('slug')
+        if self.instance.pk and slug == self.instance.slug:
+            return slug
+        if slug and Note.objects.filter(
                 slug=slug
         ).exclude(id=self.instance.pk).exists():
             raise ValidationError(slug + WARNING)
         return slug
+
+    def validate_unique(self):
+        """
+        Уникальность slug уже проверена в clean_slug и индексом БД.
+
+        Остальные ограничения проверяет модель; поля, которые не
+        прошли проверку формы, не проверяются.
+        """
+        exclude = [
+            field.name for field in self.instance._meta.fields
+            if field.name not in self.cleaned_data
+        ]
+        exclude.append('slug')
+        try:
+            self.instance.validate_unique(exclude=exclude)
+        except ValidationError as error:
+            self.add_error(None, error)
+
+
+class NoteBatchForm(NoteForm):
+    """
+    Проверка одной операции пакетного API.
+
+    Уникальность slug проверяется для всей пачки одним запросом.
+    """
+
+    def clean_slug(self):
+        return self.cleaned_data.get('slug')
+
+
+class NotesImportForm(forms.Form):
+    """Загрузка zip-архива с заметками в формате Markdown."""
+    archive = forms.FileField(
+        label='Архив',
+        help_text='Zip-архив с файлами .md: одна заметка в файле'
+    )
+
+    def clean_archive(self):
+        archive = self.cleaned_data['archive']
+        if not zipfile.is_zipfile(archive):
+            raise ValidationError('Файл не является zip-архивом.')
+        archive.seek(0)
+        return archive
+
+
+class NotesSearchForm(forms.Form):
+    """Поиск по заголовкам и текстам своих заметок."""
+    q = forms.CharField(label='Поиск', max_length=100)
@@ -0,0 +1,88 @@
+import random
+from statistics import median
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import override_settings
+
+from notes.models import Note
+from notes.revisions import reconstruct
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет объём истории на одну правку и время восстановления '
+        'правки при разной частоте полных копий. Данные создаются '
+        'в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--intervals', type=int, nargs='+', default=[1, 8, 16, 32],
+            help='Частоты полных копий; 1 — копия на каждую правку.'
+        )
+        parser.add_argument('--edits', type=int, default=300)
+        parser.add_argument(
+            '--lines', type=int, default=200,
+            help='Число строк в тексте заметки.'
+        )
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        for interval in options['intervals']:
+            with override_settings(
+                NOTES_REVISION_SNAPSHOT_INTERVAL=interval
+            ), transaction.atomic():
+                self.run(interval, options)
+                transaction.set_rollback(True)
+
+    def edit(self, rnd, lines):
+        """Правка как у живого пользователя: пара строк и иногда новая."""
+        for _ in range(rnd.randint(1, 3)):
+            index = rnd.randrange(len(lines))
+            lines[index] = f'Строка {index} после правки {rnd.random():.6f}'
+        if rnd.random() < 0.3:
+            lines.append(f'Новая строка {rnd.random():.6f}')
+        return '\n'.join(lines)
+
+    def run(self, interval, options):
+        rnd = random.Random(options['seed'])
+        author = User.objects.create(username='benchmark_note_revisions')
+        lines = [
+            f'Строка {index}: ' + 'текст заметки ' * rnd.randint(2, 8)
+            for index in range(options['lines'])
+        ]
+        note = Note(title='История', slug='benchmark-revisions',
+                    author=author)
+        full_copies = 0
+        start = perf_counter()
+        for _ in range(options['edits']):
+            note.text = self.edit(rnd, lines)
+            note.save()
+            full_copies += len(note.text.encode('utf-8'))
+        edit_time = (perf_counter() - start) / options['edits']
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT COUNT(*), SUM(LENGTH(CAST(data AS BLOB))) '
+                'FROM notes_noterevision WHERE note_id = %s', [note.pk]
+            )
+            count, stored = cursor.fetchone()
+        timings = []
+        for _ in range(options['repeat']):
+            number = rnd.randint(1, count)
+            start = perf_counter()
+            reconstruct(note, number)
+            timings.append(perf_counter() - start)
+        self.stdout.write(
+            f'копия раз в {interval:>3} правок: '
+            f'{stored / count:8.0f} Б на правку '
+            f'(полные копии: {full_copies / count:.0f} Б), '
+            f'сохранение {edit_time * 1000:5.2f} мс, '
+            f'восстановление p50 {median(timings) * 1000:5.2f} мс, '
+            f'max {max(timings) * 1000:5.2f} мс'
+        )
@@ -0,0 +1,115 @@
+import random
+from statistics import median
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import reverse
+
+from notes.fields import LZMA, ZLIB
+from notes.models import Note
+
+User = get_user_model()
+
+LEVELS = ('DEBUG', 'INFO', 'INFO', 'INFO', 'WARNING', 'ERROR')
+MESSAGES = (
+    'request finished path=/api/items/{} status=200 duration={}ms',
+    'cache miss key=item:{} backend=redis latency={}ms',
+    'retrying job id={} attempt={} after timeout',
+    'user {} logged in from 10.0.{}.17',
+)
+
+
+def make_log(rnd, size):
+    """Текст, похожий на вставленный в заметку лог приложения."""
+    lines = []
+    length = 0
+    while length < size:
+        message = rnd.choice(MESSAGES).format(
+            rnd.randint(1, 100000), rnd.randint(1, 999)
+        )
+        line = (
+            f'2026-10-18 12:{rnd.randint(0, 59):02}:{rnd.randint(0, 59):02}'
+            f',{rnd.randint(0, 999):03} {rnd.choice(LEVELS)} '
+            f'app.worker: {message}'
+        )
+        lines.append(line)
+        length += len(line) + 1
+    return '\n'.join(lines)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает размер хранимых текстов заметок и время ответа '
+        'страницы заметки без сжатия, с zlib и с lzma. Данные '
+        'создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--notes', type=int, default=200)
+        parser.add_argument(
+            '--size', type=int, default=64 * 1024,
+            help='Размер текста одной заметки в байтах.'
+        )
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        field = Note._meta.get_field('text')
+        method = field.method
+        texts = [
+            make_log(random.Random(options['seed'] + index), options['size'])
+            for index in range(options['notes'])
+        ]
+        try:
+            for current in (None, ZLIB, LZMA):
+                field.method = current
+                with transaction.atomic():
+                    self.run(current or 'без сжатия', texts, options)
+                    transaction.set_rollback(True)
+        finally:
+            field.method = method
+
+    def run(self, label, texts, options):
+        author = User.objects.create(username='benchmark_note_text')
+        start = perf_counter()
+        Note.objects.bulk_create(
+            Note(
+                title=f'Лог {index}', text=text,
+                slug=f'benchmark-note-text-{index}', author=author,
+            )
+            for index, text in enumerate(texts)
+        )
+        write_time = perf_counter() - start
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT SUM(LENGTH(CAST(text AS BLOB))) FROM notes_note '
+                'WHERE author_id = %s', [author.pk]
+            )
+            stored = cursor.fetchone()[0]
+        raw = sum(len(text.encode('utf-8')) for text in texts)
+        slug = 'benchmark-note-text-0'
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(author)
+        url = reverse('notes:detail', args=(slug,))
+        read = self.measure(
+            lambda: Note.objects.only('text').get(slug=slug).text,
+            options['repeat'],
+        )
+        detail = self.measure(lambda: client.get(url), options['repeat'])
+        self.stdout.write(
+            f'{label:>12}: хранится {stored / 1024:10.1f} КиБ '
+            f'из {raw / 1024:.1f} ({stored / raw:6.1%}), '
+            f'запись {write_time * 1000:8.1f} мс, '
+            f'чтение текста {read:5.2f} мс, NoteDetail {detail:6.2f} мс'
+        )
+
+    def measure(self, run, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = perf_counter()
+            run()
+            timings.append(perf_counter() - start)
+        return median(timings) * 1000
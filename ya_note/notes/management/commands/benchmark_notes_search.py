@@ -0,0 +1,126 @@
+import random
+from itertools import accumulate
+from statistics import median
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from notes.models import Note
+from notes.search import optimize_search_index, search_notes
+
+User = get_user_model()
+
+SYLLABLES = (
+    'ка', 'ро', 'ми', 'ту', 'не', 'ло', 'за', 'ви', 'ст', 'пра',
+    'мо', 'ду', 'ре', 'ша', 'ген', 'тор', 'вал', 'ник', 'ус', 'ом',
+)
+
+
+def make_vocabulary(rnd, size):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rnd.choices(SYLLABLES, k=rnd.randint(2, 4))))
+    return sorted(words)
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет поиск по заметкам одного автора, пока общая таблица '
+        'растёт до заданных размеров. Данные создаются в транзакции '
+        'и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+',
+            default=[10000, 100000, 1000000],
+            help='Размеры таблицы заметок, на которых идут замеры.'
+        )
+        parser.add_argument('--authors', type=int, default=1000)
+        parser.add_argument(
+            '--author-notes', type=int, default=500,
+            help='Число заметок автора, по которым идёт поиск.'
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--optimize', action='store_true',
+            help='Уплотнять индекс после каждого заполнения.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.rnd = random.Random(options['seed'])
+        self.vocabulary = make_vocabulary(self.rnd, 5000)
+        # Частоты слов убывают по закону Ципфа, как в живом тексте.
+        self.weights = list(accumulate(
+            1 / rank for rank in range(1, len(self.vocabulary) + 1)
+        ))
+        queries = (
+            self.vocabulary[10],
+            self.vocabulary[3000],
+            f'{self.vocabulary[20]} {self.vocabulary[400]}',
+            'несуществующее',
+        )
+        with transaction.atomic():
+            authors = self.seed_authors(options['authors'])
+            self.probe = authors[0]
+            self.created = 0
+            self.seed_notes([self.probe], options['author_notes'])
+            for size in sorted(options['sizes']):
+                start = perf_counter()
+                self.seed_notes(authors[1:], size - self.created)
+                if options['optimize']:
+                    optimize_search_index()
+                self.stdout.write(
+                    f'Заметок в таблице: {self.created} '
+                    f'(+{perf_counter() - start:.1f} с на заполнение)'
+                )
+                for query in queries:
+                    self.report(query, options['repeat'])
+            transaction.set_rollback(True)
+
+    def seed_authors(self, count):
+        User.objects.bulk_create(
+            User(username=f'benchmark-{index}') for index in range(count)
+        )
+        return list(
+            User.objects.filter(username__startswith='benchmark-')
+            .order_by('id')
+        )
+
+    def words(self, k):
+        return ' '.join(
+            self.rnd.choices(self.vocabulary, cum_weights=self.weights, k=k)
+        )
+
+    def seed_notes(self, authors, count):
+        if count <= 0:
+            return
+        start = self.created
+        # Slug задаётся явно, чтобы не подбирать его для каждой заметки.
+        Note.objects.bulk_create(
+            (
+                Note(
+                    title=self.words(4).capitalize()[:100],
+                    text=self.words(40),
+                    slug=f'benchmark-{start + index}',
+                    author=authors[index % len(authors)],
+                )
+                for index in range(count)
+            ),
+            batch_size=5000,
+        )
+        self.created += count
+
+    def report(self, query, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = perf_counter()
+            page = search_notes(self.probe, query, per_page=10)
+            timings.append(perf_counter() - start)
+        self.stdout.write(
+            f'  «{query}»: {median(timings) * 1000:8.2f} мс, '
+            f'найдено на странице: {len(page)}'
+        )
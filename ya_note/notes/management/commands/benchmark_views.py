@@ -0,0 +1,93 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.urls import reverse
+
+from notes import factories
+from notes.models import Note
+from yacommon.bulk import page_cache
+from yacommon.view_benchmark import BenchmarkCommand, Scenario, url_names
+
+User = get_user_model()
+EXPORT_REPEAT = 5
+
+
+class Command(BenchmarkCommand):
+    help = (
+        'Замеряет все URL проекта на сгенерированных заметках: '
+        'p50/p95/p99, число SQL-запросов и пик памяти. Сохраняет '
+        'результаты в JSON (--save) и сравнивает с ними (--compare). '
+        'Данные откатываются.'
+    )
+    dataset_options = ('users', 'notes', 'seed')
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--users', type=int, default=2)
+        parser.add_argument(
+            '--notes', type=int, default=100000,
+            help='Заметок у каждого пользователя.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def seed(self, options):
+        with page_cache():
+            user_ids = factories.create_users(
+                options['users'], options['seed'], prefix='benchmark'
+            )
+            for index, user_id in enumerate(user_ids):
+                factories.create_notes(
+                    [user_id], options['notes'], options['seed'] + index
+                )
+        self.author = User.objects.get(pk=user_ids[0])
+        # Заметка через ORM, чтобы у неё была история правок.
+        self.note = Note.objects.create(
+            title='Заметка для замера', text='Текст', author=self.author
+        )
+        self.note.text = 'Исправленный текст'
+        self.note.save()
+        self.client = Client(HTTP_HOST='localhost')
+        self.client.force_login(self.author)
+        self.logout_client = Client(HTTP_HOST='localhost')
+
+    def url_args(self, name):
+        if name in (
+            'notes:detail', 'notes:edit', 'notes:delete', 'notes:history'
+        ):
+            return (self.note.slug,)
+        if name == 'notes:revision':
+            return (self.note.slug, 1)
+        return ()
+
+    def login(self):
+        self.logout_client.force_login(self.author)
+
+    def scenarios(self):
+        for name in url_names():
+            url = reverse(name, args=self.url_args(name))
+            if name == 'users:logout':
+                # Выход завершает сессию: у него свой клиент, который
+                # входит снова перед каждым запросом.
+                yield Scenario(
+                    name, 'get', url, prepare=self.login,
+                    client=self.logout_client,
+                )
+            elif name == 'notes:api_batch':
+                yield Scenario(
+                    name, 'post', url, json.dumps({'operations': [
+                        {'op': 'create', 'title': 'Из API', 'text': 'Текст'}
+                    ]}), content_type='application/json',
+                )
+            elif name == 'notes:export':
+                yield Scenario(name, 'get', url, repeat=EXPORT_REPEAT)
+            else:
+                yield Scenario(name, 'get', url)
+        yield Scenario(
+            'notes:add POST', 'post', reverse('notes:add'),
+            {'title': 'Новая заметка', 'text': 'Текст'},
+        )
+        yield Scenario(
+            'notes:search ?q', 'get', reverse('notes:search'),
+            {'q': factories.WORDS[1]},
+        )
@@ -0,0 +1,144 @@
+import re
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes import urls
+from notes.models import Note
+
+User = get_user_model()
+
+
+def explain(sql):
+    """Строки EXPLAIN QUERY PLAN для запроса."""
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def find_problems(plan):
+    """Полные просмотры таблиц и сортировки во временном B-дереве."""
+    problems = []
+    for detail in plan:
+        if detail.startswith('SCAN') and 'USING' not in detail:
+            problems.append(detail)
+        elif 'USE TEMP B-TREE' in detail:
+            problems.append(detail)
+    return problems
+
+
+def model_for_table(table):
+    for model in apps.get_models():
+        if model._meta.db_table == table:
+            return model
+    return None
+
+
+def recommend(sql, table):
+    """
+    Составной индекс: сначала поля фильтра по равенству,
+    затем поля сортировки. Замыкающий id не нужен: в SQLite
+    он входит в любой индекс как rowid.
+    """
+    model = model_for_table(table)
+    if model is None:
+        return None
+    where, _, order = sql.partition(' ORDER BY ')
+    columns = re.findall(rf'"{table}"\."(\w+)" (?:=|IN) (?!")', where)
+    order = order.split(' LIMIT ')[0]
+    columns += [
+        column for column in re.findall(rf'"{table}"\."(\w+)"', order)
+        if column not in columns
+    ]
+    while columns and columns[-1] == model._meta.pk.column:
+        columns.pop()
+    if not columns:
+        return None
+    fields = {field.column: field.name for field in model._meta.fields}
+    names = [fields.get(column, column) for column in columns]
+    return f'{model.__name__}: models.Index(fields={names!r})'
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет все URL приложения notes на тестовых данных, '
+        'выполняет EXPLAIN QUERY PLAN для их SQL и подсказывает индексы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--notes', type=int, default=100)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options['users'], options['notes'])
+            recommendations = set()
+            for pattern in urls.urlpatterns:
+                recommendations |= self.check_url(pattern.name)
+            transaction.set_rollback(True)
+        self.stdout.write('\nРекомендуемые индексы:')
+        for recommendation in sorted(recommendations) or ['нет']:
+            self.stdout.write(f'  {recommendation}')
+
+    def seed(self, users_count, notes_per_user):
+        User.objects.bulk_create(
+            User(username=f'explain_views_{index}')
+            for index in range(users_count)
+        )
+        users = User.objects.filter(username__startswith='explain_views_')
+        Note.objects.bulk_create(
+            (
+                Note(
+                    title=f'Заметка {index}',
+                    text='Текст',
+                    slug=f'explain-views-{user_id}-{index}',
+                    author_id=user_id,
+                )
+                for user_id in users.values_list('pk', flat=True)
+                for index in range(notes_per_user)
+            ),
+            batch_size=500,
+        )
+        self.author = users.first()
+        self.note = Note.objects.filter(author=self.author).first()
+        self.client = Client(HTTP_HOST='localhost')
+        self.client.force_login(self.author)
+
+    def url_args(self, name):
+        if name in ('detail', 'edit', 'delete', 'history'):
+            return (self.note.slug,)
+        if name == 'revision':
+            return (self.note.slug, 1)
+        return ()
+
+    def check_url(self, name):
+        url = reverse(f'{urls.app_name}:{name}', args=self.url_args(name))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{urls.app_name}:{name} {url} — {response.status_code}, '
+            f'запросов: {len(queries)}'
+        ))
+        recommendations = set()
+        for query in queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT'):
+                continue
+            problems = find_problems(explain(sql))
+            if not problems:
+                continue
+            self.stdout.write(f'  {sql}')
+            for problem in problems:
+                self.stdout.write(self.style.WARNING(f'    {problem}'))
+                table = problem.split()[-1] if problem.startswith(
+                    'SCAN'
+                ) else re.search(r'FROM "(\w+)"', sql).group(1)
+                recommendation = recommend(sql, table)
+                if recommendation:
+                    recommendations.add(recommendation)
+        return recommendations
@@ -0,0 +1,36 @@
+import zipfile
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.archive import import_notes, skipped_message
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Загружает заметки пользователя из zip-архива с файлами .md.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('archive')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        try:
+            author = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError('Пользователь не найден.')
+        try:
+            result = import_notes(
+                options['archive'], author, options['batch_size']
+            )
+        except (OSError, zipfile.BadZipFile) as error:
+            raise CommandError(f'Не удалось прочитать архив: {error}')
+        self.stdout.write(
+            self.style.SUCCESS(f'Загружено заметок: {result.imported}')
+        )
+        if result.skipped:
+            self.stdout.write(
+                self.style.WARNING(skipped_message(result.skipped))
+            )
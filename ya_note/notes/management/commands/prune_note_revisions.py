@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from notes.models import NoteRevision
+from notes.revisions import prune_revisions
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет старые правки заметок, оставляя последние '
+        'NOTES_REVISIONS_KEEP правок каждой заметки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep', type=int, default=settings.NOTES_REVISIONS_KEEP,
+            help='Сколько последних правок оставлять.'
+        )
+
+    def handle(self, *args, **options):
+        keep = max(options['keep'], 1)
+        note_ids = (
+            NoteRevision.objects.values('note_id')
+            .annotate(total=Count('id')).filter(total__gt=keep)
+            .values_list('note_id', flat=True)
+        )
+        deleted = 0
+        for note_id in list(note_ids):
+            with transaction.atomic():
+                deleted += prune_revisions(note_id, keep)
+        self.stdout.write(self.style.SUCCESS(f'Удалено правок: {deleted}'))
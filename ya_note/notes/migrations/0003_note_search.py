@@ -0,0 +1,49 @@
+from django.db import migrations
+
+# Колонка author_id индексируется как обычный токен: запрос
+# «author_id:N AND …» пересекает короткий список заметок автора
+# со списками слов, и его цена не растёт с размером всей таблицы.
+CREATE_INDEX = """
+CREATE VIRTUAL TABLE notes_note_fts USING fts5(
+    title,
+    text,
+    author_id,
+    content='notes_note',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+INSERT INTO notes_note_fts(notes_note_fts) VALUES('rebuild');
+CREATE TRIGGER notes_note_fts_insert AFTER INSERT ON notes_note BEGIN
+    INSERT INTO notes_note_fts(rowid, title, text, author_id)
+    VALUES (new.id, new.title, new.text, new.author_id);
+END;
+CREATE TRIGGER notes_note_fts_delete AFTER DELETE ON notes_note BEGIN
+    INSERT INTO notes_note_fts(notes_note_fts, rowid, title, text, author_id)
+    VALUES ('delete', old.id, old.title, old.text, old.author_id);
+END;
+CREATE TRIGGER notes_note_fts_update
+AFTER UPDATE OF title, text, author_id ON notes_note BEGIN
+    INSERT INTO notes_note_fts(notes_note_fts, rowid, title, text, author_id)
+    VALUES ('delete', old.id, old.title, old.text, old.author_id);
+    INSERT INTO notes_note_fts(rowid, title, text, author_id)
+    VALUES (new.id, new.title, new.text, new.author_id);
+END;
+"""
+
+DROP_INDEX = """
+DROP TRIGGER notes_note_fts_update;
+DROP TRIGGER notes_note_fts_delete;
+DROP TRIGGER notes_note_fts_insert;
+DROP TABLE notes_note_fts;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0002_note_author_id_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_INDEX, DROP_INDEX),
+    ]
@@ -0,0 +1,135 @@
+from django.db import migrations
+
+import notes.fields
+
+BATCH_SIZE = 500
+
+DROP_INDEX = """
+DROP TRIGGER notes_note_fts_update;
+DROP TRIGGER notes_note_fts_delete;
+DROP TRIGGER notes_note_fts_insert;
+DROP TABLE notes_note_fts;
+"""
+
+# Индекс читает текст заметок через представление: длинные тексты
+# хранятся сжатыми, а в индекс и во фрагменты попадает исходный текст.
+#
+# Ограничение: notes_decompress — функция Python, её регистрирует
+# notes.fields.register_functions в каждом подключении Django. В
+# sqlite3 и manage.py dbshell её нет, поэтому INSERT, UPDATE и DELETE
+# в notes_note оттуда падают на триггерах с «no such function:
+# notes_decompress», как и чтение notes_note_content. Заметки
+# меняются только через Django: модели, manage.py shell и команды.
+CREATE_INDEX = """
+CREATE VIEW notes_note_content AS
+SELECT id, title, notes_decompress(text) AS text, author_id FROM notes_note;
+CREATE VIRTUAL TABLE notes_note_fts USING fts5(
+    title,
+    text,
+    author_id,
+    content='notes_note_content',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+INSERT INTO notes_note_fts(notes_note_fts) VALUES('rebuild');
+CREATE TRIGGER notes_note_fts_insert AFTER INSERT ON notes_note BEGIN
+    INSERT INTO notes_note_fts(rowid, title, text, author_id)
+    VALUES (new.id, new.title, notes_decompress(new.text), new.author_id);
+END;
+CREATE TRIGGER notes_note_fts_delete AFTER DELETE ON notes_note BEGIN
+    INSERT INTO notes_note_fts(notes_note_fts, rowid, title, text, author_id)
+    VALUES (
+        'delete', old.id, old.title, notes_decompress(old.text),
+        old.author_id
+    );
+END;
+CREATE TRIGGER notes_note_fts_update
+AFTER UPDATE OF title, text, author_id ON notes_note BEGIN
+    INSERT INTO notes_note_fts(notes_note_fts, rowid, title, text, author_id)
+    VALUES (
+        'delete', old.id, old.title, notes_decompress(old.text),
+        old.author_id
+    );
+    INSERT INTO notes_note_fts(rowid, title, text, author_id)
+    VALUES (new.id, new.title, notes_decompress(new.text), new.author_id);
+END;
+"""
+
+DROP_COMPRESSED_INDEX = """
+DROP TRIGGER notes_note_fts_update;
+DROP TRIGGER notes_note_fts_delete;
+DROP TRIGGER notes_note_fts_insert;
+DROP TABLE notes_note_fts;
+DROP VIEW notes_note_content;
+"""
+
+CREATE_PLAIN_INDEX = """
+CREATE VIRTUAL TABLE notes_note_fts USING fts5(
+    title,
+    text,
+    author_id,
+    content='notes_note',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+INSERT INTO notes_note_fts(notes_note_fts) VALUES('rebuild');
+CREATE TRIGGER notes_note_fts_insert AFTER INSERT ON notes_note BEGIN
+    INSERT INTO notes_note_fts(rowid, title, text, author_id)
+    VALUES (new.id, new.title, new.text, new.author_id);
+END;
+CREATE TRIGGER notes_note_fts_delete AFTER DELETE ON notes_note BEGIN
+    INSERT INTO notes_note_fts(notes_note_fts, rowid, title, text, author_id)
+    VALUES ('delete', old.id, old.title, old.text, old.author_id);
+END;
+CREATE TRIGGER notes_note_fts_update
+AFTER UPDATE OF title, text, author_id ON notes_note BEGIN
+    INSERT INTO notes_note_fts(notes_note_fts, rowid, title, text, author_id)
+    VALUES ('delete', old.id, old.title, old.text, old.author_id);
+    INSERT INTO notes_note_fts(rowid, title, text, author_id)
+    VALUES (new.id, new.title, new.text, new.author_id);
+END;
+"""
+
+DECOMPRESS_TEXTS = 'UPDATE notes_note SET text = notes_decompress(text);'
+
+
+def compress_texts(apps, schema_editor):
+    """Пересохраняет тексты пачками: поле сожмёт длинные из них."""
+    Note = apps.get_model('notes', 'Note')
+    notes = Note.objects.using(schema_editor.connection.alias)
+    last_id = 0
+    while True:
+        batch = list(
+            notes.filter(id__gt=last_id).order_by('id')
+            .only('id', 'text')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        notes.bulk_update(batch, ['text'])
+        last_id = batch[-1].id
+
+
+def decompress_texts(apps, schema_editor):
+    schema_editor.execute(DECOMPRESS_TEXTS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0003_note_search'),
+    ]
+
+    # Порядок важен: SQLite пересоздаёт таблицу при изменении поля
+    # и теряет триггеры, поэтому индекс снимается до и создаётся после.
+    operations = [
+        migrations.RunSQL(DROP_INDEX, CREATE_PLAIN_INDEX),
+        migrations.AlterField(
+            model_name='note',
+            name='text',
+            field=notes.fields.CompressedTextField(
+                help_text='Добавьте подробностей', verbose_name='Текст'
+            ),
+        ),
+        migrations.RunPython(compress_texts, decompress_texts),
+        migrations.RunSQL(CREATE_INDEX, DROP_COMPRESSED_INDEX),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.2.15 on 2026-10-18 20:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+import notes.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0004_note_text_compression'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(verbose_name='Номер правки')),
+                ('title', models.CharField(max_length=100, verbose_name='Заголовок')),
+                ('snapshot', models.BooleanField(default=False, verbose_name='Полная копия')),
+                ('data', notes.fields.CompressedTextField(verbose_name='Текст или отличия')),
+                ('checksum', models.CharField(max_length=40, verbose_name='SHA-1 текста')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата правки')),
+                ('note', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='notes.note')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='noterevision',
+            constraint=models.UniqueConstraint(fields=('note', 'number'), name='unique_note_revision'),
+        ),
+    ]
@@ -1,7 +1,8 @@
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 
-from pytils.translit import slugify
+from .fields import CompressedTextField
+from .slugs import save_with_free_slug
 
 
 class Note(models.Model):
@@ -11,7 +12,7 @@ class Note(models.Model):
         default='Название заметки',
         help_text='Дайте короткое название заметке'
     )
-    text = models.TextField(
+    text = CompressedTextField(
         'Текст',
         help_text='Добавьте подробностей'
     )
@@ -26,13 +27,59 @@ class Note(models.Model):
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        db_index=False,
     )
 
+    class Meta:
+        # Составной индекс заменяет индекс внешнего ключа: по нему
+        # выбираются заметки автора и листается список по id.
+        indexes = (models.Index(fields=('author', 'id')),)
+
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            max_slug_length = self._meta.get_field('slug').max_length
-            self.slug = slugify(self.title)[:max_slug_length]
-        super().save(*args, **kwargs)
+        """
+        Сохраняет заметку и её правку в одной транзакции.
+
+        Правку пишет приёмник post_save: номер следующей правки
+        читается и занимается под той же блокировкой записи, что
+        и заметка, поэтому параллельные правки не получают один номер.
+        """
+        with transaction.atomic(savepoint=False):
+            if self.slug:
+                return super().save(*args, **kwargs)
+            return save_with_free_slug(self, super().save, *args, **kwargs)
+
+
+class NoteRevision(models.Model):
+    """
+    Состояние заметки после одного сохранения.
+
+    В data лежит либо полный текст (snapshot), либо отличия
+    от предыдущей правки — их собирает notes.revisions.
+    """
+    note = models.ForeignKey(
+        Note,
+        on_delete=models.CASCADE,
+        related_name='revisions',
+        db_index=False,
+    )
+    number = models.PositiveIntegerField('Номер правки')
+    title = models.CharField('Заголовок', max_length=100)
+    snapshot = models.BooleanField('Полная копия', default=False)
+    data = CompressedTextField('Текст или отличия')
+    checksum = models.CharField('SHA-1 текста', max_length=40)
+    created = models.DateTimeField('Дата правки', auto_now_add=True)
+
+    class Meta:
+        # Уникальный индекс заменяет индекс внешнего ключа: по нему
+        # ищутся последняя правка и цепочка отличий до нужной.
+        constraints = (
+            models.UniqueConstraint(
+                fields=('note', 'number'), name='unique_note_revision'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.note_id}#{self.number}'
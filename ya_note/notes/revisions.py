@@ -0,0 +1,172 @@
+import hashlib
+import json
+from difflib import SequenceMatcher
+
+from django.conf import settings
+from django.db.models import Max, OuterRef, Subquery
+from django.http import Http404
+
+from .models import NoteRevision
+
+
+def checksum(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def make_delta(old, new):
+    """
+    Отличия new от old по строкам в виде JSON.
+
+    Пара чисел — диапазон строк old, который переносится как есть,
+    строка — вставленный текст.
+    """
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    matcher = SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    operations = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            operations.append([i1, i2])
+        elif j1 < j2:
+            operations.append(''.join(new_lines[j1:j2]))
+    return json.dumps(operations, ensure_ascii=False, separators=(',', ':'))
+
+
+def apply_delta(old, delta):
+    old_lines = old.splitlines(keepends=True)
+    return ''.join(
+        operation if isinstance(operation, str)
+        else ''.join(old_lines[operation[0]:operation[1]])
+        for operation in json.loads(delta)
+    )
+
+
+def chains(note_ids, number=None):
+    """
+    Правки заметок от ближайшей полной копии до number включительно.
+
+    Один запрос на все заметки: номер полной копии каждой заметки
+    выбирается подзапросом. Без number — цепочки до последних правок.
+    Возвращает словарь id заметки → список правок.
+    """
+    revisions = NoteRevision.objects.filter(note_id__in=note_ids)
+    if number is not None:
+        revisions = revisions.filter(number__lte=number)
+    snapshot = revisions.filter(
+        note_id=OuterRef('note_id'), snapshot=True
+    ).order_by('-number').values('number')[:1]
+    result = {}
+    for revision in revisions.filter(
+        number__gte=Subquery(snapshot)
+    ).order_by('note_id', 'number'):
+        result.setdefault(revision.note_id, []).append(revision)
+    return result
+
+
+def chain(note_id, number=None):
+    """Цепочка правок одной заметки, см. chains."""
+    return chains([note_id], number).get(note_id, [])
+
+
+def replay(revisions):
+    """Текст последней правки цепочки, которая начинается с копии."""
+    text = revisions[0].data
+    for revision in revisions[1:]:
+        text = apply_delta(text, revision.data)
+    return text
+
+
+def reconstruct(note, number):
+    """Правка number заметки с восстановленным текстом в поле text."""
+    revisions = chain(note.pk, number)
+    if not revisions or revisions[-1].number != number:
+        raise Http404('Такой правки нет.')
+    revision = revisions[-1]
+    revision.text = replay(revisions)
+    return revision
+
+
+def build_revision(note, revisions):
+    """
+    Новая несохранённая правка заметки или None, если изменений нет.
+
+    Обычно правка хранит отличия от предыдущей. Полная копия
+    пишется для первой правки, раз в NOTES_REVISION_SNAPSHOT_INTERVAL
+    правок и когда отличия вышли не короче половины текста.
+    """
+    digest = checksum(note.text)
+    if revisions:
+        last = revisions[-1]
+        if last.checksum == digest and last.title == note.title:
+            return None
+        number = last.number + 1
+    else:
+        number = 1
+    revision = NoteRevision(
+        note=note, number=number, title=note.title, checksum=digest,
+        snapshot=True, data=note.text,
+    )
+    interval = settings.NOTES_REVISION_SNAPSHOT_INTERVAL
+    if revisions and len(revisions) < interval:
+        delta = make_delta(replay(revisions), note.text)
+        if len(delta) < len(note.text) // 2:
+            revision.snapshot = False
+            revision.data = delta
+    return revision
+
+
+def record_revision(note, created=False):
+    """
+    Сохраняет правку, если заголовок или текст заметки изменились.
+
+    У только что созданной заметки правок нет, и цепочка не читается.
+    """
+    revision = build_revision(note, [] if created else chain(note.pk))
+    if revision is not None:
+        revision.save()
+    return revision
+
+
+def record_revisions(notes, created=()):
+    """
+    Правки для пачки заметок: одно чтение цепочек и одна вставка.
+
+    Для массовых операций, которые не вызывают post_save. Цепочки
+    читаются только для notes; у новых заметок created их нет.
+    """
+    existing = chains([note.pk for note in notes]) if notes else {}
+    new_revisions = [
+        revision for revision in (
+            build_revision(note, existing.get(note.pk, []))
+            for note in [*notes, *created]
+        )
+        if revision is not None
+    ]
+    NoteRevision.objects.bulk_create(new_revisions)
+    return new_revisions
+
+
+def prune_revisions(note_id, keep):
+    """
+    Оставляет последние keep правок заметки.
+
+    Самая старая из оставшихся правок становится полной копией,
+    чтобы её и следующие можно было восстановить без удалённых.
+    Возвращает число удалённых правок.
+    """
+    last = NoteRevision.objects.filter(note_id=note_id).aggregate(
+        last=Max('number')
+    )['last']
+    if last is None or last <= keep:
+        return 0
+    first_kept = last - keep + 1
+    revisions = chain(note_id, first_kept)
+    oldest = revisions[-1]
+    if not oldest.snapshot:
+        oldest.data = replay(revisions)
+        oldest.snapshot = True
+        oldest.save(update_fields=('data', 'snapshot'))
+    deleted, _ = NoteRevision.objects.filter(
+        note_id=note_id, number__lt=first_kept
+    ).delete()
+    return deleted
@@ -0,0 +1,160 @@
+import re
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.http import Http404
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Note
+from .pagination import KeysetPage, decode_values, encode_values
+
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+WORD = re.compile(r'\w+')
+TITLE_TIER = 0
+TEXT_TIER = 1
+
+# bm25 считает IDF по всей таблице и читает полные списки каждого
+# слова, поэтому его цена растёт вместе с числом заметок всех
+# авторов. Здесь ранг — уровень совпадения: сначала заметки со
+# словами в заголовке, затем остальные, внутри уровня новые выше.
+# Оба поиска ограничены заметками автора, а подсветка и фрагмент
+# считаются только для строк страницы.
+SEARCH_SQL = f"""
+    WITH matched AS (
+        SELECT rowid AS id FROM notes_note_fts
+        WHERE notes_note_fts MATCH %s
+    ), in_title AS (
+        SELECT rowid AS id FROM notes_note_fts
+        WHERE notes_note_fts MATCH %s
+    ), ranked AS (
+        SELECT id, CASE WHEN id IN in_title
+            THEN {TITLE_TIER} ELSE {TEXT_TIER} END AS tier
+        FROM matched
+    ), page AS (
+        SELECT id, tier FROM ranked {{after}}
+        ORDER BY tier, id DESC
+        LIMIT %s
+    )
+    SELECT notes_note.id, notes_note.slug, notes_note.title,
+        page.tier AS search_rank,
+        highlight(
+            notes_note_fts, 0, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}'
+        ) AS title_highlight,
+        snippet(
+            notes_note_fts, 1, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '…', 20
+        ) AS text_snippet
+    FROM page
+    JOIN notes_note_fts ON notes_note_fts.rowid = page.id
+    JOIN notes_note ON notes_note.id = page.id
+    WHERE notes_note_fts MATCH %s
+    ORDER BY page.tier, page.id DESC
+"""
+AFTER_SQL = 'WHERE tier > %s OR (tier = %s AND id < %s)'
+INSERT_TRIGGER = 'notes_note_fts_insert'
+INDEX_AFTER_SQL = """
+    INSERT INTO notes_note_fts(rowid, title, text, author_id)
+    SELECT id, title, text, author_id FROM notes_note_content
+    WHERE id > %s
+"""
+
+
+def build_match_query(text, author_id, columns='title text'):
+    """
+    Превращает ввод пользователя в запрос FTS5 по заметкам автора.
+
+    Каждое слово берётся в кавычки, чтобы синтаксис FTS5 во вводе
+    не работал. Поиска по префиксу нет: префикс разворачивается
+    в слова всей таблицы, и запрос перестаёт зависеть только от
+    заметок автора. Условие на автора — точный токен колонки
+    author_id.
+    """
+    words = WORD.findall(text)
+    if not words:
+        return None
+    terms = ' '.join(f'"{word}"' for word in words)
+    return f'author_id:"{int(author_id)}" AND {{{columns}}}: ({terms})'
+
+
+def highlight(value):
+    """Экранирует HTML и заменяет маркеры совпадений на <mark>."""
+    return mark_safe(
+        escape(value)
+        .replace(HIGHLIGHT_START, '<mark>')
+        .replace(HIGHLIGHT_END, '</mark>')
+    )
+
+
+def search_notes(author, text, cursor=None, per_page=10):
+    """
+    Страница заметок автора, найденных по тексту.
+
+    Листание идёт по ключу (ранг, id), как у поиска новостей.
+    """
+    match = build_match_query(text, author.pk)
+    if match is None:
+        return KeysetPage([], None)
+    params = [match, build_match_query(text, author.pk, 'title')]
+    after = ''
+    if cursor:
+        rank, pk = decode_values(cursor, 2)
+        if rank not in (TITLE_TIER, TEXT_TIER) or not isinstance(pk, int):
+            raise Http404('Неверный курсор страницы.')
+        after = AFTER_SQL
+        params += [rank, rank, pk]
+    params += [per_page + 1, match]
+    results = list(Note.objects.raw(SEARCH_SQL.format(after=after), params))
+    next_cursor = None
+    if len(results) > per_page:
+        results = results[:per_page]
+        last = results[-1]
+        next_cursor = encode_values([last.search_rank, last.pk])
+    for note in results:
+        note.title_highlight = highlight(note.title_highlight)
+        note.text_snippet = highlight(note.text_snippet)
+    return KeysetPage(results, next_cursor)
+
+
+def optimize_search_index():
+    """Сливает сегменты полнотекстового индекса заметок в один."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO notes_note_fts(notes_note_fts) VALUES('optimize')"
+        )
+
+
+def rebuild_search_index():
+    """Перестраивает и уплотняет полнотекстовый индекс заметок."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO notes_note_fts(notes_note_fts) VALUES('rebuild')"
+        )
+    optimize_search_index()
+
+
+@contextmanager
+def deferred_indexing(after_id):
+    """
+    Индексирует заметки с id больше after_id одним запросом в конце.
+
+    Пока блок выполняется, триггер вставки снят: построчный триггер
+    при массовой вставке вдвое медленнее, чем один INSERT … SELECT.
+    Всё идёт в одной транзакции, так что при ошибке триггер
+    возвращается вместе с откатом. Вложенный блок ничего не делает:
+    его заметки проиндексирует внешний.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT sql FROM sqlite_master WHERE type = %s AND name = %s',
+            ['trigger', INSERT_TRIGGER],
+        )
+        row = cursor.fetchone()
+        if row is None:
+            yield
+            return
+        (trigger_sql,) = row
+        cursor.execute(f'DROP TRIGGER {INSERT_TRIGGER}')
+        yield
+        cursor.execute(INDEX_AFTER_SQL, [after_id])
+        cursor.execute(trigger_sql)
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Note
+from .revisions import record_revision
+
+
+@receiver(post_save, sender=Note)
+def record_note_revision(sender, instance, created, raw=False, **kwargs):
+    """Каждое сохранение заметки с новым содержимым попадает в историю."""
+    if not raw:
+        record_revision(instance, created)
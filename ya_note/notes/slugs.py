@@ -0,0 +1,126 @@
+import re
+from functools import lru_cache
+
+from django.db import IntegrityError, transaction
+from django.db.models import Lookup, Q, SlugField
+from pytils.translit import slugify
+
+from yacommon.bulk import batches
+
+MAX_ATTEMPTS = 5
+DEFAULT_BASE = 'note'
+GLOB_SPECIAL = re.compile(r'([*?[])')
+# Условие на каждый base — два сравнения; SQLite ограничивает глубину
+# выражения (SQLITE_MAX_EXPR_DEPTH, 1000) и число параметров запроса.
+BASES_PER_QUERY = 200
+
+
+class SlugsExhausted(IntegrityError):
+    """Все подобранные slug заметки заняли параллельные запросы."""
+
+
+@SlugField.register_lookup
+class Glob(Lookup):
+    """
+    Сравнение с шаблоном GLOB в SQLite.
+
+    В отличие от LIKE, в который превращается startswith, GLOB
+    учитывает регистр, и SQLite ищет по префиксу шаблона в индексе.
+    """
+    lookup_name = 'glob'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} GLOB {rhs}', lhs_params + rhs_params
+
+
+@lru_cache(maxsize=4096)
+def slug_base(title, max_length):
+    """Транслитерация заголовка; популярные заголовки берутся из кеша."""
+    return slugify(title)[:max_length] or DEFAULT_BASE
+
+
+def first_free(base, taken, max_length):
+    """Первый вариант base, base-2, base-3, … не из множества taken."""
+    if base not in taken:
+        return base
+    pattern = re.compile(rf'^{re.escape(base)}-(\d+)$')
+    suffixes = [
+        int(match.group(1))
+        for match in map(pattern.match, taken) if match
+    ]
+    number = max(suffixes, default=1) + 1
+    suffix = f'-{number}'
+    if len(base) + len(suffix) > max_length:
+        return first_free(base[:max_length - len(suffix)], taken, max_length)
+    return base + suffix
+
+
+def taken_slugs(queryset, bases):
+    """
+    Занятые slug вида base и base-<число> для каждого base из bases.
+
+    Запрос на каждые BASES_PER_QUERY base: равенство и GLOB с
+    постоянным префиксом SQLite ищет в уникальном индексе slug, не
+    просматривая таблицу, а slug вроде base-drugoe не загружаются.
+    """
+    taken = set()
+    for chunk in batches(sorted(set(bases)), BASES_PER_QUERY):
+        condition = Q()
+        for base in chunk:
+            pattern = GLOB_SPECIAL.sub(r'[\1]', base)
+            condition |= Q(slug=base) | Q(slug__glob=f'{pattern}-[0-9]*')
+        taken.update(
+            queryset.filter(condition).values_list('slug', flat=True)
+        )
+    return taken
+
+
+def free_slug(queryset, base, max_length):
+    """Первый свободный slug вида base, base-2, base-3, …"""
+    return first_free(base, taken_slugs(queryset, [base]), max_length)
+
+
+def allocate_slugs(notes, reserved=()):
+    """
+    Подбирает свободные slug пачке новых заметок одним запросом.
+
+    reserved — slug, которые ещё не записаны в базу, но уже
+    заняты другими заметками той же пачки.
+    """
+    if not notes:
+        return
+    max_length = notes[0]._meta.get_field('slug').max_length
+    bases = [slug_base(note.title, max_length) for note in notes]
+    taken = taken_slugs(type(notes[0]).objects.all(), bases)
+    taken.update(reserved)
+    for note, base in zip(notes, bases):
+        note.slug = first_free(base, taken, max_length)
+        taken.add(note.slug)
+
+
+def save_with_free_slug(note, save, *args, **kwargs):
+    """
+    Сохраняет заметку со свободным slug без проверки перед вставкой.
+
+    Уникальность гарантирует индекс: если параллельный запрос занял
+    выбранный slug, вставка падает с IntegrityError внутри точки
+    сохранения, и slug подбирается заново. Прочие нарушения
+    ограничений не повторяются. Если за MAX_ATTEMPTS попыток slug
+    занять не удалось, поднимается SlugsExhausted.
+    """
+    max_length = note._meta.get_field('slug').max_length
+    base = slug_base(note.title, max_length)
+    others = type(note).objects.exclude(pk=note.pk)
+    for attempt in range(MAX_ATTEMPTS):
+        note.slug = free_slug(others, base, max_length)
+        try:
+            with transaction.atomic():
+                return save(*args, **kwargs)
+        except IntegrityError as error:
+            slug, note.slug = note.slug, ''
+            if not others.filter(slug=slug).exists():
+                raise
+            if attempt == MAX_ATTEMPTS - 1:
+                raise SlugsExhausted(base) from error
@@ -1,5 +1,5 @@
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
 from notes.forms import NoteForm
@@ -51,3 +51,78 @@ class TestRoutes(TestCase):
                 response = self.author_client.get(url)
                 self.assertIn('form', response.context)
                 self.assertIsInstance(response.context['form'], NoteForm)
+
+    @override_settings(NOTES_COUNT_ON_PAGE=1)
+    def test_notes_list_pages(self):
+        '''Список заметок листается по курсору в порядке id.'''
+        second_note = Note.objects.create(
+            title='Вторая', text='Текст', author=self.author
+        )
+        url = reverse('notes:list')
+        response = self.author_client.get(url)
+        self.assertEqual(list(response.context['object_list']), [self.note])
+        cursor = response.context['page_obj'].next_cursor
+        response = self.author_client.get(url, {'cursor': cursor})
+        self.assertEqual(
+            list(response.context['object_list']), [second_note]
+        )
+        self.assertFalse(response.context['page_obj'].has_next())
+
+    def test_notes_list_skips_text(self):
+        '''Список заметок не загружает текст заметок.'''
+        response = self.author_client.get(reverse('notes:list'))
+        for note in response.context['object_list']:
+            self.assertIn('text', note.get_deferred_fields())
+
+    def test_notes_search_scoped_to_author(self):
+        '''Поиск находит только заметки текущего польз-ля.'''
+        Note.objects.create(
+            title='Чужая', text='Текст про ромашки', author=self.reader
+        )
+        own = Note.objects.create(
+            title='Своя', text='Текст про ромашки', author=self.author
+        )
+        url = reverse('notes:search')
+        response = self.author_client.get(url, {'q': 'ромашки'})
+        notes = list(response.context['page_obj'])
+        self.assertEqual(notes, [own])
+        self.assertEqual(
+            notes[0].text_snippet, 'Текст про <mark>ромашки</mark>'
+        )
+
+    @override_settings(NOTES_COUNT_ON_PAGE=1)
+    def test_notes_search_pages(self):
+        '''Совпадения в заголовке выше, страницы листаются по курсору.'''
+        in_text = Note.objects.create(
+            title='Первая', text='Про ромашки', author=self.author
+        )
+        in_title = Note.objects.create(
+            title='Ромашки', text='Текст', author=self.author
+        )
+        url = reverse('notes:search')
+        response = self.author_client.get(url, {'q': 'ромашки'})
+        self.assertEqual(list(response.context['page_obj']), [in_title])
+        cursor = response.context['page_obj'].next_cursor
+        response = self.author_client.get(
+            url, {'q': 'ромашки', 'cursor': cursor}
+        )
+        self.assertEqual(list(response.context['page_obj']), [in_text])
+        self.assertFalse(response.context['page_obj'].has_next())
+
+    def test_notes_search_without_matches(self):
+        '''Поиск без совпадений сообщает, что ничего не найдено.'''
+        response = self.author_client.get(
+            reverse('notes:search'), {'q': 'абракадабра'}
+        )
+        self.assertContains(response, 'Ничего не найдено.')
+
+    def test_notes_search_follows_changes(self):
+        '''Индекс поиска обновляется при правке и удалении заметки.'''
+        url = reverse('notes:search')
+        self.note.text = 'Новый текст про ландыши'
+        self.note.save()
+        response = self.author_client.get(url, {'q': 'ландыши'})
+        self.assertEqual(list(response.context['page_obj']), [self.note])
+        self.note.delete()
+        response = self.author_client.get(url, {'q': 'ландыши'})
+        self.assertEqual(list(response.context['page_obj']), [])
@@ -1,17 +1,103 @@
+import os
+import sqlite3
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from http import HTTPStatus
+from io import BytesIO, StringIO
+from unittest import mock
 
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, connection
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings
+)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from pytils.translit import slugify
 
-from notes.forms import WARNING
+from notes import archive as archive_module
+from notes import api, factories, fields, revisions, slugs
+from notes.forms import BUSY, NO_FREE_SLUG, WARNING, NoteForm
 from notes.models import Note
+from notes.search import search_notes
+from yanote.query_budget import assert_query_budgets
 
 url_add = reverse('notes:add')
 User = get_user_model()
 
 
+@contextmanager
+def file_database():
+    """
+    Переключает новые подключения на копию тестовой базы в файле.
+
+    База в памяти с общим кешем сразу отвечает «table is locked»
+    вместо ожидания блокировки, как файловая база в работе, поэтому
+    потоки параллельных тестов пишут в файл. Подключение основного
+    потока остаётся прежним: проверки идут в потоках.
+    """
+    if not connection.is_in_memory_db():
+        yield
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'test.sqlite3')
+        target = sqlite3.connect(path)
+        connection.ensure_connection()
+        connection.connection.backup(target)
+        target.close()
+        settings_dict = connection.settings_dict
+        name = settings_dict['NAME']
+        settings_dict['NAME'] = path
+        try:
+            yield
+        finally:
+            settings_dict['NAME'] = name
+
+
+def in_thread(function, *args):
+    """Вызывает function в отдельном потоке со своим подключением."""
+    def run():
+        try:
+            return function(*args)
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(1) as executor:
+        return executor.submit(run).result()
+
+
+def post_concurrently(author, requests, workers=8, **options):
+    """
+    Отправляет POST-запросы (url, data) из workers потоков.
+
+    У каждого потока свой клиент и своё подключение к базе, options
+    передаются в Client.post. Возвращает коды ответов в порядке
+    requests.
+    """
+    def post(chunk):
+        client = Client(raise_request_exception=False)
+        client.force_login(author)
+        try:
+            return [
+                client.post(url, data=data, **options).status_code
+                for url, data in chunk
+            ]
+        finally:
+            connection.close()
+
+    chunks = [requests[index::workers] for index in range(workers)]
+    with ThreadPoolExecutor(workers) as executor:
+        statuses = list(executor.map(post, chunks))
+    return [
+        statuses[index % workers][index // workers]
+        for index in range(len(requests))
+    ]
+
+
 class TestRoutes(TestCase):
 
     @classmethod
@@ -65,6 +151,44 @@ class TestRoutes(TestCase):
             errors=(self.form_data_note['slug'] + WARNING)
         )
 
+    def test_slug_taken_after_validation(self):
+        '''Slug, занятый после проверки формы, — ошибка формы, не 500.'''
+        Note.objects.create(title='Чужая', slug='unique', author=self.reader)
+        with mock.patch.object(
+            NoteForm, 'clean_slug', lambda form: form.cleaned_data['slug']
+        ):
+            response = self.author_client.post(url_add, data=self.form_data)
+        self.assertFormError(
+            response, 'form', 'slug', errors=('unique' + WARNING)
+        )
+
+    def test_no_free_slug_is_form_error(self):
+        '''Исчерпанные попытки подобрать slug — ошибка формы, не 500.'''
+        base = slugify(self.form_data['title'])
+        Note.objects.create(title='Чужая', slug=base, author=self.reader)
+        self.form_data.pop('slug')
+        with mock.patch.object(
+            slugs, 'free_slug', return_value=base
+        ), mock.patch.object(slugs, 'MAX_ATTEMPTS', 1):
+            response = self.author_client.post(url_add, data=self.form_data)
+        self.assertFormError(response, 'form', 'slug', errors=NO_FREE_SLUG)
+        self.assertEqual(Note.objects.count(), 1)
+
+    def test_locked_database_is_form_error(self):
+        '''База, занятая дольше busy_timeout, — ошибка формы, не 500.'''
+        with mock.patch.object(
+            Note, 'save', side_effect=OperationalError('database is locked')
+        ):
+            response = self.author_client.post(url_add, data=self.form_data)
+        self.assertFormError(response, 'form', None, errors=BUSY)
+
+    def test_other_integrity_errors_are_not_slug_errors(self):
+        '''Прочие нарушения ограничений базы не выдаются за занятый slug.'''
+        with mock.patch.object(
+            Note, 'save', side_effect=IntegrityError('NOT NULL')
+        ), self.assertRaises(IntegrityError):
+            self.author_client.post(url_add, data=self.form_data)
+
     def test_empty_slug(self):
         '''Создание заметки без slug - slug формируется автоматически.'''
         note_before = Note.objects.count()
@@ -122,3 +246,498 @@ class TestRoutes(TestCase):
         self.assertEqual(update_note.text, self.form_data_note['text'])
         self.assertEqual(update_note.slug, self.form_data_note['slug'])
         self.assertEqual(update_note.author, self.author)
+
+    def test_explain_views_finds_no_missing_indexes(self):
+        '''На всех URL заметок нет полных просмотров и сортировок.'''
+        stdout = StringIO()
+        call_command('explain_views', '--users=3', '--notes=5', stdout=stdout)
+        self.assertTrue(stdout.getvalue().rstrip().endswith('нет'))
+
+    def test_colliding_titles_get_free_suffix(self):
+        '''Заметки с одинаковым заголовком получают slug с суффиксом.'''
+        self.form_data.pop('slug')
+        for _ in range(3):
+            response = self.author_client.post(url_add, data=self.form_data)
+            self.assertRedirects(response, reverse('notes:success'))
+        base = slugify(self.form_data['title'])
+        self.assertEqual(
+            sorted(Note.objects.values_list('slug', flat=True)),
+            [base, f'{base}-2', f'{base}-3']
+        )
+
+    def test_taken_slugs_uses_index(self):
+        '''Занятые slug ищутся по индексу и только с числовым суффиксом.'''
+        for slug in ('zametka', 'zametka-2', 'zametka-drugaya', 'Zametka-3'):
+            Note.objects.create(title='Заметка', slug=slug, author=self.author)
+        queryset = Note.objects.all()
+        with CaptureQueriesContext(connection) as captured:
+            taken = slugs.taken_slugs(queryset, ['zametka'])
+        self.assertEqual(taken, {'zametka', 'zametka-2'})
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'EXPLAIN QUERY PLAN ' + captured[0]['sql']
+            )
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertNotIn('SCAN', plan)
+
+    def test_taken_slugs_in_chunks(self):
+        '''Много base проверяются несколькими запросами ограниченной длины.'''
+        bases = [f'zametka-{index}-x' for index in range(450)]
+        Note.objects.bulk_create(
+            Note(title='Заметка', slug=slug, author=self.author)
+            for slug in (bases[0], f'{bases[-1]}-2')
+        )
+        with CaptureQueriesContext(connection) as captured:
+            taken = slugs.taken_slugs(Note.objects.all(), bases * 2)
+        self.assertEqual(taken, {bases[0], f'{bases[-1]}-2'})
+        self.assertEqual(len(captured), 3)
+
+    def test_slug_taken_before_insert_is_retried(self):
+        '''Slug, занятый между подбором и вставкой, подбирается заново.'''
+        base = slugify(self.form_data_note['title'])
+        Note.objects.create(title='Другая', slug=base, author=self.reader)
+        stale = iter([base])
+        real_free_slug = slugs.free_slug
+
+        def free_slug(*args):
+            return next(stale, None) or real_free_slug(*args)
+
+        with mock.patch.object(slugs, 'free_slug', free_slug):
+            note = Note.objects.create(
+                title=self.form_data_note['title'], author=self.author
+            )
+        self.assertEqual(note.slug, f'{base}-2')
+
+    def test_notes_export_import(self):
+        '''Экспорт и импорт архива переносит заметки между польз-лями.'''
+        for index in range(3):
+            Note.objects.create(
+                title='Заголовок', text=f'Текст {index}', author=self.author
+            )
+        response = self.author_client.get(reverse('notes:export'))
+        archive = b''.join(response.streaming_content)
+        with zipfile.ZipFile(BytesIO(archive)) as exported:
+            self.assertEqual(len(exported.namelist()), 3)
+        response = self.reader_client.post(
+            reverse('notes:import'),
+            {'archive': SimpleUploadedFile('notes.zip', archive)}
+        )
+        self.assertRedirects(response, reverse('notes:success'))
+        imported = Note.objects.filter(author=self.reader)
+        self.assertEqual(
+            sorted(imported.values_list('text', flat=True)),
+            ['Текст 0', 'Текст 1', 'Текст 2']
+        )
+        self.assertEqual(set(imported.values_list('title', flat=True)),
+                         {'Заголовок'})
+        self.assertEqual(Note.objects.values('slug').distinct().count(), 6)
+
+    def test_notes_import_reports_skipped_files(self):
+        '''Импорт сообщает о файлах, которые не стали заметками.'''
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('note.md', '# Заметка\n\nТекст')
+            archive.writestr('photo.jpg', b'jpeg')
+            archive.writestr('big.md', 'Длинный текст' * 100)
+        with mock.patch.object(archive_module, 'MAX_NOTE_SIZE', 1024):
+            response = self.author_client.post(
+                reverse('notes:import'),
+                {'archive': SimpleUploadedFile(
+                    'notes.zip', buffer.getvalue()
+                )},
+                follow=True,
+            )
+        self.assertContains(
+            response, 'Пропущено файлов: 2 (не .md или больше 1 КиБ): '
+            'photo.jpg, big.md'
+        )
+        self.assertEqual(
+            list(Note.objects.values_list('title', flat=True)), ['Заметка']
+        )
+
+    def test_notes_import_rejects_not_zip(self):
+        '''Импорт не принимает файл, который не является zip-архивом.'''
+        response = self.author_client.post(
+            reverse('notes:import'),
+            {'archive': SimpleUploadedFile('notes.zip', b'not a zip')}
+        )
+        self.assertFormError(
+            response, 'form', 'archive', 'Файл не является zip-архивом.'
+        )
+
+    def test_notes_import_command(self):
+        '''Команды export_notes и import_notes переносят заметки.'''
+        Note.objects.create(
+            title='Заголовок', text='Текст', author=self.author
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'notes.zip')
+            call_command('export_notes', self.author.username, path)
+            with zipfile.ZipFile(path, 'a') as archive:
+                archive.writestr('readme.txt', 'Не заметка')
+            out = StringIO()
+            call_command(
+                'import_notes', self.reader.username, path,
+                '--batch-size', '1', stdout=out
+            )
+        note = Note.objects.get(author=self.reader)
+        self.assertEqual((note.title, note.text), ('Заголовок', 'Текст'))
+        self.assertIn('Пропущено файлов: 1', out.getvalue())
+        self.assertIn('readme.txt', out.getvalue())
+
+    def test_long_text_stored_compressed(self):
+        '''Длинный текст хранится сжатым, а читается как есть.'''
+        text = '\n'.join(['Строка лога с ромашками'] * 1000)
+        self.author_client.post(url_add, data={
+            'title': 'Лог', 'text': text, 'slug': 'log'
+        })
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT typeof(text), length(text) FROM notes_note "
+                "WHERE slug = 'log'"
+            )
+            kind, length = cursor.fetchone()
+        self.assertEqual(kind, 'blob')
+        self.assertLess(length, len(text) // 10)
+        response = self.author_client.get(
+            reverse('notes:detail', args=('log',))
+        )
+        self.assertContains(response, 'Строка лога с ромашками')
+        self.assertEqual(response.context['note'].text, text)
+        response = self.author_client.get(
+            reverse('notes:search'), {'q': 'ромашками'}
+        )
+        self.assertEqual(
+            [note.slug for note in response.context['page_obj']], ['log']
+        )
+
+    def test_compression_formats(self):
+        '''Короткий текст не сжимается, оба формата читаются.'''
+        self.assertEqual(fields.compress('Текст'), 'Текст')
+        text = 'ромашки ' * 1000
+        for method in (fields.ZLIB, fields.LZMA):
+            with self.subTest(method=method):
+                packed = fields.compress(text, method)
+                self.assertTrue(packed.startswith(fields.MARKERS[method]))
+                self.assertEqual(fields.decompress(packed), text)
+        with self.assertRaises(ValueError):
+            fields.decompress(b'\x00??data')
+
+    def test_edits_are_kept_in_history(self):
+        '''Правки заметки сохраняются и открываются в истории.'''
+        self.author_client.post(url_add, data=self.form_data_note)
+        url_edit = reverse('notes:edit', args=(self.form_data_note['slug'],))
+        self.author_client.post(url_edit, data=self.form_data)
+        note = Note.objects.get()
+        self.assertEqual(note.revisions.count(), 2)
+        response = self.author_client.get(
+            reverse('notes:revision', args=(note.slug, 1))
+        )
+        revision = response.context['revision']
+        self.assertEqual(
+            (revision.title, revision.text),
+            (self.form_data_note['title'], self.form_data_note['text'])
+        )
+        response = self.author_client.get(
+            reverse('notes:revision', args=(note.slug, 3))
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_saves_read_history_only_when_needed(self):
+        '''Новая заметка не читает историю, правка не проверяет свой slug.'''
+        with CaptureQueriesContext(connection) as created:
+            self.author_client.post(url_add, data=self.form_data_note)
+        url = reverse('notes:edit', args=(self.form_data_note['slug'],))
+        with CaptureQueriesContext(connection) as edited:
+            self.author_client.post(url, data=self.form_data)
+        self.assertFalse([
+            query for query in created
+            if query['sql'].startswith('SELECT "notes_noterevision"')
+        ])
+        self.assertFalse([
+            query for query in edited
+            if query['sql'].startswith('SELECT (1) AS "a" FROM "notes_note"')
+        ])
+
+    @override_settings(NOTES_REVISION_SNAPSHOT_INTERVAL=4)
+    def test_revisions_store_deltas_between_snapshots(self):
+        '''Между полными копиями хранятся отличия, правки восстановимы.'''
+        lines = [f'Строка {index}' for index in range(100)]
+        texts = []
+        note = Note(title='История', author=self.author)
+        for version in range(10):
+            lines[version * 7] = f'Строка изменена в правке {version}'
+            note.text = '\n'.join(lines)
+            note.save()
+            texts.append(note.text)
+        snapshots = note.revisions.filter(snapshot=True)
+        self.assertEqual(
+            list(snapshots.values_list('number', flat=True)), [1, 5, 9]
+        )
+        for delta in note.revisions.filter(snapshot=False):
+            self.assertLess(len(delta.data), len(texts[0]) // 10)
+        for number, text in enumerate(texts, 1):
+            self.assertEqual(revisions.reconstruct(note, number).text, text)
+        call_command('prune_note_revisions', '--keep', '3', stdout=StringIO())
+        self.assertEqual(
+            list(note.revisions.values_list('number', flat=True)), [8, 9, 10]
+        )
+        for number in (8, 9, 10):
+            self.assertEqual(
+                revisions.reconstruct(note, number).text, texts[number - 1]
+            )
+
+    def post_batch(self, client, operations):
+        return client.post(
+            reverse('notes:api_batch'), {'operations': operations},
+            content_type='application/json'
+        )
+
+    def test_batch_api_applies_operations(self):
+        '''Пакетное API создаёт, правит и удаляет заметки разом.'''
+        kept = Note.objects.create(
+            title='Старая', text='Текст', slug='kept', author=self.author
+        )
+        removed = Note.objects.create(
+            title='Удаляемая', text='Текст', slug='removed',
+            author=self.author
+        )
+        response = self.post_batch(self.author_client, [
+            {'op': 'create', 'title': 'Новая', 'text': 'Текст'},
+            {'op': 'create', 'title': 'Вторая', 'text': 'Текст',
+             'slug': 'removed'},
+            {'op': 'update', 'id': kept.pk, 'text': 'Новый текст'},
+            {'op': 'delete', 'id': removed.pk},
+        ])
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        results = response.json()['results']
+        self.assertEqual(
+            [result['status'] for result in results],
+            ['created', 'created', 'updated', 'deleted']
+        )
+        self.assertEqual(results[0]['slug'], slugify('Новая'))
+        self.assertEqual(
+            Note.objects.get(pk=results[1]['id']).slug, 'removed'
+        )
+        kept.refresh_from_db()
+        self.assertEqual((kept.title, kept.text), ('Старая', 'Новый текст'))
+        self.assertEqual(kept.revisions.count(), 2)
+        self.assertFalse(Note.objects.filter(pk=removed.pk).exists())
+
+    def test_batch_api_rejects_whole_batch(self):
+        '''Ошибка в одной операции отменяет всю пачку.'''
+        note = Note.objects.create(
+            title='Чужая', text='Текст', slug='taken', author=self.author
+        )
+        response = self.post_batch(self.reader_client, [
+            {'op': 'create', 'title': 'Новая', 'text': 'Текст'},
+            {'op': 'create', 'title': 'Занятая', 'text': 'Текст',
+             'slug': 'taken'},
+            {'op': 'update', 'id': note.pk, 'text': 'Взлом'},
+            {'op': 'create', 'title': 'Без текста'},
+        ])
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        results = response.json()['results']
+        self.assertEqual(
+            [result['status'] for result in results],
+            ['valid', 'error', 'error', 'error']
+        )
+        self.assertIn('slug', results[1]['errors'])
+        self.assertIn('id', results[2]['errors'])
+        self.assertIn('text', results[3]['errors'])
+        self.assertEqual(Note.objects.count(), 1)
+
+    def test_batch_api_query_count_does_not_grow(self):
+        '''Число запросов пачки не зависит от числа операций.'''
+        operations = [
+            {'op': 'create', 'title': 'Синхронизация', 'text': f'Текст {i}'}
+            for i in range(150)
+        ]
+        response = self.post_batch(self.author_client, operations)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(Note.objects.filter(author=self.author).count(), 150)
+        self.assertEqual(
+            len({result['slug'] for result in response.json()['results']}),
+            150
+        )
+
+    def test_batch_api_conflict_is_validation_result(self):
+        '''Нарушение ограничения базы — ошибка пачки, а не 500.'''
+        with mock.patch.object(
+            Note.objects, 'bulk_create', side_effect=IntegrityError('UNIQUE')
+        ):
+            response = self.post_batch(self.author_client, [
+                {'op': 'create', 'title': 'Новая', 'text': 'Текст'},
+            ])
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        (result,) = response.json()['results']
+        self.assertEqual(result['status'], 'error')
+        self.assertEqual(result['errors'], {'__all__': [api.CONFLICT]})
+        self.assertFalse(Note.objects.exists())
+
+    def test_batch_api_bad_requests(self):
+        '''Неверный запрос и анонимный польз-ль получают ошибку.'''
+        response = self.post_batch(self.client, [{'op': 'delete', 'id': 1}])
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        for operations in ([], [{'op': 'merge'}], [{'op': 'delete'}]):
+            with self.subTest(operations=operations):
+                response = self.post_batch(self.author_client, operations)
+                self.assertEqual(
+                    response.status_code, HTTPStatus.BAD_REQUEST
+                )
+                self.assertIn('error', response.json())
+
+
+class TestFactories(TestCase):
+
+    def test_seed_dataset_is_consistent(self):
+        '''Сгенерированные заметки уникальны и попадают в поиск.'''
+        dataset = factories.seed_dataset(users=3, notes=300, seed=1)
+        self.assertEqual(len(dataset.users), 3)
+        self.assertEqual(len(dataset.notes), 300)
+        notes = Note.objects.filter(pk__in=dataset.notes)
+        self.assertEqual(
+            len(set(notes.values_list('slug', flat=True))), 300
+        )
+        note = notes.filter(author_id=dataset.users[0]).first()
+        word = note.title.split()[0]
+        found = search_notes(note.author, word, per_page=300)
+        self.assertIn(note.pk, [result.pk for result in found])
+        # Триггер вернулся: новая заметка тоже индексируется.
+        created = Note.objects.create(
+            title='Уникальнейший', author=note.author
+        )
+        found = search_notes(note.author, 'Уникальнейший')
+        self.assertEqual([result.pk for result in found], [created.pk])
+
+    def test_seed_is_reproducible(self):
+        '''Одинаковый seed даёт одинаковые заголовки и тексты.'''
+        runs = []
+        for prefix in ('first', 'second'):
+            users = factories.create_users(2, seed=7, prefix=prefix)
+            note_ids = factories.create_notes(users, 50, seed=7)
+            runs.append(list(
+                Note.objects.filter(pk__in=note_ids).order_by('pk')
+                .values_list('title', 'text')
+            ))
+        self.assertEqual(runs[0], runs[1])
+
+    def test_seed_data_command(self):
+        '''Команда seed_data создаёт заданное число записей.'''
+        out = StringIO()
+        call_command('seed_data', users=2, notes=20, stdout=out)
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Note.objects.count(), 20)
+        self.assertIn('заметок: 20', out.getvalue())
+
+
+class TestWriteBudgets(TransactionTestCase):
+
+    def test_write_views_fit_budgets_outside_test_transaction(self):
+        '''Без транзакции теста, как в работе, запись укладывается в бюджет.'''
+        author = User.objects.create(username='Автор')
+        client = Client()
+        client.force_login(author)
+        form_data = {'title': 'Заметка', 'text': 'Текст', 'slug': 'note'}
+        with assert_query_budgets():
+            client.post(url_add, data=form_data)
+            client.post(
+                reverse('notes:edit', args=('note',)),
+                data={**form_data, 'text': 'Новый текст'},
+            )
+            client.post(reverse('notes:delete', args=('note',)))
+        self.assertFalse(Note.objects.exists())
+
+
+class TestConcurrentSlugs(TransactionTestCase):
+
+    def test_concurrent_creation(self):
+        '''Параллельное создание одноимённых заметок не даёт ошибок.'''
+        author = User.objects.create(username='Автор')
+        requests = [(url_add, {'title': 'Гонка', 'text': 'Текст'})] * 40
+        with file_database():
+            statuses = post_concurrently(author, requests)
+            slugs_created = in_thread(
+                lambda: list(Note.objects.values_list('slug', flat=True))
+            )
+        self.assertEqual(set(statuses), {HTTPStatus.FOUND})
+        self.assertEqual(len(slugs_created), len(requests))
+        self.assertEqual(len(set(slugs_created)), len(requests))
+
+
+class TestConcurrentWrites(TransactionTestCase):
+
+    def test_concurrent_notes_no_server_errors(self):
+        '''Параллельные записи заметок с индексом поиска не дают 500.'''
+        author = User.objects.create(username='Автор')
+        requests = [
+            (url_add, {'title': f'Заметка {index}', 'text': 'Текст ' * 50})
+            for index in range(80)
+        ]
+        with file_database():
+            statuses = post_concurrently(author, requests)
+            count = in_thread(Note.objects.count)
+        self.assertEqual(set(statuses), {HTTPStatus.FOUND})
+        self.assertEqual(count, len(requests))
+
+    def test_concurrent_edits_get_distinct_revisions(self):
+        '''Параллельные правки заметки получают разные номера правок.'''
+        author = User.objects.create(username='Автор')
+        note = Note.objects.create(
+            title='Заметка', text='Текст', slug='note', author=author
+        )
+        url = reverse('notes:edit', args=(note.slug,))
+        requests = [
+            (url, {'title': 'Заметка', 'text': f'Правка {index}',
+                   'slug': note.slug})
+            for index in range(40)
+        ]
+        with file_database():
+            statuses = post_concurrently(author, requests)
+            numbers = in_thread(lambda: list(
+                note.revisions.order_by('number')
+                .values_list('number', flat=True)
+            ))
+        self.assertEqual(set(statuses), {HTTPStatus.FOUND})
+        self.assertEqual(numbers, list(range(1, len(requests) + 2)))
+
+    def test_concurrent_saves_get_distinct_revisions(self):
+        '''Сохранения вне транзакции тоже не делят номер правки.'''
+        author = User.objects.create(username='Автор')
+        note = Note.objects.create(title='Заметка', text='0', author=author)
+
+        def edit(index):
+            try:
+                for step in range(5):
+                    copy = Note.objects.get(pk=note.pk)
+                    copy.text = f'{index}.{step}'
+                    copy.save()
+            finally:
+                connection.close()
+
+        with file_database():
+            with ThreadPoolExecutor(8) as executor:
+                list(executor.map(edit, range(8)))
+            numbers = in_thread(lambda: list(
+                note.revisions.order_by('number')
+                .values_list('number', flat=True)
+            ))
+        self.assertEqual(numbers, list(range(1, 42)))
+
+    def test_concurrent_batches_claim_slug_once(self):
+        '''Один slug из параллельных пачек занимает только одна.'''
+        author = User.objects.create(username='Автор')
+        operations = [
+            {'op': 'create', 'title': 'Гонка', 'text': 'Текст', 'slug': 'race'}
+        ]
+        requests = [
+            (reverse('notes:api_batch'), {'operations': operations})
+        ] * 16
+        with file_database():
+            statuses = post_concurrently(
+                author, requests, content_type='application/json'
+            )
+        self.assertEqual(statuses.count(HTTPStatus.OK), 1)
+        self.assertEqual(
+            statuses.count(HTTPStatus.BAD_REQUEST), len(requests) - 1
+        )
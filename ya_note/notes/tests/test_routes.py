@@ -1,10 +1,11 @@
 from http import HTTPStatus
 
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
 from notes.models import Note
+from yanote.query_budget import QueryCounter
 
 User = get_user_model()
 
@@ -42,7 +43,10 @@ class TestRoutes(TestCase):
 
     def test_pages_availability(self):
         '''Авторизованный польз-ель имеет доступ к страницам.'''
-        for name in ('notes:list', 'notes:success', 'notes:add'):
+        for name in (
+            'notes:list', 'notes:success', 'notes:add',
+            'notes:search', 'notes:export', 'notes:import',
+        ):
             with self.subTest(name=name):
                 url = reverse(name)
                 response = self.reader_client.get(url)
@@ -55,9 +59,15 @@ class TestRoutes(TestCase):
             (self.reader_client, HTTPStatus.NOT_FOUND),
         )
         for user, status in users_statuses:
-            for name in ('notes:detail', 'notes:delete', 'notes:edit'):
+            for name, args in (
+                ('notes:detail', (self.note.slug,)),
+                ('notes:delete', (self.note.slug,)),
+                ('notes:edit', (self.note.slug,)),
+                ('notes:history', (self.note.slug,)),
+                ('notes:revision', (self.note.slug, 1)),
+            ):
                 with self.subTest(user=user, name=name):
-                    url = reverse(name, args=(self.note.slug,))
+                    url = reverse(name, args=args)
                     response = user.get(url)
                     self.assertEqual(response.status_code, status)
 
@@ -67,10 +77,15 @@ class TestRoutes(TestCase):
         urls = (
             ('notes:list', None),
             ('notes:add', None),
+            ('notes:search', None),
+            ('notes:export', None),
+            ('notes:import', None),
             ('notes:success', None),
             ('notes:detail', (self.note.slug,)),
             ('notes:edit', (self.note.slug,)),
-            ('notes:delete', (self.note.slug,))
+            ('notes:delete', (self.note.slug,)),
+            ('notes:history', (self.note.slug,)),
+            ('notes:revision', (self.note.slug, 1)),
         )
         for name, args in urls:
             with self.subTest(name=name):
@@ -78,3 +93,27 @@ class TestRoutes(TestCase):
                 redirect_url = f'{login_url}?next={url}'
                 response = self.client.get(url)
                 self.assertRedirects(response, redirect_url)
+
+    def test_query_counter_skips_transaction_control(self):
+        '''Команды управления транзакцией не входят в число запросов.'''
+        counter = QueryCounter()
+        for sql in (
+            'BEGIN IMMEDIATE', 'SAVEPOINT "s1"', 'ROLLBACK TO SAVEPOINT "s1"',
+            'SELECT 1',
+        ):
+            counter(lambda *args: None, sql, None, False, {})
+        self.assertEqual(counter.count, 1)
+
+    @override_settings(DEBUG=True)
+    def test_query_budget_headers(self):
+        '''Страницы заметок укладываются в бюджет SQL-запросов.'''
+        for name, args in (
+            ('notes:list', None),
+            ('notes:detail', (self.note.slug,)),
+        ):
+            with self.subTest(name=name):
+                response = self.author_client.get(reverse(name, args=args))
+                self.assertLessEqual(
+                    int(response['X-Query-Count']),
+                    int(response['X-Query-Budget'])
+                )
@@ -0,0 +1,302 @@
+import importlib
+import json
+import os
+import sys
+import tempfile
+from http import HTTPStatus
+from io import StringIO
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.migrations.recorder import MigrationRecorder
+from django.test import TestCase, override_settings
+from django.template import engines
+from django.urls import reverse
+
+from notes.models import Note
+from notes.search import search_notes
+from yacommon import bulk, test_database, view_benchmark
+from yanote import test_impact, test_profile
+from yanote.sqlite_pragmas import apply_pragmas
+
+User = get_user_model()
+
+
+class TestTemplateDatabase(TestCase):
+
+    def test_template_digest(self):
+        '''Шаблон тестовой базы зависит от функции наполнения.'''
+        digest = test_database.template_digest()
+        self.assertEqual(test_database.template_digest(), digest)
+        seed = 'notes.factories.seed_dataset'
+        self.assertNotEqual(test_database.template_digest(seed), digest)
+        with override_settings(TEST_DB_SEED=seed):
+            self.assertIn(
+                test_database.template_digest(seed),
+                test_database.template_path().name,
+            )
+
+    def test_template_digest_follows_migration_imports(self):
+        '''Модули проекта, которые импортируют миграции, входят в хеш.'''
+        self.assertEqual(
+            test_database.project_imports(
+                'notes.migrations.0004_note_text_compression'
+            ),
+            {'notes.fields'},
+        )
+        digest = test_database.template_digest()
+        source = test_database.module_source
+
+        def edited_source(name):
+            return source(name) + (b'#' if name == 'notes.fields' else b'')
+
+        with mock.patch.object(test_database, 'module_source', edited_source):
+            self.assertNotEqual(test_database.template_digest(), digest)
+
+    def test_old_templates_are_pruned(self):
+        '''Остаются только последние использованные шаблоны.'''
+        with tempfile.TemporaryDirectory() as directory:
+            paths = [
+                Path(directory, f'default_{index}.sqlite3')
+                for index in range(5)
+            ]
+            for age, path in enumerate(reversed(paths)):
+                path.touch()
+                os.utime(path, (age, age))
+            paths[0].touch()
+            test_database.prune_templates(paths[0])
+            self.assertEqual(
+                sorted(Path(directory).iterdir()),
+                paths[:test_database.KEEP_TEMPLATES],
+            )
+
+    def test_test_database_name(self):
+        '''Без TEST NAME тестовая база — общая база в памяти.'''
+        memory = SimpleNamespace(
+            alias='default', settings_dict={'TEST': {'NAME': None}}
+        )
+        self.assertEqual(
+            test_database.test_database_name(memory),
+            'file:memorydb_default?mode=memory&cache=shared',
+        )
+        on_disk = SimpleNamespace(
+            alias='default', settings_dict={'TEST': {'NAME': 'test.sqlite3'}}
+        )
+        self.assertEqual(
+            test_database.test_database_name(on_disk), 'test.sqlite3'
+        )
+
+    def test_test_database_is_migrated(self):
+        '''Копия шаблона содержит все миграции и поисковый индекс.'''
+        recorder = MigrationRecorder(connection)
+        self.assertIn(
+            ('notes', '0005_note_revisions'), recorder.applied_migrations()
+        )
+        author = User.objects.create(username='Автор')
+        note = Note.objects.create(title='Шаблон', author=author)
+        found = search_notes(author, 'Шаблон')
+        self.assertEqual([result.pk for result in found], [note.pk])
+
+
+class TestBenchmarkViews(TestCase):
+
+    def test_compare_ignores_noise(self):
+        '''Регрессией считается заметное ухудшение, а не шум.'''
+        base = {'p50': 10.0, 'p95': 12.0, 'p99': 15.0, 'queries': 3,
+                'peak_kib': 100.0}
+        noisy = {**base, 'p50': 10.8}
+        slower = {**base, 'p50': 20.0, 'peak_kib': 300.0, 'queries': 4}
+        self.assertEqual(
+            view_benchmark.compare({'v': base}, {'v': noisy}, 0.5, 1.0), []
+        )
+        self.assertEqual(
+            len(view_benchmark.compare({'v': base}, {'v': slower}, 0.5, 1.0)),
+            3,
+        )
+
+    def test_benchmark_views_covers_urls(self):
+        '''benchmark_views замеряет все URL проекта и пишет JSON.'''
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = os.path.join(directory, 'baseline.json')
+            call_command(
+                'benchmark_views', '--users', '1', '--notes', '5',
+                '--repeat', '2', '--warmup', '0', '--save', baseline,
+                stdout=StringIO(),
+            )
+            with open(baseline, encoding='utf-8') as file:
+                views = json.load(file)['views']
+        self.assertLessEqual(
+            set(view_benchmark.url_names()) - {'users:logout'}, set(views)
+        )
+        self.assertEqual(views['notes:api_batch']['status'], HTTPStatus.OK)
+
+    def test_benchmark_needs_two_repeats(self):
+        '''Одного замера мало для перцентилей: команда не запускается.'''
+        with self.assertRaisesMessage(CommandError, 'не меньше 2'):
+            call_command('benchmark_views', '--repeat', '1')
+
+    def test_benchmark_hooks_are_abstract(self):
+        '''Команду без seed() и scenarios() нельзя создать.'''
+        with self.assertRaises(TypeError):
+            view_benchmark.BenchmarkCommand()
+
+
+class TestProfile(TestCase):
+
+    def test_profile_counts_queries_and_renders(self):
+        '''Профиль тестов считает запросы и внешние рендеры шаблонов.'''
+        template = engines['django'].from_string(
+            '{% include "notes/delete.html" %}'
+        )
+        with test_profile.measure_queries_and_renders() as (counter, timer):
+            Note.objects.count()
+            template.render({})
+            template.render({})
+        self.assertEqual(counter.count, 1)
+        self.assertEqual(timer.count, 2)
+
+
+class TestImpact(TestCase):
+    TESTS = {
+        'notes/test_a.py::test_views': {
+            'files': ['notes/views.py'], 'failed': False,
+        },
+        'notes/test_a.py::test_forms': {
+            'files': ['notes/forms.py'], 'failed': True,
+        },
+    }
+
+    def selector(self, changed):
+        """Selector с картой TESTS и подменённым списком изменений."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        root = Path(directory.name)
+        (root / test_impact.DEFAULT_MAP).write_text(json.dumps({
+            'version': test_impact.VERSION,
+            'commit': 'HEAD',
+            'dirty': {},
+            'checksum': test_impact.tests_checksum(self.TESTS),
+            'tests': self.TESTS,
+        }), encoding='utf-8')
+        patcher = mock.patch.object(
+            test_impact, 'changed_files', return_value=changed
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return test_impact.Selector(SimpleNamespace(
+            rootpath=root,
+            getoption={'impact_map': test_impact.DEFAULT_MAP}.get,
+        ))
+
+    def affected(self, changed):
+        items = [
+            SimpleNamespace(nodeid=nodeid)
+            for nodeid in (*self.TESTS, 'notes/test_b.py::test_new')
+        ]
+        return self.selector(changed).affected(items)
+
+    def test_impact_selects_affected_tests(self):
+        '''Выбираются тесты изменённых файлов, упавшие и новые.'''
+        selected, _ = self.affected({'notes/views.py'})
+        self.assertEqual(
+            [item.nodeid for item in selected],
+            [*self.TESTS, 'notes/test_b.py::test_new'],
+        )
+        selected, _ = self.affected(set())
+        self.assertEqual(
+            [item.nodeid for item in selected],
+            ['notes/test_a.py::test_forms', 'notes/test_b.py::test_new'],
+        )
+
+    def test_impact_falls_back_to_full_run(self):
+        '''Настройки, неизвестные файлы и отказ git требуют всех тестов.'''
+        cases = (
+            ({'yanote/settings.py'}, 'изменён yanote/settings.py'),
+            ({'notes/urls.py'}, 'notes/urls.py нет в карте'),
+            (None, 'git не может'),
+        )
+        for changed, reason in cases:
+            with self.subTest(changed=changed):
+                selected, message = self.affected(changed)
+                self.assertIsNone(selected)
+                self.assertTrue(message.startswith(reason), message)
+
+    def test_impact_records_classes_without_methods(self):
+        '''Представление без своих методов попадает в карту тестов.'''
+        recorder = test_impact.Recorder(
+            SimpleNamespace(rootpath=settings.BASE_DIR)
+        )
+        with recorder.recording() as touched:
+            self.client.get(reverse('notes:home'))
+        self.assertLessEqual(
+            {'notes/views.py', 'templates/notes/home.html'}, touched
+        )
+
+    def test_impact_records_shared_package(self):
+        '''Код yacommon попадает в карту тестов.'''
+        recorder = test_impact.Recorder(
+            SimpleNamespace(rootpath=settings.BASE_DIR)
+        )
+        with recorder.recording() as touched:
+            list(bulk.batches(range(3), 2))
+        self.assertIn('../yacommon/bulk.py', touched)
+
+
+class TestSqlitePragmas(TestCase):
+
+    def test_pragmas_applied_to_new_connection(self):
+        '''PRAGMA из настроек выполняются при подключении к базе.'''
+        cursor = connection.connection.cursor()
+        saved = cursor.execute('PRAGMA cache_size').fetchone()[0]
+        try:
+            with override_settings(SQLITE_PRAGMAS={'cache_size': -1234}):
+                apply_pragmas(None, connection)
+            self.assertEqual(
+                cursor.execute('PRAGMA cache_size').fetchone()[0], -1234
+            )
+        finally:
+            cursor.execute(f'PRAGMA cache_size = {saved}')
+
+    def test_pragmas_applied_by_connection_created(self):
+        '''Новое подключение получает PRAGMA через connection_created.'''
+        pragmas = {'journal_mode': 'memory', 'busy_timeout': 1234}
+        fresh = connections.create_connection(DEFAULT_DB_ALIAS)
+        self.addCleanup(fresh.close)
+        with override_settings(SQLITE_PRAGMAS=pragmas):
+            fresh.ensure_connection()
+        pragma = fresh.connection.execute
+        self.assertEqual(pragma('PRAGMA journal_mode').fetchone()[0], 'memory')
+        self.assertEqual(pragma('PRAGMA busy_timeout').fetchone()[0], 1234)
+
+
+class TestProductionSettings(TestCase):
+
+    def load(self, **environ):
+        """Заново загруженные настройки нагрузки с окружением environ."""
+        sys.modules.pop('yanote.settings_production', None)
+        with mock.patch.dict(os.environ, environ, clear=True):
+            return importlib.import_module('yanote.settings_production')
+
+    def test_secret_key_required(self):
+        '''Без DJANGO_SECRET_KEY настройки нагрузки не загружаются.'''
+        with self.assertRaises(ImproperlyConfigured):
+            self.load()
+
+    def test_production_settings(self):
+        '''Ключ и хосты из окружения, постоянные подключения и кеш.'''
+        production = self.load(
+            DJANGO_SECRET_KEY='ключ', DJANGO_ALLOWED_HOSTS='note.example'
+        )
+        self.assertEqual(production.SECRET_KEY, 'ключ')
+        self.assertEqual(production.ALLOWED_HOSTS, ['note.example'])
+        self.assertIs(production.DEBUG, False)
+        self.assertEqual(production.DATABASES['default']['CONN_MAX_AGE'], 600)
+        self.assertFalse(hasattr(production, 'QUERY_BUDGETS'))
+        loader, _ = production.TEMPLATES[0]['OPTIONS']['loaders'][0]
+        self.assertEqual(loader, 'django.template.loaders.cached.Loader')
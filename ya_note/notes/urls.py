@@ -10,6 +10,16 @@ urlpatterns = [
     path('edit/<slug:slug>/', views.NoteUpdate.as_view(), name='edit'),
     path('note/<slug:slug>/', views.NoteDetail.as_view(), name='detail'),
     path('delete/<slug:slug>/', views.NoteDelete.as_view(), name='delete'),
+    path('history/<slug:slug>/', views.NoteHistory.as_view(), name='history'),
+    path(
+        'history/<slug:slug>/<int:number>/',
+        views.NoteRevisionDetail.as_view(),
+        name='revision',
+    ),
     path('notes/', views.NotesList.as_view(), name='list'),
+    path('notes/search/', views.NotesSearch.as_view(), name='search'),
+    path('notes/export/', views.NotesExport.as_view(), name='export'),
+    path('notes/import/', views.NotesImport.as_view(), name='import'),
+    path('api/notes/batch/', views.NotesBatch.as_view(), name='api_batch'),
     path('done/', views.NoteSuccess.as_view(), name='success'),
 ]
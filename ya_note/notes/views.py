@@ -1,30 +1,82 @@
+import json
+
+from django.conf import settings
+from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import IntegrityError, OperationalError, transaction
+from django.http import (
+    HttpResponseRedirect, JsonResponse, StreamingHttpResponse
+)
 from django.urls import reverse_lazy
 from django.views import generic
 
-from .forms import NoteForm
+from .api import BatchError, apply_batch
+from .archive import export_notes, import_notes, skipped_message
+from .forms import (
+    BUSY, NO_FREE_SLUG, WARNING, NoteForm, NotesImportForm, NotesSearchForm
+)
 from .models import Note
+from .pagination import KeysetPaginationMixin
+from .revisions import reconstruct
+from .search import search_notes
+from .slugs import SlugsExhausted
 
 
 class Home(generic.TemplateView):
     """Домашняя страница."""
     template_name = 'notes/home.html'
+    query_budget = 2
 
 
 class NoteSuccess(LoginRequiredMixin, generic.TemplateView):
     """Страница успешного выполнения операции."""
     template_name = 'notes/success.html'
+    query_budget = 2
 
 
 class NoteBase(LoginRequiredMixin):
     """Базовый класс для остальных CBV."""
     model = Note
     success_url = reverse_lazy('notes:success')
+    # Сессия, пользователь и запись заметки; у новой — поиск
+    # свободного slug или проверка заданного, у правки — чтение
+    # заметки и цепочки правок; вставка правки в историю.
+    query_budget = 6
 
     def get_queryset(self):
         """Пользователь может работать только со своими заметками."""
         return self.model.objects.filter(author=self.request.user)
 
+    def form_valid(self, form):
+        """
+        Сохраняет заметку из формы.
+
+        Если заданный slug успел занять параллельный запрос, свободный
+        slug подобрать не удалось или база дольше busy_timeout занята
+        записью других запросов, показываем ошибку формы вместо ошибки
+        сервера. Остальные ошибки базы — ошибки сервера.
+        """
+        slug = form.cleaned_data.get('slug')
+        try:
+            with transaction.atomic():
+                self.object = form.save()
+        except SlugsExhausted:
+            form.add_error('slug', NO_FREE_SLUG)
+            return self.form_invalid(form)
+        except OperationalError as error:
+            if 'locked' not in str(error):
+                raise
+            form.add_error(None, BUSY)
+            return self.form_invalid(form)
+        except IntegrityError:
+            if not slug or not self.model.objects.filter(
+                slug=slug
+            ).exclude(pk=form.instance.pk).exists():
+                raise
+            form.add_error('slug', slug + WARNING)
+            return self.form_invalid(form)
+        return HttpResponseRedirect(self.get_success_url())
+
 
 class NoteCreate(NoteBase, generic.CreateView):
     """Добавление заметки."""
@@ -32,9 +84,7 @@ class NoteCreate(NoteBase, generic.CreateView):
     form_class = NoteForm
 
     def form_valid(self, form):
-        new_note = form.save(commit=False)
-        new_note.author = self.request.user
-        new_note.save()
+        form.instance.author = self.request.user
         return super().form_valid(form)
 
 
@@ -47,13 +97,119 @@ class NoteUpdate(NoteBase, generic.UpdateView):
 class NoteDelete(NoteBase, generic.DeleteView):
     """Удаление заметки."""
     template_name = 'notes/delete.html'
+    query_budget = 5
 
 
-class NotesList(NoteBase, generic.ListView):
+class NotesList(NoteBase, KeysetPaginationMixin, generic.ListView):
     """Список всех заметок пользователя."""
     template_name = 'notes/list.html'
+    query_budget = 3
+    keyset_ordering = ('id',)
+
+    def get_queryset(self):
+        """В списке выводятся только id, slug и заголовок."""
+        return super().get_queryset().only('id', 'slug', 'title')
+
+    def get_paginate_by(self, queryset):
+        return settings.NOTES_COUNT_ON_PAGE
+
+
+class NotesSearch(LoginRequiredMixin, generic.TemplateView):
+    """Полнотекстовый поиск по заметкам пользователя."""
+    template_name = 'notes/search.html'
+    query_budget = 3
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        form = NotesSearchForm(self.request.GET or None)
+        context['form'] = form
+        if form.is_valid():
+            context['page_obj'] = search_notes(
+                self.request.user,
+                form.cleaned_data['q'],
+                self.request.GET.get('cursor'),
+                settings.NOTES_COUNT_ON_PAGE,
+            )
+        return context
 
 
 class NoteDetail(NoteBase, generic.DetailView):
     """Заметка подробно."""
     template_name = 'notes/detail.html'
+    query_budget = 3
+
+
+class NoteHistory(NoteBase, generic.DetailView):
+    """История правок заметки."""
+    template_name = 'notes/history.html'
+    query_budget = 4
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['revisions'] = self.object.revisions.only(
+            'note_id', 'number', 'title', 'snapshot', 'created'
+        ).order_by('-number')
+        return context
+
+
+class NoteRevisionDetail(NoteBase, generic.DetailView):
+    """Заметка в состоянии одной из прошлых правок."""
+    template_name = 'notes/revision.html'
+    query_budget = 4
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['revision'] = reconstruct(self.object, self.kwargs['number'])
+        return context
+
+
+class NotesExport(LoginRequiredMixin, generic.View):
+    """Выгрузка всех заметок пользователя zip-архивом."""
+
+    def get(self, request, *args, **kwargs):
+        notes = Note.objects.filter(author=request.user)
+        response = StreamingHttpResponse(
+            export_notes(notes), content_type='application/zip'
+        )
+        response['Content-Disposition'] = 'attachment; filename="notes.zip"'
+        return response
+
+
+class NotesImport(LoginRequiredMixin, generic.FormView):
+    """Загрузка заметок из zip-архива."""
+    template_name = 'notes/import.html'
+    form_class = NotesImportForm
+    success_url = reverse_lazy('notes:success')
+
+    def form_valid(self, form):
+        result = import_notes(form.cleaned_data['archive'], self.request.user)
+        if result.skipped:
+            messages.warning(self.request, skipped_message(result.skipped))
+        return super().form_valid(form)
+
+
+class NotesBatch(LoginRequiredMixin, generic.View):
+    """
+    Пакетное API: создание, правка и удаление заметок одним запросом.
+
+    Тело запроса — JSON вида {"operations": [{"op": "create", ...}]}.
+    """
+    http_method_names = ['post']
+    raise_exception = True
+    # Запросов на пачку, а не на заметку: сессия и пользователь,
+    # чтение заметок и занятых slug, удаление (выбор заметок, удаление
+    # правок и заметок), подбор slug, обновление, вставка с последним
+    # id до неё и новыми id после, цепочки правок и вставка правок.
+    query_budget = 14
+
+    def post(self, request, *args, **kwargs):
+        try:
+            applied, results = apply_batch(
+                request.user, json.loads(request.body)
+            )
+        except (ValueError, BatchError) as error:
+            return JsonResponse({'error': str(error)}, status=400)
+        return JsonResponse(
+            {'applied': applied, 'results': results},
+            status=200 if applied else 400,
+        )
@@ -0,0 +1,38 @@
+from time import perf_counter
+
+import pytest
+
+from yacommon.test_database import (
+    setup_test_database, teardown_test_database
+)
+from yanote.query_budget import assert_query_budgets
+
+
+@pytest.fixture(autouse=True)
+def query_budgets():
+    '''Тест падает, если представление превысило бюджет SQL-запросов.'''
+    with assert_query_budgets() as violations:
+        yield violations
+
+
+@pytest.fixture(scope='session')
+def django_db_setup(request, django_test_environment, django_db_blocker):
+    '''Тестовая база — копия шаблона с уже применёнными миграциями.'''
+    start = perf_counter()
+    with django_db_blocker.unblock():
+        old_name, path, built = setup_test_database(
+            rebuild=request.config.getvalue('create_db')
+        )
+    request.config.test_database_report = (
+        f'шаблон {path.name} {"построен" if built else "из кеша"}, '
+        f'{perf_counter() - start:.2f} с'
+    )
+    yield
+    with django_db_blocker.unblock():
+        teardown_test_database(old_name)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    report = getattr(config, 'test_database_report', None)
+    if report:
+        terminalreporter.write_line(f'Тестовая база: {report}')
@@ -22,6 +22,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yanote.query_budget.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,7 +55,7 @@ WSGI_APPLICATION = 'yanote.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'yanote.sqlite_backend',
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
@@ -87,3 +88,14 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('notes:home')
+
+NOTES_COUNT_ON_PAGE = 50
+
+# История заметок: полная копия текста раз в столько правок,
+# между копиями хранятся только отличия.
+NOTES_REVISION_SNAPSHOT_INTERVAL = 16
+# Сколько последних правок хранить; старые удаляет prune_note_revisions.
+NOTES_REVISIONS_KEEP = 100
+
+# Наибольшее число операций в одном запросе к пакетному API.
+NOTES_API_BATCH_LIMIT = 1000
@@ -0,0 +1,70 @@
+"""
+Настройки для работы под нагрузкой.
+
+В отличие от настроек разработки:
+- база в режиме WAL: чтение не ждёт записи, запись не ждёт чтения;
+- подключения к базе живут между запросами (CONN_MAX_AGE) в потоке
+  или процессе WSGI-сервера, а PRAGMA выполняются при подключении;
+- скомпилированные шаблоны кешируются в памяти процесса;
+- SECRET_KEY обязателен в переменной окружения DJANGO_SECRET_KEY,
+  ALLOWED_HOSTS — через пробел в DJANGO_ALLOWED_HOSTS (по умолчанию
+  только localhost).
+
+Запуск: DJANGO_SETTINGS_MODULE=yanote.settings_production.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa: F401, F403
+from .settings import DATABASES, TEMPLATES
+
+DEBUG = False
+
+try:
+    SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+except KeyError:
+    raise ImproperlyConfigured(
+        'Задайте секретный ключ в переменной окружения DJANGO_SECRET_KEY.'
+    )
+
+ALLOWED_HOSTS = os.environ.get(
+    'DJANGO_ALLOWED_HOSTS', 'localhost 127.0.0.1'
+).split()
+
+DATABASES = {
+    'default': {
+        **DATABASES['default'],
+        'CONN_MAX_AGE': 600,
+    }
+}
+
+# Выполняются в каждом новом подключении (yanote.sqlite_pragmas).
+SQLITE_PRAGMAS = {
+    # Режим журнала хранится в файле базы, остальное — на подключение.
+    'journal_mode': 'wal',
+    # В режиме WAL сбой питания может потерять последние транзакции,
+    # но не повредить базу; fsync только при контрольной точке.
+    'synchronous': 'normal',
+    # Сколько мс ждать, пока другое подключение держит запись.
+    'busy_timeout': 5000,
+    # Отрицательное значение — размер кеша страниц в КиБ: 64 МиБ.
+    'cache_size': -64 * 1024,
+    'mmap_size': 256 * 1024 * 1024,
+}
+
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            **TEMPLATES[0]['OPTIONS'],
+            'loaders': [(
+                'django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ],
+            )],
+        },
+    },
+]
@@ -0,0 +1,22 @@
+"""
+Бэкенд SQLite, в котором транзакции сразу берут блокировку записи.
+
+Django открывает транзакцию командой BEGIN, и SQLite откладывает
+блокировку до первой записи. Если к этому моменту в транзакции уже
+было чтение, а запись держит другое подключение, SQLite не ждёт
+(busy_timeout не действует: ожидание могло бы кончиться взаимной
+блокировкой) и сразу отвечает «database is locked». Так пишут
+заметки: slug и цепочка правок читаются перед вставкой, а вставка
+запускает триггеры полнотекстового индекса.
+
+BEGIN IMMEDIATE берёт блокировку записи в начале транзакции и при
+занятой базе ждёт её освобождения, как одиночная запись. Чтение вне
+транзакций не меняется.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -0,0 +1,20 @@
+"""
+Настройка подключений к SQLite.
+
+Приёмник сигнала connection_created выполняет PRAGMA из
+settings.SQLITE_PRAGMAS, например {'journal_mode': 'wal'}, в каждом
+новом подключении. В настройках разработки словаря нет, и подключения
+остаются как есть.
+"""
+from django.conf import settings
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    """Выполняет PRAGMA из настроек в новом подключении SQLite."""
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    # Напрямую через sqlite3, а не курсором Django: PRAGMA не должны
+    # попадать в бюджет SQL-запросов первого запроса подключения.
+    for name, value in pragmas.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
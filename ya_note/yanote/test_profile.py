@@ -0,0 +1,208 @@
+"""
+Профиль тестов: где проходит время прогона.
+
+С ключом --profile-tests для каждого теста записываются время
+подготовки, самого теста и завершения, время каждой фикстуры, число
+SQL-запросов и их время, время рендеринга шаблонов Django. В конце
+прогона выводятся самые медленные тесты и фикстуры, с
+--profile-tests-json=FILE всё пишется в JSON: файлы двух прогонов
+удобно сравнивать diff'ом, тесты в них идут по порядку node id.
+
+Хуки подключаются в conftest.py импортом pytest_addoption и
+pytest_configure.
+"""
+import json
+import threading
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from time import perf_counter
+
+import pytest
+from django.db import connections
+from django.template.base import Template
+
+from yanote.query_budget import QueryCounter
+
+PHASES = ('setup', 'call', 'teardown')
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('profile-tests', 'профиль тестов')
+    group.addoption(
+        '--profile-tests', action='store_true',
+        help='Время, SQL-запросы и рендеринг шаблонов каждого теста.'
+    )
+    group.addoption(
+        '--profile-tests-json', metavar='FILE',
+        help='Записать профиль тестов в JSON (включает --profile-tests).'
+    )
+    group.addoption(
+        '--profile-tests-top', type=int, default=10, metavar='N',
+        help='Сколько самых медленных тестов и фикстур показать.'
+    )
+
+
+def pytest_configure(config):
+    if config.getoption('profile_tests') or config.getoption(
+        'profile_tests_json'
+    ):
+        config.pluginmanager.register(Profiler(config), 'test-profiler')
+
+
+class RenderTimer:
+    """
+    Время рендеринга шаблонов.
+
+    Оборачивается Template.render: _render уже подменяет тестовое
+    окружение Django. Вложенные шаблоны (include) рендерятся внутри
+    внешнего, поэтому считается только внешний вызов.
+    """
+
+    def __init__(self):
+        self.duration = 0.0
+        self.count = 0
+        self.local = threading.local()
+
+    def wrap(self, render):
+        timer = self
+
+        def timed_render(template, context):
+            depth = getattr(timer.local, 'depth', 0)
+            timer.local.depth = depth + 1
+            start = perf_counter()
+            try:
+                return render(template, context)
+            finally:
+                timer.local.depth = depth
+                if not depth:
+                    timer.duration += perf_counter() - start
+                    timer.count += 1
+
+        return timed_render
+
+
+@contextmanager
+def measure_queries_and_renders():
+    """Счётчик SQL-запросов и таймер шаблонов на время блока."""
+    counter, timer = QueryCounter(), RenderTimer()
+    render = Template.render
+    Template.render = timer.wrap(render)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            yield counter, timer
+    finally:
+        Template.render = render
+
+
+class Profiler:
+    """Плагин pytest, который собирает профиль каждого теста."""
+
+    def __init__(self, config):
+        self.config = config
+        self.tests = {}
+        self.fixtures = defaultdict(lambda: {'calls': 0, 'seconds': 0.0})
+        self.current = None
+
+    def profile(self, nodeid):
+        return self.tests.setdefault(nodeid, {
+            **dict.fromkeys(PHASES, 0.0),
+            'fixtures': defaultdict(float),
+            'queries': 0,
+            'sql_seconds': 0.0,
+            'render_seconds': 0.0,
+            'renders': 0,
+            'outcome': 'passed',
+        })
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_protocol(self, item, nextitem):
+        self.current = self.profile(item.nodeid)
+        with measure_queries_and_renders() as (counter, timer):
+            yield
+        self.current.update(
+            queries=counter.count,
+            sql_seconds=counter.duration,
+            render_seconds=timer.duration,
+            renders=timer.count,
+        )
+        self.current = None
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_fixture_setup(self, fixturedef, request):
+        start = perf_counter()
+        yield
+        duration = perf_counter() - start
+        name = fixturedef.argname
+        self.fixtures[name]['calls'] += 1
+        self.fixtures[name]['seconds'] += duration
+        if self.current is not None:
+            self.current['fixtures'][name] += duration
+
+    def pytest_runtest_logreport(self, report):
+        profile = self.profile(report.nodeid)
+        profile[report.when] = report.duration
+        if report.failed:
+            profile['outcome'] = 'failed'
+        elif report.skipped and report.when != 'teardown':
+            profile['outcome'] = 'skipped'
+
+    def results(self):
+        tests = {}
+        for nodeid in sorted(self.tests):
+            profile = dict(self.tests[nodeid])
+            profile['total'] = sum(profile[phase] for phase in PHASES)
+            profile['fixtures'] = dict(sorted(profile['fixtures'].items()))
+            tests[nodeid] = profile
+        return {
+            'tests': tests,
+            'fixtures': dict(sorted(self.fixtures.items())),
+            'totals': {
+                key: sum(test[key] for test in tests.values())
+                for key in (
+                    'total', *PHASES, 'queries', 'sql_seconds',
+                    'render_seconds', 'renders',
+                )
+            },
+        }
+
+    def pytest_terminal_summary(self, terminalreporter):
+        results = self.results()
+        top = self.config.getoption('profile_tests_top')
+        write = terminalreporter.write_line
+        terminalreporter.section('профиль тестов')
+        totals = results['totals']
+        write(
+            f'Всего {totals["total"]:.2f} с: подготовка '
+            f'{totals["setup"]:.2f} с, SQL {totals["queries"]} запросов '
+            f'за {totals["sql_seconds"]:.2f} с, шаблоны '
+            f'{totals["renders"]} за {totals["render_seconds"]:.2f} с'
+        )
+        write('')
+        write('  всего, с | подготовка | запросов |  SQL, мс | '
+              'шаблоны, мс | тест')
+        ranked = sorted(
+            results['tests'].items(), key=lambda item: -item[1]['total']
+        )
+        for nodeid, test in ranked[:top]:
+            write(
+                f'{test["total"]:>10.3f} | {test["setup"]:>10.3f} | '
+                f'{test["queries"]:>8} | {test["sql_seconds"] * 1000:>8.1f} '
+                f'| {test["render_seconds"] * 1000:>11.1f} | {nodeid}'
+            )
+        write('')
+        write('  всего, с | вызовов | фикстура')
+        fixtures = sorted(
+            results['fixtures'].items(), key=lambda item: -item[1]['seconds']
+        )
+        for name, fixture in fixtures[:top]:
+            write(
+                f'{fixture["seconds"]:>10.3f} | {fixture["calls"]:>7} | '
+                f'{name}'
+            )
+        path = self.config.getoption('profile_tests_json')
+        if path:
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+            write(f'Профиль записан в {path}')
@@ -0,0 +1,6 @@
+"""
+Код, общий для проектов YaNews и YaNote.
+
+Корень репозитория с этим пакетом добавляют в sys.path пакеты
+проектов yanews и yanote.
+"""
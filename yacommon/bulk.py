@@ -0,0 +1,116 @@
+"""
+Массовая вставка строк в SQLite.
+
+Строки готовятся сразу в формате базы и вставляются пачками через
+executemany: один оператор INSERT на пачку, без модели на каждую
+строку. Общие для фабрик данных обоих проектов и загрузки из файлов.
+"""
+from contextlib import contextmanager
+from itertools import islice
+
+from django.db import connection
+from django.db.models import Max
+
+BATCH_SIZE = 10000
+TEXT_POOL_SIZE = 4096
+
+
+def batches(iterable, size):
+    """Списки по size элементов из итератора любой длины."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def text_pool(rnd, words, low, high, size=TEXT_POOL_SIZE):
+    """
+    Набор случайных текстов из low–high слов words.
+
+    Тексты строк выбираются из набора: собирать новый текст
+    на каждую из миллионов строк дороже, чем сама вставка.
+    """
+    return [
+        ' '.join(rnd.choices(words, k=rnd.randint(low, high))).capitalize()
+        for _ in range(size)
+    ]
+
+
+def insert_rows(model, fields, rows, ignore_conflicts=False):
+    """
+    Вставляет кортежи значений полей fields пачками по BATCH_SIZE.
+
+    С ignore_conflicts строки, нарушающие уникальность, пропускаются.
+    """
+    quote = connection.ops.quote_name
+    columns = ', '.join(
+        quote(model._meta.get_field(name).column) for name in fields
+    )
+    insert = connection.ops.insert_statement(
+        ignore_conflicts=ignore_conflicts
+    )
+    sql = (
+        f'{insert} {quote(model._meta.db_table)} ({columns}) '
+        f'VALUES ({", ".join(["%s"] * len(fields))})'
+    )
+    with connection.cursor() as cursor:
+        for batch in batches(rows, BATCH_SIZE):
+            cursor.executemany(sql, batch)
+
+
+def insert_objects(objs, fields, ignore_conflicts=False):
+    """
+    Вставляет объекты модели со значениями полей fields как есть.
+
+    В отличие от bulk_create, pre_save полей не вызывается: auto_now
+    и auto_now_add не заменяют время из данных текущим, а модель при
+    этом не меняется, и параллельные сохранения её не замечают.
+    """
+    if not objs:
+        return
+    opts = objs[0]._meta
+    model_fields = [opts.get_field(name) for name in fields]
+    rows = (
+        tuple(
+            field.get_db_prep_save(getattr(obj, field.attname), connection)
+            for field in model_fields
+        )
+        for obj in objs
+    )
+    insert_rows(type(objs[0]), fields, rows, ignore_conflicts)
+
+
+def new_ids(model, before):
+    """id строк, вставленных после id before (SQLite не отдаёт их сам)."""
+    return list(
+        model.objects.filter(pk__gt=before).order_by('pk')
+        .values_list('pk', flat=True)
+    )
+
+
+def last_id(model):
+    return model.objects.aggregate(last=Max('pk'))['last'] or 0
+
+
+@contextmanager
+def page_cache(size_kib=256 * 1024):
+    """
+    Временно увеличивает кеш страниц SQLite.
+
+    Индексы больших таблиц при вставке правятся вразнобой; со
+    стандартным кешем в 2 МБ страницы постоянно вытесняются.
+    """
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA cache_size')
+        saved = cursor.fetchone()[0]
+        cursor.execute(f'PRAGMA cache_size = {-int(size_kib)}')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA cache_size = {int(saved)}')
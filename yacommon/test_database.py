@@ -0,0 +1,185 @@
+"""
+Тестовая база из готового шаблона.
+
+Миграции применяются один раз к файлу-шаблону в каталоге
+TEST_DB_TEMPLATE_DIR (по умолчанию .test_db в каталоге проекта).
+Имя шаблона — хеш файлов миграций, модулей проекта, которые они
+импортируют, версии Django и функции наполнения из настройки
+TEST_DB_SEED, поэтому изменённая миграция даёт новый шаблон. После
+постройки нового шаблона остаются KEEP_TEMPLATES последних
+использованных, остальные удаляются. Тестовая база сессии — копия
+шаблона через backup API sqlite3: в памяти или в файле из
+DATABASES['default']['TEST']['NAME'].
+"""
+import ast
+import hashlib
+import os
+import sqlite3
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.loader import MigrationLoader
+from django.utils.module_loading import import_string
+
+KEEP_TEMPLATES = 3
+
+
+def module_source(name):
+    return Path(sys.modules[name].__file__).read_bytes()
+
+
+def project_imports(name):
+    """
+    Модули проекта, которые импортирует модуль name, по его коду.
+
+    Миграции ссылаются на свои поля и функции (notes.fields), и
+    изменение такого модуля тоже меняет схему.
+    """
+    imported = set()
+    for node in ast.walk(ast.parse(module_source(name))):
+        if isinstance(node, ast.Import):
+            imported.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and not node.level:
+            imported.add(node.module)
+            imported.update(
+                f'{node.module}.{alias.name}' for alias in node.names
+            )
+    base_dir = Path(settings.BASE_DIR).resolve()
+    return {
+        module for module in imported
+        if module in sys.modules
+        and getattr(sys.modules[module], '__file__', None)
+        and base_dir in Path(sys.modules[module].__file__).resolve().parents
+    }
+
+
+def template_digest(seed=None):
+    """Хеш миграций всех приложений и функции наполнения шаблона."""
+    digest = hashlib.sha256(django.get_version().encode())
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    imported = set()
+    for key in sorted(loader.disk_migrations):
+        module = loader.disk_migrations[key].__module__
+        digest.update('.'.join(key).encode())
+        digest.update(module_source(module))
+        imported |= project_imports(module)
+    for module in sorted(imported):
+        digest.update(module.encode())
+        digest.update(module_source(module))
+    if seed:
+        digest.update(seed.encode())
+        digest.update(module_source(import_string(seed).__module__))
+    return digest.hexdigest()[:16]
+
+
+def template_path(alias=DEFAULT_DB_ALIAS):
+    directory = Path(os.environ.get(
+        'TEST_DB_TEMPLATE_DIR', settings.BASE_DIR / '.test_db'
+    ))
+    seed = getattr(settings, 'TEST_DB_SEED', None)
+    return directory / f'{alias}_{template_digest(seed)}.sqlite3'
+
+
+@contextmanager
+def use_database(connection, name):
+    """Временно направляет подключение в базу name."""
+    old_name = connection.settings_dict['NAME']
+    connection.close()
+    connection.settings_dict['NAME'] = name
+    try:
+        yield
+    finally:
+        connection.close()
+        connection.settings_dict['NAME'] = old_name
+
+
+def build_template(path, alias=DEFAULT_DB_ALIAS):
+    """
+    Применяет миграции и наполнение к новому файлу path.
+
+    Файл собирается под временным именем и переименовывается
+    атомарно: параллельные процессы не увидят недостроенный шаблон.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    partial.unlink(missing_ok=True)
+    with use_database(connections[alias], str(partial)):
+        call_command(
+            'migrate', database=alias, interactive=False, verbosity=0,
+            run_syncdb=True,
+        )
+        seed = getattr(settings, 'TEST_DB_SEED', None)
+        if seed:
+            import_string(seed)()
+    os.replace(partial, path)
+    prune_templates(path, alias)
+
+
+def prune_templates(path, alias=DEFAULT_DB_ALIAS):
+    """Удаляет шаблоны, кроме KEEP_TEMPLATES последних использованных."""
+    templates = sorted(
+        path.parent.glob(f'{alias}_*.sqlite3'),
+        key=lambda template: template.stat().st_mtime, reverse=True,
+    )
+    for template in templates[KEEP_TEMPLATES:]:
+        if template != path:
+            template.unlink(missing_ok=True)
+
+
+def test_database_name(connection):
+    """Имя тестовой базы: TEST NAME или общая база в памяти."""
+    name = connection.settings_dict['TEST']['NAME'] or ':memory:'
+    if name == ':memory:':
+        # Как у Django: подключения потоков видят одну базу в памяти.
+        return f'file:memorydb_{connection.alias}?mode=memory&cache=shared'
+    return name
+
+
+def clone_template(path, alias=DEFAULT_DB_ALIAS):
+    """
+    Создаёт тестовую базу копией шаблона path.
+
+    Возвращает имя рабочей базы для destroy_test_db.
+    """
+    connection = connections[alias]
+    creation = connection.creation
+    old_name = connection.settings_dict['NAME']
+    test_name = test_database_name(connection)
+    if not creation.is_in_memory_db(test_name):
+        Path(test_name).unlink(missing_ok=True)
+    connection.close()
+    settings.DATABASES[alias]['NAME'] = test_name
+    connection.settings_dict['NAME'] = test_name
+    connection.ensure_connection()
+    # Только чтение: пропавший шаблон — ошибка, а не пустая база.
+    source = sqlite3.connect(f'{path.resolve().as_uri()}?mode=ro', uri=True)
+    try:
+        source.backup(connection.connection)
+    finally:
+        source.close()
+    return old_name
+
+
+def setup_test_database(rebuild=False, alias=DEFAULT_DB_ALIAS):
+    """
+    Тестовая база из шаблона; шаблон строится, если его ещё нет.
+
+    Возвращает (имя рабочей базы, путь к шаблону, построен ли он).
+    """
+    path = template_path(alias)
+    built = rebuild or not path.exists()
+    if built:
+        build_template(path, alias)
+    else:
+        # Время изменения отмечает использование для prune_templates.
+        os.utime(path)
+    return clone_template(path, alias), path, built
+
+
+def teardown_test_database(old_name, alias=DEFAULT_DB_ALIAS):
+    connections[alias].creation.destroy_test_db(old_name, verbosity=0)
@@ -0,0 +1,291 @@
+"""
+Замеры представлений через тестовый клиент Django.
+
+Каждый сценарий — запрос к одному URL. Для него считаются
+перцентили времени ответа, число SQL-запросов и пик памяти Python
+на запрос (tracemalloc, отдельным проходом: под ним всё медленнее).
+Результаты сохраняются в JSON и сравниваются с прежним файлом.
+"""
+import argparse
+import gc
+import json
+import platform
+import tracemalloc
+from abc import ABCMeta, abstractmethod
+from collections import namedtuple
+from statistics import median, quantiles
+from time import perf_counter
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, get_resolver
+
+Scenario = namedtuple(
+    'Scenario',
+    (
+        'name', 'method', 'url', 'data', 'content_type', 'prepare',
+        'client', 'repeat',
+    ),
+    defaults=(None, None, None, None, None),
+)
+METRICS = ('p50', 'p95', 'p99')
+MEMORY_REQUESTS = 3
+MIN_REPEAT = 2
+
+
+def url_names(exclude=('admin',)):
+    """Имена всех URL проекта с пространствами имён, кроме exclude."""
+    names = []
+
+    def walk(patterns, namespace):
+        for pattern in patterns:
+            if isinstance(pattern, URLPattern):
+                if pattern.name:
+                    names.append(f'{namespace}{pattern.name}')
+            elif pattern.namespace not in exclude:
+                prefix = (
+                    f'{namespace}{pattern.namespace}:'
+                    if pattern.namespace else namespace
+                )
+                walk(pattern.url_patterns, prefix)
+
+    walk(get_resolver().url_patterns, '')
+    return names
+
+
+def repeat_count(value):
+    """Число замеров для --repeat: перцентилям нужно хотя бы два."""
+    try:
+        repeat = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'не целое число: {value!r}')
+    if repeat < MIN_REPEAT:
+        raise argparse.ArgumentTypeError(
+            f'нужно не меньше {MIN_REPEAT} замеров, получено {repeat}'
+        )
+    return repeat
+
+
+def send(client, scenario):
+    extra = {'content_type': scenario.content_type} if (
+        scenario.content_type
+    ) else {}
+    response = getattr(client, scenario.method)(
+        scenario.url, scenario.data, **extra
+    )
+    if response.streaming:
+        # Потоковый ответ читается целиком, иначе замер покажет время
+        # до заголовков. Дочитанный ответ тестовый клиент закрывает
+        # сам, не закрывая подключение к базе внутри транзакции.
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def measure(client, scenario, repeat, warmup):
+    """
+    Замеры одного сценария: время в мс, запросы, пик памяти в КиБ.
+
+    scenario.prepare, если задан, вызывается перед каждым запросом
+    вне замера; scenario.client заменяет общий клиент, а
+    scenario.repeat ограничивает число замеров тяжёлых запросов.
+    """
+    client = scenario.client or client
+    repeat = min(repeat, scenario.repeat or repeat)
+    prepare = scenario.prepare or (lambda: None)
+    for _ in range(warmup):
+        prepare()
+        send(client, scenario)
+    timings, queries = [], []
+    # Сборка мусора в случайный момент добавляет к отдельным
+    # запросам миллисекунды и делает сравнение запусков шумным.
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            prepare()
+            with CaptureQueriesContext(connection) as captured:
+                start = perf_counter()
+                response = send(client, scenario)
+                timings.append((perf_counter() - start) * 1000)
+            queries.append(len(captured))
+    finally:
+        gc.enable()
+    peak = 0
+    tracemalloc.start()
+    try:
+        for _ in range(MEMORY_REQUESTS):
+            prepare()
+            tracemalloc.reset_peak()
+            send(client, scenario)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+    finally:
+        tracemalloc.stop()
+    cuts = quantiles(timings, n=100, method='inclusive')
+    return {
+        'status': response.status_code,
+        **{
+            metric: round(cuts[int(metric[1:]) - 1], 3)
+            for metric in METRICS
+        },
+        'queries': round(median(queries)),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def compare(baseline, results, threshold, min_delta, metric='p50'):
+    """
+    Регрессии относительно baseline.
+
+    Время (перцентиль metric) и память — хуже более чем на долю
+    threshold, для времени ещё и не меньше чем на min_delta мс, чтобы
+    шум долей миллисекунды не валил проверку. Число запросов — любое
+    увеличение.
+    """
+    problems = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        delta = current[metric] - base[metric]
+        if delta > base[metric] * threshold and delta > min_delta:
+            problems.append(
+                f'{name}: {metric} {base[metric]:.2f} → '
+                f'{current[metric]:.2f} мс'
+            )
+        if current['queries'] > base['queries']:
+            problems.append(
+                f'{name}: запросов {base["queries"]} → {current["queries"]}'
+            )
+        if current['peak_kib'] > base['peak_kib'] * (1 + threshold):
+            problems.append(
+                f'{name}: память {base["peak_kib"]} → '
+                f'{current["peak_kib"]} КиБ'
+            )
+    return problems
+
+
+class BenchmarkCommand(BaseCommand, metaclass=ABCMeta):
+    """
+    Основа команд benchmark_views.
+
+    Наследник создаёт данные в seed() и отдаёт сценарии из
+    scenarios(). Всё выполняется в транзакции, которая откатывается.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=repeat_count, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--save', metavar='FILE', help='Записать результаты в JSON.'
+        )
+        parser.add_argument(
+            '--compare', metavar='FILE',
+            help='Сравнить с сохранёнными результатами; при регрессии '
+                 'команда завершается с ошибкой.'
+        )
+        parser.add_argument(
+            '--metric', choices=METRICS, default='p50',
+            help='Перцентиль времени, по которому ищутся регрессии. '
+                 'Хвосты шумят сильнее медианы.'
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.5,
+            help='Допустимое ухудшение времени и памяти, доля '
+                 '(0.5 = 50%%). Меньший порог имеет смысл на '
+                 'выделенной машине: между запусками на общей время '
+                 'плавает на треть.'
+        )
+        parser.add_argument(
+            '--min-delta', type=float, default=1.0,
+            help='Меньшее ухудшение времени в мс не считается регрессией.'
+        )
+
+    @abstractmethod
+    def seed(self, options):
+        """Создаёт данные для замеров."""
+
+    @abstractmethod
+    def scenarios(self):
+        """Сценарии замеров в порядке выполнения."""
+
+    def skipped(self):
+        """Имена URL, которые не замеряются, и причины."""
+        return {}
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            start = perf_counter()
+            self.seed(options)
+            self.stdout.write(
+                f'Данные созданы за {perf_counter() - start:.1f} с'
+            )
+            for name, reason in self.skipped().items():
+                self.stdout.write(f'{name:<28} пропущен: {reason}')
+            results = {}
+            for scenario in self.scenarios():
+                results[scenario.name] = measure(
+                    self.client, scenario, options['repeat'],
+                    options['warmup'],
+                )
+                self.write_result(scenario.name, results[scenario.name])
+            transaction.set_rollback(True)
+        if options['save']:
+            self.save(options['save'], results, options)
+        if options['compare']:
+            self.compare_with(options['compare'], results, options)
+
+    def write_result(self, name, result):
+        self.stdout.write(
+            f'{name:<28} {result["status"]} | '
+            + ' | '.join(
+                f'{metric} {result[metric]:8.2f} мс' for metric in METRICS
+            )
+            + f' | запросов {result["queries"]:>3}'
+            f' | память {result["peak_kib"]:>8.1f} КиБ'
+        )
+
+    def meta(self, options):
+        return {
+            'dataset': {
+                name: options[name] for name in self.dataset_options
+            },
+            'repeat': options['repeat'],
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        }
+
+    def save(self, path, results, options):
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(
+                {'meta': self.meta(options), 'views': results}, file,
+                ensure_ascii=False, indent=2, sort_keys=True,
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f'Результаты записаны в {path}')
+        )
+
+    def compare_with(self, path, results, options):
+        with open(path, encoding='utf-8') as file:
+            baseline = json.load(file)
+        if baseline['meta']['dataset'] != self.meta(options)['dataset']:
+            self.stdout.write(self.style.WARNING(
+                'Объём данных отличается от сохранённого: '
+                f'{baseline["meta"]["dataset"]}'
+            ))
+        missing = set(results) - set(baseline['views'])
+        for name in sorted(missing):
+            self.stdout.write(f'{name}: нет в {path}, не сравнивается')
+        problems = compare(
+            baseline['views'], results, options['threshold'],
+            options['min_delta'], options['metric'],
+        )
+        if problems:
+            raise CommandError(
+                'Регрессия относительно ' + path + ':\n' + '\n'.join(problems)
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f'Регрессий относительно {path} нет')
+        )